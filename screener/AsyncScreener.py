@@ -2,8 +2,8 @@ from datetime import datetime
 from dotenv import load_dotenv
 from time import sleep
 from screener.Sheet import Sheet
+from screenerV3.transport import Transport, create_transport
 import pandas as pd
-import aiohttp
 import asyncio
 import os
 import json
@@ -11,9 +11,10 @@ import json
 load_dotenv()
 
 class AsyncScreener:
-    def __init__(self, ticker_path: str, sheet_path:str = "./service_account.json", sheet_name: str = "Screener"):
+    def __init__(self, ticker_path: str, sheet_path:str = "./service_account.json", sheet_name: str = "Screener", transport: str = None):
         self.tickers = self.__process_tickers(ticker_path)
         self.key = os.environ['FMP_KEY']
+        self.transport = transport
         self.sheet_client = Sheet(sheet_path= sheet_path, file_name=sheet_name)
         self.results = {}
         self.negative_paypack_rating = []
@@ -45,32 +46,6 @@ class AsyncScreener:
         - `dict`: A dictionary containing processed tickers.
         """
         t = self.__read_json_file(path)
-        clean = {
-            'Japan': '.T',
-            'Canada': '.TO',
-            'Austria': '.VI',
-            'Belgium': '.BR',
-            'Estonia': '.TL',
-            'France': '.PA',
-            'Germany': '.DE',
-            'Greece': '.AT',
-            'Hungary': '.BD',
-            'Italy': '.MI',
-            'Latvia': '.RG',
-            'Lithuania': '.VS',
-            'Netherlands': '.AS',
-            'Poland': '.WS',
-            'Portugal': '.LS',
-            'Romania': '.RO',
-            'Finland': '.HE',
-            'Spain': '.MC',
-            'Sweden': '.ST',
-            'Switzerland': '.SW',
-            'United Kingdom': '.L',
-            'New Zealand': '.NZ',
-            'Czech Republic': '.PR',
-            'USA': ''}
-
         return t
 
     def __sort_results_dict(self) -> None:
@@ -125,44 +100,27 @@ class AsyncScreener:
             print(
                 f"Removed {len(self.negative_paypack_rating)} with a negative payback rating.")
 
-    async def __get_data(self, session: aiohttp.ClientSession, ticker: str) -> tuple:
+    async def __get_data(self, session: Transport, ticker: str) -> tuple:
         profile = await self.__get_profile(session, ticker)
         cashflow = await self.__get_cashflow(session, ticker)
         balance_sheet = await self.__get_balance_sheet(session, ticker)
         return profile, cashflow, balance_sheet
 
-    async def __get_profile(self, session: aiohttp.ClientSession, ticker: str) -> str:
-        async with session.get(f'https://financialmodelingprep.com/api/v3/profile/{ticker}?apikey={self.key}') as response:
-            try:
-                return await response.json()
-            except Exception as e:
-                pass
+    async def __get_profile(self, session: Transport, ticker: str) -> str:
+        return await session.get_json(f'https://financialmodelingprep.com/api/v3/profile/{ticker}?apikey={self.key}')
 
-    async def __get_cashflow(self, session: aiohttp.ClientSession, ticker: str) -> str:
-        async with session.get(f'https://financialmodelingprep.com/api/v3/cash-flow-statement/{ticker}?period=annual&limit=5&apikey={self.key}') as response:
-            try:
-                return await response.json()
-            except Exception as e:
-                pass
+    async def __get_cashflow(self, session: Transport, ticker: str) -> str:
+        return await session.get_json(f'https://financialmodelingprep.com/api/v3/cash-flow-statement/{ticker}?period=annual&limit=5&apikey={self.key}')
 
-    async def __get_balance_sheet(self, session: aiohttp.ClientSession, ticker: str) -> str:
-        async with session.get(f'https://financialmodelingprep.com/api/v3/balance-sheet-statement/{ticker}?period=quarter&limit=5&apikey={self.key}') as response:
-            try:
-                return await response.json()
-            except Exception as e:
-                pass
+    async def __get_balance_sheet(self, session: Transport, ticker: str) -> str:
+        return await session.get_json(f'https://financialmodelingprep.com/api/v3/balance-sheet-statement/{ticker}?period=quarter&limit=5&apikey={self.key}')
     
-    async def __get_historical(self, session: aiohttp.ClientSession, ticker: str) -> str:
-        async with session.get(f'https://financialmodelingprep.com/api/v3/historical-price-full/{ticker}?apikey={self.key}') as response:
-            try:
-                return await response.json()
-            except Exception as e:
-                pass
+    async def __get_historical(self, session: Transport, ticker: str) -> str:
+        return await session.get_json(f'https://financialmodelingprep.com/api/v3/historical-price-full/{ticker}?apikey={self.key}')
     
     async def get_all_shares_float(self) -> str:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f'https://financialmodelingprep.com/api/v4/shares_float/all?apikey={self.key}') as response:
-                return await response.json()
+        async with create_transport(self.transport) as session:
+            return await session.get_json(f'https://financialmodelingprep.com/api/v4/shares_float/all?apikey={self.key}')
             
 
     def __calculate_5Y_price(self, historical:dict):
@@ -178,7 +136,7 @@ class AsyncScreener:
         if debug:
             print(
                 f"{len(self.tickers)//2}/{len(len(self.tickers))} tickers processed...")
-        async with aiohttp.ClientSession() as session:
+        async with create_transport(self.transport) as session:
             tasks = [self.__get_data(session, ticker) for ticker in tickers]
             results = await asyncio.gather(*tasks)
             for ticker, (profile, cashflow, balance_sheet) in zip(tickers, results):
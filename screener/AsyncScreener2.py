@@ -1,17 +1,23 @@
 from datetime import datetime
 from dotenv import load_dotenv
-from time import sleep
+from time import perf_counter, sleep
 from .Sheet import Sheet
 from .Utilities import process_tickers
-import pandas as pd
-import aiohttp
+from screenerV3.history import RunHistory, SeenTickers
+from screenerV3.metrics import RunMetrics
+from screenerV3.profiling import section, start_from_env
+from screenerV3.transport import Transport, create_transport
+from screenerV3.table import Table, BOOL, FLOAT, OBJECT
+from screenerV3.records import BalanceSheet, CashFlow, KeyMetricsTTM, Profile, decode_floats, decode_one, decode_statements
 import asyncio
 import os
 
 load_dotenv()
 
 class AsyncScreener2:
-    def __init__(self, ticker_path: str, sheet_path:str = "./service_account.json", sheet_name: str = "V2 Screener") -> None:
+    RESULT_SCHEMA = {"Name": OBJECT, "NCAV Ratio": FLOAT, "P/aFCF Ratio": FLOAT, "EV/aFCF": FLOAT, "P/TBV Ratio": FLOAT, "isAdded": BOOL, "EV": FLOAT, "Country": OBJECT}
+
+    def __init__(self, ticker_path: str, sheet_path:str = "./service_account.json", sheet_name: str = "V2 Screener", transport: str = None) -> None:
         """
         Initializes the AsyncScreener2 instance.
 
@@ -19,40 +25,58 @@ class AsyncScreener2:
         - `ticker_path` (str): Path to the file containing the tickers to be processed.
         - `sheet_path` (str): Path to the Google Sheets service account credentials file.
         - `sheet_name` (str): Name of the Google Sheet to use for storing results.
+        - `transport` (str): Name of the HTTP transport to use (see `screenerV3.transport`). Defaults to the `FMP_TRANSPORT` environment variable.
+
+        Requests, rate limit waits and the screening phase are recorded in `self.metrics` (see `screenerV3.metrics.RunMetrics`),
+        e.g. `screener.metrics.save("./v2-metrics.json")` after a run. With `SCREENER_PROFILE=1` set, the steps of `run_async` and
+        the Google Sheets calls are profiled, and the profiles are written when the process exits (see `screenerV3.profiling`).
 
         Returns:
         - `None`
         """
+        start_from_env()
         self.tickers = process_tickers(ticker_path)
         self.key = os.environ['FMP_KEY']
+        self.transport = transport
         self.industry_blacklist = ['Banks', 'Insurance']
         self.sheet_client = Sheet(sheet_path= sheet_path, file_name=sheet_name)
-        self.results = dict()
+        self.results = Table(self.RESULT_SCHEMA)
         self.industry_blacklist_tickers = list()
         self.floats = None
-        self.previous = self.sheet_client.get_all_previously_seen_tickers()
+        self.metrics = RunMetrics()
+        self.history = RunHistory("v2")
+        self.previous = SeenTickers(self.history, self.sheet_client).get_all_previously_seen_tickers()
     
+    @property
+    def results(self) -> Table:
+        """
+        The screening results, one row per ticker. Metrics that did not pass are missing and published as "N/A".
+        """
+        return self.__results
+
+    @results.setter
+    def results(self, value) -> None:
+        self.__results = value if isinstance(value, Table) else Table.from_dict(value, self.RESULT_SCHEMA)
+
     def __remove_previously_seen(self) -> list[str]:
         """
         Removes tickers that have been previously seen in Google Sheets.
 
         Returns:
-        - `None`
+        - `list[str]`: The removed tickers.
         """
-        drop = [i for i in self.results.keys() if i in self.previous]
+        previous = set(self.previous)
+        drop = [i for i in self.results.tickers() if i in previous]
         for i in drop:
-            try:
-                self.results.pop(i)
-            except:
-                continue
+            self.results.remove(i)
         return drop
     
-    async def __get_data(self, session: aiohttp.ClientSession, ticker: str) -> tuple:
+    async def __get_data(self, session: Transport, ticker: str) -> tuple:
         """
         Retrieves various financial data for a given ticker.
 
         Parameters:
-        - `session` (aiohttp.ClientSession): The aiohttp session to use for making requests.
+        - `session` (Transport): The transport to use for making requests.
         - `ticker` (str): The stock ticker symbol.
 
         Returns:
@@ -64,73 +88,57 @@ class AsyncScreener2:
         cashflow = await self.__get_cashflow(session, ticker)
         return profile, key_metrics_ttm, balance_sheet, cashflow
     
-    async def __get_balance_sheet(self, session: aiohttp.ClientSession, ticker: str) -> str:
+    async def __get_balance_sheet(self, session: Transport, ticker: str) -> list[BalanceSheet]:
         """
         Retrieves the balance sheet for a given ticker.
 
         Parameters:
-        - `session` (aiohttp.ClientSession): The aiohttp session to use for making requests.
+        - `session` (Transport): The transport to use for making requests.
         - `ticker` (str): The stock ticker symbol.
 
         Returns:
-        - `str`: The balance sheet data in JSON format.
+        - `list[BalanceSheet]`: The balance sheets (most recent first), or None if unavailable.
         """
-        async with session.get(f'https://financialmodelingprep.com/api/v3/balance-sheet-statement/{ticker}?period=quarter&limit=5&apikey={self.key}') as response:
-            try:
-                return await response.json()
-            except Exception as e:
-                pass
+        return decode_statements(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/balance-sheet-statement/{ticker}?period=quarter&limit=5&apikey={self.key}'), BalanceSheet)
     
-    async def __get_key_metrics(self, session: aiohttp.ClientSession, ticker: str) -> str:
+    async def __get_key_metrics(self, session: Transport, ticker: str) -> KeyMetricsTTM:
         """
         Retrieves the key metrics TTM (Trailing Twelve Months) for a given ticker.
 
         Parameters:
-        - `session` (aiohttp.ClientSession): The aiohttp session to use for making requests.
+        - `session` (Transport): The transport to use for making requests.
         - `ticker` (str): The stock ticker symbol.
 
         Returns:
-        - `str`: The key metrics TTM data in JSON format.
+        - `KeyMetricsTTM`: The key metrics, or None if unavailable.
         """
-        async with session.get(f'https://financialmodelingprep.com/api/v3/key-metrics-ttm/{ticker}?period=quarter&apikey={self.key}') as response:
-            try:
-                return await response.json()
-            except Exception as e:
-                pass
+        return decode_one(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/key-metrics-ttm/{ticker}?period=quarter&apikey={self.key}'), KeyMetricsTTM)
     
-    async def __get_profile(self, session: aiohttp.ClientSession, ticker: str) -> str:
+    async def __get_profile(self, session: Transport, ticker: str) -> Profile:
         """
         Retrieves the company profile for a given ticker.
 
         Parameters:
-        - `session` (aiohttp.ClientSession): The aiohttp session to use for making requests.
+        - `session` (Transport): The transport to use for making requests.
         - `ticker` (str): The stock ticker symbol.
 
         Returns:
-        - `str`: The company profile data in JSON format.
+        - `Profile`: The company profile, or None if unavailable.
         """
-        async with session.get(f'https://financialmodelingprep.com/api/v3/profile/{ticker}?period=quarter&apikey={self.key}') as response:
-            try:
-                return await response.json()
-            except Exception as e:
-                pass
+        return decode_one(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/profile/{ticker}?period=quarter&apikey={self.key}'), Profile)
     
-    async def __get_cashflow(self, session: aiohttp.ClientSession, ticker: str) -> str:
+    async def __get_cashflow(self, session: Transport, ticker: str) -> list[CashFlow]:
         """
         Retrieves the cash flow statement for a given ticker.
 
         Parameters:
-        - `session` (aiohttp.ClientSession): The aiohttp session to use for making requests.
+        - `session` (Transport): The transport to use for making requests.
         - `ticker` (str): The stock ticker symbol.
 
         Returns:
-        - `str`: The cash flow data in JSON format.
+        - `list[CashFlow]`: The cash flow statements (most recent first), or None if unavailable.
         """
-        async with session.get(f'https://financialmodelingprep.com/api/v3/cash-flow-statement/{ticker}?period=annual&limit=4&apikey={self.key}') as response:
-            try:
-                return await response.json()
-            except Exception as e:
-                pass
+        return decode_statements(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/cash-flow-statement/{ticker}?period=annual&limit=4&apikey={self.key}'), CashFlow)
     
     async def __get_floats(self) -> None:
         """
@@ -139,31 +147,12 @@ class AsyncScreener2:
         Returns:
         - `None`
         """
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://financialmodelingprep.com/api/v4/shares_float/all?apikey={self.key}") as response:
-                try:
-                    self.floats = await response.json()
-                except Exception as e:
-                    print(f"Error fetching floats: {e}")
-                    self.floats = None
+        async with create_transport(self.transport, metrics=self.metrics) as session:
+            self.floats = decode_floats(await session.get_bytes(f"https://financialmodelingprep.com/api/v4/shares_float/all?apikey={self.key}"))
+        if self.floats is None:
+            print("Error fetching floats.")
+            self.floats = {}
             
-    def __find_float_from_ticker(self, ticker) -> int:
-        """
-        Finds the float (outstanding shares) for a given ticker.
-
-        Parameters:
-        - `ticker` (str): The stock ticker symbol.
-
-        Returns:
-        - `int`: The number of outstanding shares, or 0 if not found.
-        """
-        for v in self.floats:
-            if v['symbol'] == ticker:
-                return v['outstandingShares']
-        
-        return 0 # if ticker can't be found, return 0
-    
-    
     async def __handle_screener2(self, tickers: list[str], debug: bool = False) -> None:
         """
         Handles the screening process for a batch of tickers.
@@ -175,66 +164,57 @@ class AsyncScreener2:
         Returns:
         - `None`
         """
-        async with aiohttp.ClientSession() as session:
+        async with create_transport(self.transport, metrics=self.metrics) as session:
             tasks = [self.__get_data(session, ticker) for ticker in tickers]
             results = await asyncio.gather(*tasks)
             for ticker, (profile, key_metrics_ttm, balance_sheet, cashflow) in zip(tickers, results):
-                res = {"Name":str(),"NCAV Ratio":"N/A", "P/aFCF Ratio":"N/A", "EV/aFCF":"N/A", "P/TBV Ratio":"N/A", "isAdded": False}
-                try:
-                    current_assets = int(balance_sheet[0]["totalCurrentAssets"])
-                    total_liabilities = int(balance_sheet[0]["totalLiabilities"])
-                    market_cap = int(key_metrics_ttm[0]["marketCapTTM"])
-                    ncav = current_assets - total_liabilities
-                    ratio = round(market_cap / ncav, 1)
-                    if ratio > 0 and ratio < 2.5:
-                        res["isAdded"] = True
-                        res["NCAV Ratio"] = ratio
-                    
-                    free_float = self.__find_float_from_ticker(ticker)
-                    y_0_ttm = key_metrics_ttm[0]['freeCashFlowPerShareTTM'] * free_float
-                    rest = [i['freeCashFlow'] for i in cashflow]
-                    total = y_0_ttm + sum(rest)
-                    five_year_fcf_average = total / 5 
-                    pfcfRatio = market_cap/five_year_fcf_average
-                    
-                    res["P/aFCF Ratio"] = round(pfcfRatio, 1)
-                    if pfcfRatio > 0 and pfcfRatio < 10:
-                        res["isAdded"] = True
-                    
-                    negCashflow = 0
-                    for i in rest:
-                        if i < 0:
-                            negCashflow += 1
-                    if negCashflow > 2:
-                        continue
-
-                    ev = key_metrics_ttm[0]["enterpriseValueTTM"]
-                    res["EV"] = round(ev, 1)
-                    evFCF = ev/five_year_fcf_average
-                    
-                    if evFCF > 1 and evFCF < 5:
-                        res["isAdded"] = True
-                        res["EV/aFCF"] = round(evFCF, 1)
-                    
-                    pTBV = market_cap/key_metrics_ttm[0]['tangibleAssetValueTTM']
-                    
-                    if pTBV > 0 and pTBV < 1:
-                        res["isAdded"] = True
-                        res["P/TBV Ratio"] = round(pTBV, 1)
-                    
-                    net_debt = balance_sheet[0]["netDebt"]
-                    if net_debt > 0:
-                        res["isAdded"] = False
-                    
-                    for bli in self.industry_blacklist:
-                        if bli in profile[0]['industry']:
-                            self.industry_blacklist_tickers.append(ticker)
-                    if profile[0]["country"] != "CN" and profile[0]["country"] != "HK":
-                        res["Name"] = profile[0]["companyName"]
-                        res["Country"] = profile[0]["country"]
-                        self.results[ticker] = res
-                except Exception as e:
-                    pass
+                if profile is None or key_metrics_ttm is None or key_metrics_ttm.market_cap is None or balance_sheet is None or cashflow is None:
+                    continue
+                res = {"Name":str(),"NCAV Ratio":None, "P/aFCF Ratio":None, "EV/aFCF":None, "P/TBV Ratio":None, "isAdded": False}
+                market_cap = key_metrics_ttm.market_cap
+                ncav = balance_sheet[0].total_current_assets - balance_sheet[0].total_liabilities
+                y_0_ttm = key_metrics_ttm.fcf_per_share * self.floats.get(ticker, 0)
+                rest = [i.free_cash_flow for i in cashflow]
+                five_year_fcf_average = (y_0_ttm + sum(rest)) / 5
+                if ncav == 0 or five_year_fcf_average == 0 or key_metrics_ttm.tangible_asset_value == 0:
+                    continue
+                
+                ratio = round(market_cap / ncav, 1)
+                if ratio > 0 and ratio < 2.5:
+                    res["isAdded"] = True
+                    res["NCAV Ratio"] = ratio
+                
+                pfcfRatio = market_cap/five_year_fcf_average
+                res["P/aFCF Ratio"] = round(pfcfRatio, 1)
+                if pfcfRatio > 0 and pfcfRatio < 10:
+                    res["isAdded"] = True
+                
+                negCashflow = len([i for i in rest if i < 0])
+                if negCashflow > 2:
+                    continue
+
+                ev = key_metrics_ttm.enterprise_value
+                res["EV"] = round(ev, 1)
+                evFCF = ev/five_year_fcf_average
+                if evFCF > 1 and evFCF < 5:
+                    res["isAdded"] = True
+                    res["EV/aFCF"] = round(evFCF, 1)
+                
+                pTBV = market_cap/key_metrics_ttm.tangible_asset_value
+                if pTBV > 0 and pTBV < 1:
+                    res["isAdded"] = True
+                    res["P/TBV Ratio"] = round(pTBV, 1)
+                
+                if balance_sheet[0].net_debt > 0:
+                    res["isAdded"] = False
+                
+                for bli in self.industry_blacklist:
+                    if bli in profile.industry:
+                        self.industry_blacklist_tickers.append(ticker)
+                if profile.country != "CN" and profile.country != "HK":
+                    res["Name"] = profile.company_name
+                    res["Country"] = profile.country
+                    self.results.add(ticker, res)
 
     
     def check_pafcf(self, debug:bool=False) -> None:
@@ -247,11 +227,9 @@ class AsyncScreener2:
         Returns:
         - `None`
         """
-        bad_pe = [key for key, val in self.results.items() if val['P/aFCF Ratio'] > 10]
-        for bad in bad_pe:
-            self.results.pop(bad, None)
+        removed = self.results.keep(~(self.results.numeric('P/aFCF Ratio') > 10))
         if debug:
-            print(f"{len(bad_pe)} removed for P/aFCF Ratio")
+            print(f"{removed} removed for P/aFCF Ratio")
 
 
     def clean_results(self, debug:bool=False) -> None:
@@ -264,11 +242,11 @@ class AsyncScreener2:
         Returns:
         - `None`
         """
-        to_remove = [key for key, val in self.results.items() if not val["isAdded"]]
+        removed = self.results.keep(self.results["isAdded"])
         for i in self.industry_blacklist_tickers:
-            to_remove.append(i)
-        for tr in to_remove:
-            self.results.pop(tr, None)
+            removed += self.results.remove(i)
+        if debug:
+            print(f"{removed} removed during cleaning")
 
     
     def __calculate_runtime(self, number_of_batches:int, batch_size:int) -> int:
@@ -299,7 +277,8 @@ class AsyncScreener2:
         - `None`
         """
         print("Setting up the screener...")
-        await self.__get_floats()
+        with section("floats"):
+            await self.__get_floats()
         tickers_arr = [i for sublist in self.tickers.values() for i in sublist]
         remaining = len(tickers_arr)
         print(f"Screening {remaining} stocks...\nEstimated run time: ~{self.__calculate_runtime(remaining//batch_size, batch_size)+1} minute(s)...\n")
@@ -308,22 +287,28 @@ class AsyncScreener2:
         tot = remaining//batch_size
         tot += 1
         sleep(61)
+        self.metrics.pause(61)
+        start_run = perf_counter()
         for i in range(0, len(tickers_arr), batch_size):
             is_middle = i == len(tickers_arr)//2
             start = datetime.now()
-            await self.__handle_screener2(tickers=tickers_arr[i:i+batch_size], debug=is_middle)
+            with section("batch"):
+                await self.__handle_screener2(tickers=tickers_arr[i:i+batch_size], debug=is_middle)
             screened+=len(tickers_arr[i:i+batch_size])
             remaining -= batch_size
             rem = 61-(datetime.now()-start).seconds
             if rem > 0 and b != tot:
                 print(f"Batch {b}/{tot} complete. Waiting {rem} seconds for next batch (API limit reached).")
                 sleep(rem)
+                self.metrics.pause(rem)
                 b+=1
             else:
                 print(f"Batch {b}/{tot} complete.")
         
-        self.clean_results()
-        self.check_pafcf(True)
+        with section("screen"):
+            self.clean_results()
+            self.check_pafcf(True)
+        self.metrics.phase("screen", screened, len(self.results), sum(i["requests"] for i in self.metrics.endpoints.values()), perf_counter() - start_run)
         print(f"{screened} stocks screened.")
         print(f"{len(self.results)} stocks remaining after screening.")
     
@@ -339,10 +324,9 @@ class AsyncScreener2:
         - `None`
         """
         if len(self.results) == 0:
-            print(f'ERROR: results dictionary is empty. Execute `await AsyncScreener2.run_async()` to screen the stocks. If you are still seeing this after running `Screener.run()`, there are no new stocks from the previous execution.')
+            print(f'ERROR: results table is empty. Execute `await AsyncScreener2.run_async()` to screen the stocks. If you are still seeing this after running `Screener.run()`, there are no new stocks from the previous execution.')
             return None
-        df = pd.DataFrame.from_dict(self.results, orient='index')
-        df.to_excel(file_path)
+        self.results.to_frame().to_excel(file_path)
         print(f"File saved to {file_path}")
     
     def update_google_sheet(self, debug:bool=False) -> None:
@@ -354,5 +338,6 @@ class AsyncScreener2:
             print(f"{starting_size - cleaned} tickers removed (previously present in google sheet).")
         
         self.sheet_client.add_row_data_v2(self.results)
+        self.history.append(self.results)
         if debug:
             print("Google Sheet updated.")
\ No newline at end of file
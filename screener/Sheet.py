@@ -2,6 +2,8 @@ from datetime import datetime
 import gspread
 from time import sleep
 import re
+from screenerV3.profiling import profiled
+from screenerV3.table import Table
 
 class Sheet:
     def __init__(self, sheet_path:str = "./service_account.json", file_name:str = 'Screener') -> None:
@@ -63,10 +65,11 @@ class Sheet:
 
         print("data added to spreadsheet.")
     
-    def add_row_data_v2(self, data: dict) -> None:
+    @profiled("sheet.add_row_data_v2")
+    def add_row_data_v2(self, data: Table) -> None:
         sheet = self.__get_worksheet_names()[-1]
         itr = 2
-        for k, v in data.items():
+        for k, v in data.rows(na="N/A"):
             payload = [k, str(v['Name']), v["NCAV Ratio"], v["EV/aFCF"], v["P/TBV Ratio"], v["EV"], v["P/aFCF Ratio"],str(v['Country'])]
             sheet.append_row(values= payload, table_range=f'A{itr}:G{itr}')
             itr+= 1
@@ -131,6 +134,7 @@ class Sheet:
         except:
             print("Unable to add new tab. Tab already exists.")
     
+    @profiled("sheet.create_new_tab_v2")
     def create_new_tab_v2(self) -> None:
         try:
             name = f"{self.today.day}-{self.month_dict[self.today.month]}-{self.today.year}"
@@ -152,6 +156,7 @@ class Sheet:
         except:
             return []
     
+    @profiled("sheet.get_all_previously_seen_tickers")
     def get_all_previously_seen_tickers(self) -> list[str]:
         '''
         Returns all tickers seen in the last year (52 weeks).
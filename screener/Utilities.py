@@ -12,32 +12,6 @@ def process_tickers(path):
     - `dict`: A dictionary containing processed tickers.
     """
     t = read_json_file(path)
-    clean = {
-        'Japan': '.T',
-        'Canada': '.TO',
-        'Austria': '.VI',
-        'Belgium': '.BR',
-        'Estonia': '.TL',
-        'France': '.PA',
-        'Germany': '.DE',
-        'Greece': '.AT',
-        'Hungary': '.BD',
-        'Italy': '.MI',
-        'Latvia': '.RG',
-        'Lithuania': '.VS',
-        'Netherlands': '.AS',
-        'Poland': '.WS',
-        'Portugal': '.LS',
-        'Romania': '.RO',
-        'Finland': '.HE',
-        'Spain': '.MC',
-        'Sweden': '.ST',
-        'Switzerland': '.SW',
-        'United Kingdom': '.L',
-        'New Zealand': '.NZ',
-        'Czech Republic': '.PR',
-        'USA': ''}
-
     return t
 
 
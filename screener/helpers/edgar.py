@@ -1,8 +1,15 @@
+import json
 import requests
 
 OperatingExpenses = f"https://data.sec.gov/api/xbrl/frames/us-gaap/OperatingExpenses/USD/CY2022.json"
 NetCashProvidedByUsedInOperatingActivities = f"https://data.sec.gov/api/xbrl/frames/us-gaap/NetCashProvidedByUsedInOperatingActivities/USD/CY2022.json"
 
+def frame_url(concept: str, period: str, unit: str = "USD") -> str:
+    """
+    Returns the XBRL frames URL of a us-gaap concept for one calendar period (e.g. `CY2023` for a year, `CY2023Q4I` for an instant).
+    """
+    return f"https://data.sec.gov/api/xbrl/frames/us-gaap/{concept}/{unit}/{period}.json"
+
 def convert_cik_list(file_path: str) -> dict:
     result_dict = {}
     
@@ -14,4 +21,12 @@ def convert_cik_list(file_path: str) -> dict:
                 value = int(parts[1].strip())
                 result_dict[ticker] = value
     
-    return result_dict
\ No newline at end of file
+    return result_dict
+
+def convert_company_tickers(file_path: str) -> dict:
+    """
+    Converts the SEC `company_tickers.json` list (keyed by row number) into a ticker -> CIK dict.
+    """
+    with open(file_path, 'r') as file:
+        rows = json.load(file)
+    return {row["ticker"].strip().upper(): int(row["cik_str"]) for row in rows.values()}
@@ -0,0 +1,124 @@
+from time import perf_counter
+import argparse
+import json
+import numpy as np
+from .screens import ScreenDefinition, load_screen
+from .snapshots import SNAPSHOTS_DIR, SnapshotStore
+
+
+class Backtest:
+    """
+    Evaluates screens over every archived snapshot at once, with the forward returns of the stored prices.
+
+    The snapshots are stacked into one table (see `SnapshotStore.load`), so a screen is a single vectorized
+    evaluation over every date and ticker, and a forward return is a lookup of the same ticker's price some
+    snapshots later. No API calls are made.
+
+    As in `Sweep`, only rows for which every non-optional endpoint of the screen returned data are candidates.
+    Returns are measured on the profile price (`share_price`), archived for every fetched ticker, or on the
+    historical `price` in snapshots older than it. A ticker with no later price (delisted, or left out of the later
+    universe) has no return and is not in the means, so each date reports how many passing names were priced: a low
+    coverage means the return only counts the survivors.
+
+    Parameters:
+    - `store` (SnapshotStore): The snapshot archive.
+    - `start` (str): First date kept (`YYYY-MM-DD`). Defaults to the oldest.
+    - `end` (str): Last date kept. Defaults to the most recent.
+    """
+    def __init__(self, store: SnapshotStore, start: str = None, end: str = None) -> None:
+        self.table, self.dates, self.date, self.ticker = store.load(start, end)
+        # one key per row, consecutive for the snapshots of a ticker
+        _, self.code = np.unique(self.ticker, return_inverse=True)
+        self.keys = self.code.astype(np.int64) * max(len(self.dates), 1) + self.date
+        self.order = np.argsort(self.keys, kind="stable")
+        share_price = self.table.numeric("share_price")
+        self.price = np.where(np.isfinite(share_price), share_price, self.table.numeric("price"))
+
+    def forward_returns(self, horizon: int = 1) -> np.ndarray:
+        """
+        Returns, for every row, the return until the same ticker's snapshot `horizon` dates later (NaN if it has none,
+        or either snapshot has no price).
+        """
+        ret = np.full(len(self.keys), np.nan)
+        if not len(ret):
+            return ret
+        target = self.keys + horizon
+        later = self.order[np.minimum(np.searchsorted(self.keys[self.order], target), len(ret) - 1)]
+        # past the last date the key would be the next ticker's first snapshot
+        hit = (self.keys[later] == target) & (self.date + horizon < len(self.dates))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret[hit] = (self.price[later] / self.price - 1)[hit]
+        return ret
+
+    def run(self, definition: ScreenDefinition, horizon: int = 1, top: int = 10) -> list[dict]:
+        """
+        Backtests a screen.
+
+        Parameters:
+        - `definition` (ScreenDefinition): The screen.
+        - `horizon` (int): Snapshots ahead the returns are measured at. Default is 1 (the next snapshot).
+        - `top` (int): Ranked tickers listed per date. Default is 10.
+
+        Returns:
+        - `list[dict]`: Per date (oldest first): the pass count, how many passing tickers have a forward return
+          (`covered`), the mean forward return of the passing tickers and of every candidate (the benchmark), and the
+          top ranked tickers.
+        """
+        table = self.table
+        candidates = definition.complete(table)
+        passed = candidates & definition.mask(table)
+        returns = self.forward_returns(horizon)
+        n = len(self.dates)
+
+        def mean(mask: np.ndarray) -> np.ndarray:
+            valid = mask & np.isfinite(returns)
+            count = np.bincount(self.date[valid], minlength=n)
+            with np.errstate(invalid="ignore"):
+                return np.where(count > 0, np.bincount(self.date[valid], weights=returns[valid], minlength=n) / np.maximum(count, 1), np.nan)
+
+        passed_mean, benchmark = mean(passed), mean(candidates)
+        counts = np.bincount(self.date[passed], minlength=n)
+        covered = np.bincount(self.date[passed & np.isfinite(returns)], minlength=n)
+        ranked = definition.evaluate(table, passed)
+        index = {date: i for i, date in enumerate(self.dates)}
+        tickers = [[] for _ in self.dates]
+        for key in ranked.tickers():
+            date, _, ticker = key.partition(":")
+            if len(tickers[index[date]]) < top:
+                tickers[index[date]].append(ticker)
+        return [{"date": date, "passed": int(counts[i]), "covered": int(covered[i]), "return": _float(passed_mean[i]), "benchmark": _float(benchmark[i]),
+                 "tickers": tickers[i]} for i, date in enumerate(self.dates)]
+
+
+def _float(value) -> float:
+    return None if np.isnan(value) else round(float(value), 6)
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Backtests a screen over the archived snapshots, without any API calls.")
+    parser.add_argument("screen", help="Screen name (e.g. payback) or path to a screen YAML file.")
+    parser.add_argument("--snapshots", default=SNAPSHOTS_DIR, help="The snapshot archive.")
+    parser.add_argument("--start", default=None, help="First date (YYYY-MM-DD).")
+    parser.add_argument("--end", default=None, help="Last date (YYYY-MM-DD).")
+    parser.add_argument("--horizon", type=int, default=1, help="Snapshots ahead the forward returns are measured at.")
+    parser.add_argument("--top", type=int, default=10, help="Ranked tickers listed per date.")
+    parser.add_argument("--output", help="Writes the full results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    definition = load_screen(args.screen)
+    start = perf_counter()
+    backtest = Backtest(SnapshotStore(args.snapshots), args.start, args.end)
+    results = backtest.run(definition, args.horizon, args.top)
+    print(f"{len(results)} snapshots ({len(backtest.table.alive)} rows) evaluated in {perf_counter() - start:.2f}s.")
+    for res in results:
+        ret = "n/a" if res["return"] is None else f"{res['return']:+.2%}"
+        benchmark = "n/a" if res["benchmark"] is None else f"{res['benchmark']:+.2%}"
+        print(f"{res['date']}: {res['passed']} passed ({res['covered']} priced later), forward return {ret} (all {benchmark}). {' '.join(res['tickers'])}")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"File saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
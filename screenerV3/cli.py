@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import os
+from . import profiling
+from .history import RunHistory, SeenTickers
+from .screens import load_screen
+from .stages import RunStore, fetch_stage, live_stage, plan_stage, print_plan, publish_stage, screen_stage
+
+
+def _sheet(args, definition):
+    from .sheet import Sheet
+    return Sheet(sheet_path=args.sheet_path, file_name=args.sheet_name or definition.sheet_name)
+
+
+def _statements(args) -> list:
+    from .companyfacts import CompanyFacts
+    from .edgar import EdgarFrames
+    from .statements import StatementStore
+    ret = [StatementStore(args.bulk_store)] if args.bulk_store else []
+    ret += [CompanyFacts(args.companyfacts)] if args.companyfacts else []
+    return ret + [EdgarFrames(args.edgar_frames)] if args.edgar_frames else ret
+
+
+def _previously_seen(args, definition):
+    # the local run history and the sheet's tabs, which also hold what was published before the history existed
+    if args.all_tickers:
+        return None
+    return SeenTickers(RunHistory(definition.name), _sheet(args, definition))
+
+
+def _scheduled(args, definition, tickers: list[str]) -> list[str]:
+    # the tickers within the budget, likeliest passers first when the run may stop early (as `DefinitionScreener.run_async`)
+    early = (args.target is not None or args.time_limit is not None) and not args.file_order
+    if args.budget is None and not early:
+        return tickers
+    from .scheduler import RefreshScheduler
+    from .snapshots import SnapshotStore
+    scheduler = RefreshScheduler(definition, SnapshotStore())
+    tickers = scheduler.select(tickers, args.budget, debug=args.debug) if args.budget is not None else tickers
+    return scheduler.order(tickers) if early else tickers
+
+
+def _time_limit(args) -> float:
+    return args.time_limit * 60 if args.time_limit is not None else None
+
+
+def _snapshots(args):
+    from .snapshots import SnapshotStore
+    return None if args.no_snapshot else SnapshotStore()
+
+
+def _dry_run(args, definition, handler, tickers: list[str], seen, sheet: str = None) -> None:
+    print_plan(plan_stage(definition, tickers, handler, RunStore(definition.name), os.path.basename(args.tickers), exhaustive=args.exhaustive,
+                          resume=not args.fresh, prefilter=args.prefilter, statements=_statements(args), sheet=sheet,
+                          seen_from_sheet=seen is not None))
+
+
+def fetch(args) -> None:
+    from .utilities import Handler
+    definition = load_screen(args.screen)
+    handler = Handler(args.transport)
+    seen = _previously_seen(args, definition)
+    tickers = [t for v in handler.process_tickers(seen, args.tickers).values() for t in v]
+    tickers = _scheduled(args, definition, tickers)
+    if args.dry_run:
+        return _dry_run(args, definition, handler, tickers, seen)
+    asyncio.run(fetch_stage(definition, tickers, handler, RunStore(definition.name), os.path.basename(args.tickers),
+                            debug=args.debug, exhaustive=args.exhaustive, resume=not args.fresh, streaming=not args.sequential,
+                            prefilter=args.prefilter, statements=_statements(args), snapshots=_snapshots(args),
+                            target=args.target, time_limit=_time_limit(args)))
+
+
+def screen(args) -> None:
+    definition = load_screen(args.screen)
+    results = screen_stage(definition, RunStore(definition.name))
+    print(f"{len(results)} stocks passed '{definition.name}'.")
+
+
+def publish(args) -> None:
+    definition = load_screen(args.screen)
+    store = RunStore(definition.name)
+    sheet_client = None if args.no_sheet else _sheet(args, definition)
+    publish_stage(definition, store.load_results(), sheet_client=sheet_client, xlsx_path=args.xlsx, store=store,
+                  history=RunHistory(definition.name), debug=args.debug)
+
+
+def run(args) -> None:
+    if args.dry_run:
+        from .utilities import Handler
+        definition = load_screen(args.screen)
+        handler = Handler(args.transport)
+        seen = _previously_seen(args, definition)
+        tickers = _scheduled(args, definition, [t for v in handler.process_tickers(seen, args.tickers).values() for t in v])
+        return _dry_run(args, definition, handler, tickers, seen, "live" if args.live else None if args.no_sheet else "publish")
+    if not args.live:
+        fetch(args)
+        screen(args)
+        publish(args)
+        return
+    from .utilities import Handler
+    definition = load_screen(args.screen)
+    handler = Handler(args.transport)
+    sheet_client = _sheet(args, definition)
+    tickers = [t for v in handler.process_tickers(_previously_seen(args, definition), args.tickers).values() for t in v]
+    tickers = _scheduled(args, definition, tickers)
+    results = asyncio.run(live_stage(definition, tickers, handler, RunStore(definition.name), os.path.basename(args.tickers), sheet_client,
+                                     debug=args.debug, exhaustive=args.exhaustive, resume=not args.fresh,
+                                     prefilter=args.prefilter, statements=_statements(args), snapshots=_snapshots(args),
+                                     history=RunHistory(definition.name), target=args.target, time_limit=_time_limit(args)))
+    if args.xlsx:
+        publish_stage(definition, results, xlsx_path=args.xlsx)
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Runs the stages of a screen: fetch (network), screen (local) and publish (Sheets/XLSX).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def command(name: str, func, help: str) -> argparse.ArgumentParser:
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument("screen", help="Screen name (e.g. payback) or path to a screen YAML file.")
+        sub.add_argument("--debug", action="store_true", help="Prints progress.")
+        sub.add_argument("--profile", action="store_true", help=f"Profiles CPU and memory per stage and Sheets call into {profiling.PROFILE_DIR} (or set {profiling.PROFILE_ENV}=1).")
+        sub.set_defaults(func=func)
+        return sub
+
+    def fetch_args(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("--tickers", required=True, help="JSON file of tickers keyed by country, or a compiled universe (see screenerV3.universe).")
+        sub.add_argument("--transport", default=None, help="HTTP transport (aiohttp, httpx, or local for saved responses).")
+        sub.add_argument("--all-tickers", action="store_true", help="Does not skip tickers published within the last year (per the run history and the sheet).")
+        sub.add_argument("--exhaustive", action="store_true", help="Does not prune on parametric filters, for exact sweeps.")
+        sub.add_argument("--fresh", action="store_true", help="Starts a new fetch instead of resuming an unfinished one.")
+        sub.add_argument("--sequential", action="store_true", help="Runs each phase for the whole universe before the next.")
+        sub.add_argument("--bulk-store", default=None, help="Statement store to read balance sheets and cash flows from (see screenerV3.statements).")
+        sub.add_argument("--companyfacts", default=None, help="EDGAR facts store to read US balance sheets and cash flows from (see screenerV3.companyfacts).")
+        sub.add_argument("--edgar-frames", default=None, help="Saved SEC XBRL frames to read US balance sheets and cash flows from (see screenerV3.edgar).")
+        sub.add_argument("--no-snapshot", action="store_true", help="Does not archive the fetched fundamentals for backtests (see screenerV3.backtest).")
+        sub.add_argument("--budget", type=float, default=None, help="Only refreshes the tickers nearest the screen's thresholds that fit in this many API calls (see screenerV3.scheduler).")
+        sub.add_argument("--file-order", action="store_true", help="With --target or --time-limit, fetches in universe file order instead of likeliest passers first (per the last snapshots).")
+        sub.add_argument("--target", type=int, default=None, help="Stops once this many stocks passed (streaming only).")
+        sub.add_argument("--time-limit", type=float, default=None, help="Stops after this many minutes (streaming only).")
+        sub.add_argument("--dry-run", action="store_true", help="Prints the expected API calls, cache hits, run time and Sheets calls instead of running.")
+        sub.add_argument("--prefilter", action="store_true", help="Drops tickers that bulk quotes and key metrics rule out before the per-ticker calls (may drop names that pass on fresh data).")
+
+    def publish_args(sub: argparse.ArgumentParser, sheet_only: bool = False) -> None:
+        sub.add_argument("--sheet-path", default="./service_account.json", help="Google service account file.")
+        sub.add_argument("--sheet-name", default=None, help="Google Sheet name. Defaults to the screen's sheet.")
+        if not sheet_only:
+            sub.add_argument("--no-sheet", action="store_true", help="Does not publish to Google Sheets.")
+            sub.add_argument("--xlsx", default=None, help="Also writes the results to this Excel file.")
+
+    sub = command("fetch", fetch, "Fetch the fundamentals of a screen (resumable).")
+    fetch_args(sub)
+    publish_args(sub, sheet_only=True)
+    command("screen", screen, "Screen the fetched fundamentals.")
+    publish_args(command("publish", publish, "Publish the screened results."))
+    sub = command("run", run, "Fetch, screen and publish.")
+    fetch_args(sub)
+    publish_args(sub)
+    sub.add_argument("--live", action="store_true", help="Publishes passing names to the sheet while fetching (streaming only).")
+
+    args = parser.parse_args(argv)
+    profiling.start() if args.profile else profiling.start_from_env()
+    try:
+        args.func(args)
+    finally:
+        profiling.finish()
+
+
+if __name__ == "__main__":
+    main()
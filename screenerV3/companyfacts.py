@@ -0,0 +1,210 @@
+from datetime import date, datetime
+import argparse
+import json
+import os
+import re
+import shutil
+import zipfile
+import numpy as np
+from .edgar import CONCEPTS, EdgarFrames, _period_end, _period_key
+from .statements import recent
+from .symbols import SymbolIndex
+
+FACTS_DIR = "./data/edgar/companyfacts"
+
+_MEMBER = re.compile(r"^CIK(\d{10})\.json$")
+
+# days in a duration fact for it to be a calendar year or quarter, as the SEC frames are aligned
+_YEAR_DAYS = (335, 395)
+_QUARTER_DAYS = (80, 100)
+
+
+def _day(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def calendar_period(start: str, end: str) -> str:
+    """
+    Returns the frame period (`CY2023`, `CY2023Q2`, `CY2023Q4I`) a fact falls into, or None.
+
+    Instants go to the nearest calendar quarter end. Durations of about a year or a quarter go to the calendar
+    year or quarter holding most of them; other durations (half years, year-to-date) have no period.
+    """
+    end = _day(end)
+    if start is None:
+        quarters = [(date(end.year - 1, 12, 31), end.year - 1, 4)] + [(date(end.year, 3 * q, 30 if q in (2, 3) else 31), end.year, q) for q in range(1, 5)]
+        _, year, quarter = min(quarters, key=lambda i: abs((i[0] - end).days))
+        return f"CY{year}Q{quarter}I"
+    start = _day(start)
+    days = (end - start).days
+    middle = start.toordinal() + days // 2
+    middle = date.fromordinal(middle)
+    if _YEAR_DAYS[0] <= days <= _YEAR_DAYS[1]:
+        return f"CY{middle.year}"
+    if _QUARTER_DAYS[0] <= days <= _QUARTER_DAYS[1]:
+        return f"CY{middle.year}Q{(middle.month - 1) // 3 + 1}"
+    return None
+
+
+class CompanyFacts(EdgarFrames):
+    """
+    The SEC `companyfacts.zip` archive as a statements source for US tickers.
+
+    The archive holds every XBRL fact of every filer, one JSON member per CIK. `ingest` streams the members
+    one at a time and keeps the `CONCEPTS` read by `EdgarFrames`, each fact filed to its calendar period.
+    The result is a compact store under `root` (`.npy` columns sorted by concept, period and CIK, with the
+    filing date of each value), read back as frames, so the statements are built exactly like `EdgarFrames`.
+
+    Restated values are all kept: a frame holds the latest value filed, or the latest filed on or before
+    `as_of` for a point-in-time view.
+
+    Parameters:
+    - `root` (str): The store directory. Default is `./data/edgar/companyfacts`.
+    - `cik_path` (str): A ticker -> CIK list to use instead of the shared symbol index.
+    - `tickers_path` (str): An SEC `company_tickers.json` to use instead of the shared symbol index.
+    - `as_of` (str): Only read values filed on or before this date (`YYYY-MM-DD`). Default is None (latest).
+    - `symbols` (SymbolIndex): The symbol index. Default is `symbols.shared()`.
+    """
+    def __init__(self, root: str = FACTS_DIR, cik_path: str = None, tickers_path: str = None, as_of: str = None, symbols: SymbolIndex = None) -> None:
+        if symbols is None and (cik_path or tickers_path):
+            symbols = SymbolIndex.from_sources(cik_path, tickers_path, None)
+        super().__init__(root, symbols=symbols)
+        self.as_of = int(as_of.replace("-", "")) if as_of else None
+        self.__columns = None
+        self.__frames = {}
+        self.__periods = {}
+
+    def ingest(self, path: str, concepts: list[str] = None) -> int:
+        """
+        Streams a `companyfacts.zip` archive into the store, replacing it.
+
+        Parameters:
+        - `path` (str): The archive.
+        - `concepts` (list[str]): The us-gaap concepts to keep. Default is `CONCEPTS`.
+
+        Returns:
+        - `int`: The facts written.
+        """
+        concepts = list(concepts or CONCEPTS)
+        index = {concept: i for i, concept in enumerate(concepts)}
+        chunks = {"concept": [], "period": [], "cik": [], "filed": [], "val": []}
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.infolist():
+                match = _MEMBER.match(os.path.basename(member.filename))
+                if match is None:
+                    continue
+                with archive.open(member) as file:
+                    payload = json.load(file)
+                rows = _facts(payload, index)
+                if rows:
+                    cik = int(payload.get("cik") or match.group(1))
+                    for name, values in zip(("concept", "period", "filed", "val"), zip(*rows)):
+                        chunks[name].append(np.array(values))
+                    chunks["cik"].append(np.full(len(rows), cik, dtype=np.int64))
+        columns = {name: np.concatenate(values) if values else np.array([]) for name, values in chunks.items()}
+        periods = sorted(set(columns["period"].tolist()))
+        period_index = {period: i for i, period in enumerate(periods)}
+        columns["concept"] = columns["concept"].astype(np.int16)
+        columns["period"] = np.array([period_index[i] for i in columns["period"].tolist()], dtype=np.int32)
+        columns["cik"] = columns["cik"].astype(np.int64)
+        columns["filed"] = columns["filed"].astype(np.int32)
+        columns["val"] = columns["val"].astype(float)
+        order = np.lexsort((columns["filed"], columns["cik"], columns["period"], columns["concept"]))
+        tmp = f"{self.root}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), values[order])
+        with open(os.path.join(tmp, "meta.json"), 'w') as file:
+            json.dump({"source": os.path.basename(path), "concepts": concepts, "periods": periods, "rows": len(order),
+                       "columns": list(columns), "ingested": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, file, indent=2)
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.replace(tmp, self.root)
+        self.__columns = None
+        self.__frames = {}
+        self.__periods = {}
+        return len(order)
+
+    def __load(self) -> dict:
+        if self.__columns is None:
+            path = os.path.join(self.root, "meta.json")
+            if not os.path.exists(path):
+                self.__columns = {"meta": {"concepts": [], "periods": []}}
+                return self.__columns
+            with open(path, 'r') as file:
+                meta = json.load(file)
+            self.__columns = {name: np.load(os.path.join(self.root, f"{name}.npy"), mmap_mode="r") for name in meta["columns"]}
+            self.__columns["meta"] = meta
+            # one key per (concept, period), so a frame is a contiguous slice
+            self.__columns["key"] = np.asarray(self.__columns["concept"], dtype=np.int64) * len(meta["periods"]) + self.__columns["period"]
+        return self.__columns
+
+    def periods(self, concept: str) -> list[str]:
+        """
+        Returns the stored periods of a concept, most recent first.
+        """
+        if concept not in self.__periods:
+            columns = self.__load()
+            meta = columns["meta"]
+            ret = []
+            if concept in meta["concepts"]:
+                first = meta["concepts"].index(concept) * len(meta["periods"])
+                keys = columns["key"]
+                stored = np.unique(keys[np.searchsorted(keys, first):np.searchsorted(keys, first + len(meta["periods"]))]) - first
+                ret = [meta["periods"][i] for i in stored.tolist()]
+            self.__periods[concept] = sorted(ret, key=_period_key, reverse=True)
+        return self.__periods[concept]
+
+    def frame(self, concept: str, period: str) -> dict[int:float]:
+        """
+        Returns the values of a concept for one calendar period keyed by CIK, the latest filed (on or before `as_of`).
+        """
+        key = (concept, period)
+        if key not in self.__frames:
+            columns = self.__load()
+            meta = columns["meta"]
+            values = {}
+            if concept in meta["concepts"] and period in meta["periods"]:
+                target = meta["concepts"].index(concept) * len(meta["periods"]) + meta["periods"].index(period)
+                start, stop = np.searchsorted(columns["key"], [target, target + 1])
+                ciks, filed, val = columns["cik"][start:stop], columns["filed"][start:stop], columns["val"][start:stop]
+                if self.as_of is not None:
+                    keep = filed <= self.as_of
+                    ciks, val = ciks[keep], val[keep]
+                # rows are sorted by filing date within a CIK, so the last one wins
+                values = dict(zip(np.asarray(ciks).tolist(), np.asarray(val).tolist()))
+            self.__frames[key] = values
+        return self.__frames[key]
+
+    def _recent(self, period: str, kind: str) -> bool:
+        # as of the point-in-time date, not today
+        return recent(_period_end(period), kind, datetime.strptime(str(self.as_of), "%Y%m%d") if self.as_of is not None else None)
+
+
+def _facts(payload: dict, index: dict) -> list[tuple]:
+    # (concept index, period, filed as YYYYMMDD, value) of one company's kept facts
+    ret = []
+    facts = payload.get("facts", {}).get("us-gaap", {}) if isinstance(payload, dict) else {}
+    for concept, i in index.items():
+        for fact in facts.get(concept, {}).get("units", {}).get("USD", []):
+            if not isinstance(fact.get("val"), (int, float)) or not fact.get("end") or not fact.get("filed"):
+                continue
+            try:
+                period = calendar_period(fact.get("start"), fact["end"])
+                filed = int(fact["filed"].replace("-", ""))
+            except ValueError:
+                continue
+            if period is not None and (fact.get("start") is None) == CONCEPTS.get(concept, fact.get("start") is None):
+                ret.append((i, period, filed, float(fact["val"])))
+    return ret
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingests the SEC companyfacts.zip archive into the local EDGAR facts store.")
+    parser.add_argument("path", help="The companyfacts.zip archive (https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip).")
+    parser.add_argument("--root", default=FACTS_DIR, help="The facts store directory.")
+    args = parser.parse_args(argv)
+    print(f"{CompanyFacts(args.root).ingest(args.path)} facts ingested.")
+
+
+if __name__ == "__main__":
+    main()
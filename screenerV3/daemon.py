@@ -0,0 +1,202 @@
+from datetime import datetime
+from time import perf_counter, time
+import argparse
+import asyncio
+import os
+import signal
+import numpy as np
+from .fundamentals import SCHEMA, FundamentalsFetcher, empty_fundamentals
+from .planner import PhasePlanner
+from .prefilter import Prefilter
+from .screens import ScreenDefinition, load_screen
+from .snapshots import SnapshotStore
+from .stages import RunStore
+from .table import Table
+
+# column of the fundamentals holding when each ticker was last refreshed (seconds since the epoch)
+REFRESHED = "refreshed"
+
+
+class TrickleRefresher:
+    """
+    Keeps a screen's fundamentals fresh by refreshing a few tickers at a time, at a steady request rate.
+
+    Instead of one weekly burst against the rate limit, the daemon loops over the universe in small batches, the least
+    recently refreshed tickers first, and paces itself to `rate` requests per minute. Each batch is fetched like a run
+    (same phases and filters) and merged into the screen's run store, so `cli screen` and `cli publish` are instant
+    local computations at any time.
+
+    The store is saved after every batch, with the refresh time of each ticker, so a stopped daemon resumes with the
+    stalest tickers. SIGINT and SIGTERM finish the current batch, save and exit. Once every ticker has been refreshed
+    since the pass started, the fundamentals are archived as a snapshot and the next pass starts.
+
+    Parameters:
+    - `definition` (ScreenDefinition): The screen.
+    - `tickers` (list[str]): The universe.
+    - `handler` (Handler): The FMP request handler (use the `local` transport to run against saved responses).
+    - `store` (RunStore): The screen's run store.
+    - `universe` (str): Name of the universe, used for planner statistics.
+    - `rate` (float): Requests per minute, a fraction of the plan's limit. Default is 100.
+    - `batch` (int): Tickers per batch. Default is 25.
+    - `min_age` (float): Days before a ticker is refreshed again; the daemon idles when none is due. Default is 7.
+    - `snapshots` (SnapshotStore): Where each full pass is archived. Defaults to None.
+    - `prefilter` (bool): If True, drops tickers on bulk values before the per-ticker calls (see
+      `stages.fetch_stage`). Default is False.
+    - `debug` (bool): If True, prints each batch. Default is False.
+    """
+    def __init__(self, definition: ScreenDefinition, tickers: list[str], handler, store: RunStore, universe: str, rate: float = 100,
+                 batch: int = 25, min_age: float = 7, snapshots: SnapshotStore = None, prefilter: bool = False, debug: bool = False) -> None:
+        self.definition = definition
+        self.tickers = tickers
+        self.handler = handler
+        self.store = store
+        self.universe = universe
+        self.rate = rate
+        self.batch = batch
+        self.min_age = min_age
+        self.snapshots = snapshots
+        self.debug = debug
+        self.fetcher = FundamentalsFetcher(handler, prefilter=Prefilter(definition) if prefilter else None)
+        self.planner = PhasePlanner(definition.name, f"{universe}-trickle", metrics=self.fetcher.metrics)
+        self.table = self.__load()
+        self.__stop = None
+
+    def __load(self) -> Table:
+        table = self.store.load_fundamentals() if os.path.exists(self.store.fundamentals_path) else empty_fundamentals([])
+        table.add_column(REFRESHED)
+        known = set(table.all_tickers().tolist())
+        for k in self.tickers:
+            if k not in known:
+                table.add(k)
+        self.store.update_manifest(screen=self.definition.name, universe=f"{self.universe}-trickle", exhaustive=False, fetched=_now())
+        return table
+
+    def due(self, now: float = None) -> list[str]:
+        """
+        Returns the next batch: the least recently refreshed tickers of the universe (never refreshed first) that are
+        at least `min_age` days old.
+        """
+        now = now or time()
+        rows = self.table.index(self.tickers)
+        refreshed = self.table.numeric(REFRESHED, rows)
+        age = np.where(np.isnan(refreshed), np.inf, now - refreshed)
+        order = np.argsort(-age, kind="stable")
+        order = order[age[order] >= self.min_age * 86400][:self.batch]
+        return [self.tickers[i] for i in order]
+
+    async def refresh(self, session, tickers: list[str]) -> int:
+        """
+        Fetches a batch and merges it into the fundamentals. A ticker keeps only the values of its last refresh, and is
+        removed if it failed the screen's filters.
+
+        Returns:
+        - `int`: The requests sent.
+        """
+        sent = self.fetcher.requests_sent
+        batch = empty_fundamentals(tickers)
+        await self.planner.execute(self.fetcher.phases(self.definition.endpoints, self.definition.optional), self.definition.steps(),
+                                   session, batch, lambda: self.fetcher.requests_sent)
+        now = time()
+        for k in tickers:
+            self.table.add(k, {**{name: batch.get(k, name) for name in SCHEMA}, REFRESHED: now})
+            if k not in batch:
+                self.table.remove(k)
+        return self.fetcher.requests_sent - sent
+
+    def stop(self) -> None:
+        """
+        Asks the daemon to exit once the current batch is saved.
+        """
+        if self.__stop is not None:
+            self.__stop.set()
+
+    def __handle_signals(self) -> dict:
+        # returns the previous handlers, to restore when the daemon exits
+        loop = asyncio.get_running_loop()
+        ret = {}
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                ret[sig] = signal.signal(sig, lambda *args: loop.call_soon_threadsafe(self.stop))
+            except ValueError:
+                # not the main thread
+                pass
+        return ret
+
+    async def __wait(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self.__stop.wait(), timeout=max(seconds, 0))
+        except asyncio.TimeoutError:
+            pass
+
+    def __passed(self, started: float) -> bool:
+        refreshed = self.table.numeric(REFRESHED, self.table.index(self.tickers))
+        return bool(len(refreshed)) and not (np.isnan(refreshed) | (refreshed < started)).any()
+
+    async def run(self, max_batches: int = None) -> int:
+        """
+        Refreshes batches until stopped (or `max_batches` batches are done).
+
+        Returns:
+        - `int`: The batches refreshed.
+        """
+        self.__stop = asyncio.Event()
+        handlers = self.__handle_signals()
+        done = 0
+        started = self.store.manifest().get("pass_started") or time()
+        try:
+            async with self.handler.session() as session:
+                while not self.__stop.is_set() and (max_batches is None or done < max_batches):
+                    tickers = self.due()
+                    if not tickers:
+                        await self.__wait(60)
+                        continue
+                    start = perf_counter()
+                    sent = await self.refresh(session, tickers)
+                    done += 1
+                    print(f"{_now()}: {len(tickers)} tickers refreshed, {sent} requests.") if self.debug else None
+                    if self.__passed(started):
+                        # every ticker is fresh: archive the pass, and request the bulk data (floats, key metrics) again
+                        if self.snapshots is not None:
+                            self.store.update_manifest(snapshot=self.snapshots.append(self.table, self.definition.name))
+                        self.fetcher.floats, self.fetcher.bulk_metrics = None, None
+                        started = time()
+                    self.store.save_fundamentals(self.table)
+                    self.store.update_manifest(requests=self.store.manifest().get("requests", 0) + sent, fetched=_now(), pass_started=started)
+                    if self.fetcher.metrics is not None:
+                        self.fetcher.metrics.save(self.store.metrics_path)
+                    await self.__wait(sent * 60 / self.rate - (perf_counter() - start))
+        finally:
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+            self.planner.save()
+        return done
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Refreshes a screen's fundamentals continuously at a steady request rate. Stop with Ctrl+C (or SIGTERM) and run again to resume.")
+    parser.add_argument("screen", help="Screen name (e.g. payback) or path to a screen YAML file.")
+    parser.add_argument("--tickers", required=True, help="JSON file of tickers keyed by country, or a compiled universe (see screenerV3.universe).")
+    parser.add_argument("--rate", type=float, default=100, help="Requests per minute.")
+    parser.add_argument("--batch", type=int, default=25, help="Tickers per batch.")
+    parser.add_argument("--min-age", type=float, default=7, help="Days before a ticker is refreshed again.")
+    parser.add_argument("--transport", default=None, help="HTTP transport (aiohttp, httpx, or local for saved responses in FMP_LOCAL_DIR).")
+    parser.add_argument("--no-snapshot", action="store_true", help="Does not archive each full pass for backtests.")
+    parser.add_argument("--prefilter", action="store_true", help="Drops tickers that bulk quotes and key metrics rule out before the per-ticker calls.")
+    parser.add_argument("--debug", action="store_true", help="Prints each batch.")
+    args = parser.parse_args(argv)
+    from .universe import Universe
+    from .utilities import Handler
+    definition = load_screen(args.screen)
+    refresher = TrickleRefresher(definition, Universe.load(args.tickers).tickers, Handler(args.transport), RunStore(definition.name),
+                                 os.path.basename(args.tickers), rate=args.rate, batch=args.batch, min_age=args.min_age,
+                                 snapshots=None if args.no_snapshot else SnapshotStore(), prefilter=args.prefilter, debug=args.debug)
+    done = asyncio.run(refresher.run())
+    print(f"Stopped after {done} batches.")
+
+
+if __name__ == "__main__":
+    main()
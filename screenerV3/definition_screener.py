@@ -0,0 +1,111 @@
+from dotenv import load_dotenv
+from .history import RunHistory, SeenTickers
+from .profiling import start_from_env
+from .sheet import Sheet
+from .utilities import Handler
+from .table import Table
+from .scheduler import RefreshScheduler
+from .screens import ScreenDefinition, load_screen
+from .snapshots import SnapshotStore
+from .stages import RunStore, fetch_stage, live_stage, plan_stage, print_plan, publish_stage, screen_stage
+import os
+
+load_dotenv()
+
+
+class DefinitionScreener:
+    """
+    Runs a screen described by a `ScreenDefinition` (see `screenerV3/screens/`).
+
+    The endpoints to fetch are derived from the fields the definition reads, each `require` predicate
+    is applied as soon as its data is in, and the planner orders the fetch phases. The stages hand off
+    through the screen's `RunStore`, so they can also be run separately (see `screenerV3/cli.py`).
+
+    With `SCREENER_PROFILE=1` set, every stage and Google Sheets call is profiled, and the profiles are written when
+    the process exits (see `profiling.py`).
+    """
+    def __init__(self, definition, ticker_path: str, sheet_path: str = "./service_account.json", sheet_name: str = None, transport: str = None) -> None:
+        self.definition = definition if isinstance(definition, ScreenDefinition) else load_screen(definition)
+        start_from_env()
+        self.sheet_client = Sheet(sheet_path= sheet_path, file_name=sheet_name or self.definition.sheet_name)
+        self.handler = Handler(transport)
+        self.history = RunHistory(self.definition.name)
+        self.tickers = self.handler.process_tickers(SeenTickers(self.history, self.sheet_client), ticker_path)
+        self.universe = os.path.basename(ticker_path)
+        self.key = os.environ['FMP_KEY']
+        self.store = RunStore(self.definition.name)
+        self.results = Table()
+        self.fundamentals = None
+        self.requests_sent = 0
+
+    def __all_tickers(self) -> list[str]:
+        return [ticker for tickers in self.tickers.values() for ticker in tickers]
+
+    def plan(self, exhaustive:bool=False, resume:bool=False, publish:bool=False, debug:bool=False) -> dict:
+        """
+        Estimates the API calls, cache hits, run time and Google Sheets calls of `run_async` and `update_google_sheet`,
+        without making any API call (see `stages.plan_stage`).
+
+        Returns:
+        - `dict`: The estimate.
+        """
+        ret = plan_stage(self.definition, self.__all_tickers(), self.handler, self.store, self.universe, exhaustive=exhaustive,
+                         resume=resume, sheet="live" if publish else "publish", seen_from_sheet=True)
+        print_plan(ret) if debug else None
+        return ret
+
+    async def run_async(self, debug:bool=False, exhaustive:bool=False, resume:bool=False, streaming:bool=True, publish:bool=False,
+                        target:int=None, time_limit:float=None) -> Table:
+        """
+        Fetches the fundamentals and screens them. Both are saved to the run store for offline re-screening, and the
+        fundamentals are archived as a snapshot for backtests (see `backtest.py`).
+
+        Parameters:
+        - `debug` (bool): If True, prints progress. Default is False.
+        - `exhaustive` (bool): If True, filters that read a screen parameter do not prune tickers while fetching,
+          so sweeps can loosen any threshold. Costs more API calls. Default is False.
+        - `resume` (bool): If True, resumes an unfinished fetch of the same universe. Default is False.
+        - `streaming` (bool): If True, fetch phases overlap as pipeline stages. Default is True.
+        - `publish` (bool): If True, passing names are published to the Google Sheet while the run is in progress,
+          and the tab is rewritten in sort order at the end (replaces `update_google_sheet`). Requires `streaming`. Default is False.
+          Published results are stored in the screen's run history (see `history.py`), which is read with the sheet
+          for previously seen tickers.
+        - `target` (int): If given, the likeliest passers are fetched first and the run stops once this many passed. Default is None.
+        - `time_limit` (float): If given, the likeliest passers are fetched first and the run stops after this many seconds. Default is None.
+
+        Returns:
+        - `Table`: The screening results.
+        """
+        tickers = self.__all_tickers()
+        if target is not None or time_limit is not None:
+            tickers = RefreshScheduler(self.definition, SnapshotStore()).order(tickers)
+        if publish and streaming:
+            self.results = await live_stage(self.definition, tickers, self.handler, self.store, self.universe, self.sheet_client,
+                                            debug=debug, exhaustive=exhaustive, resume=resume, snapshots=SnapshotStore(), history=self.history,
+                                            target=target, time_limit=time_limit)
+            self.requests_sent = self.store.manifest().get("requests", 0)
+            return self.results
+        self.fundamentals = await fetch_stage(self.definition, tickers, self.handler, self.store, self.universe,
+                                              debug=debug, exhaustive=exhaustive, resume=resume, streaming=streaming, snapshots=SnapshotStore(),
+                                              target=target, time_limit=time_limit)
+        self.requests_sent = self.store.manifest().get("requests", 0)
+        self.results = screen_stage(self.definition, self.store, self.fundamentals)
+        return self.results
+
+    def update_google_sheet(self, debug:bool=False) -> None:
+        publish_stage(self.definition, self.results, sheet_client=self.sheet_client, store=self.store, history=self.history, debug=debug)
+
+    def create_xlsx(self, file_path:str) -> None:
+        """
+        Creates an Excel file with the screening results.
+
+        Parameters:
+        - `file_path` (str): The path to the Excel file.
+
+        Returns:
+        - `None`
+        """
+        if len(self.results) == 0:
+            print(f'ERROR: results table is empty. Execute `Screener.run()` to screen the stocks. If you are still seeing this after running `Screener.run()`, there are no new stocks from the previous execution.')
+        else:
+            publish_stage(self.definition, self.results, xlsx_path=file_path)
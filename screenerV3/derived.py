@@ -0,0 +1,74 @@
+import numpy as np
+from .table import Table
+
+# quarterly cash flow statements requested per ticker: 5 complete fiscal years plus the current, partial one
+CASHFLOW_QUARTERS = 24
+
+# key metrics TTM field -> (fields it is derived from, function of their columns)
+DERIVED = {
+    # EV = market cap + total debt - cash and equivalents, i.e. market cap + net debt
+    "enterprise_value": (("market_cap", "net_debt"), lambda market_cap, net_debt: market_cap + net_debt),
+    "tangible_asset_value": (("total_assets", "total_liabilities", "goodwill_and_intangible_assets"),
+                             lambda assets, liabilities, intangibles: assets - liabilities - intangibles),
+    "fcf_per_share_ttm": (("trailing_fcf", "outstanding_shares"),
+                          lambda fcf, shares: np.where(shares > 0, fcf / np.where(shares > 0, shares, 1), np.nan)),
+    "market_cap_ttm": (("market_cap",), lambda market_cap: market_cap),
+}
+
+
+def fiscal_years(cf: list, truncated: bool = False) -> list[list]:
+    """
+    Groups a quarterly statement history into complete fiscal years.
+
+    A fiscal year ends with its `Q4` (or `FY`) period, so semiannual and annual filers are grouped correctly too.
+    The periods after the last year end (the current, partial year) are left out.
+
+    Parameters:
+    - `cf` (list): The statements, most recent first.
+    - `truncated` (bool): If True, the history was cut at the request limit, so its oldest year may be partial and is left out. Default is False.
+
+    Returns:
+    - `list[list]`: The statements of each complete fiscal year, most recent first.
+    """
+    ends = [i for i, statement in enumerate(cf) if statement.period in ("Q4", "FY")]
+    ret = [cf[a:b] for a, b in zip(ends, ends[1:] + [len(cf)])]
+    return ret[:-1] if truncated and ret else ret
+
+
+def trailing_fcf(cf: list) -> float:
+    """
+    Returns the free cash flow of the last twelve months: the latest periods up to the first repeated period label
+    (4 quarters, 2 halves or 1 year).
+    """
+    seen = set()
+    ret = 0.0
+    for statement in cf:
+        if statement.period is None or statement.period in seen:
+            break
+        seen.add(statement.period)
+        ret += statement.free_cash_flow
+    return ret if seen else None
+
+
+def derive(table: Table, rows: np.ndarray, fields: list[str] = None) -> dict[str:np.ndarray]:
+    """
+    Computes key metrics TTM fields from the fundamentals already in the table, so the `key-metrics-ttm`
+    endpoint is only needed where an input is missing.
+
+    Parameters:
+    - `table` (Table): The fundamentals.
+    - `rows` (np.ndarray): The table rows to derive for (see `Table.index`).
+    - `fields` (list[str]): The fields to derive. Defaults to every field in `DERIVED`.
+
+    Returns:
+    - `dict[str:np.ndarray]`: The derived values over `rows`, NaN where an input is missing.
+    """
+    ret = {}
+    with np.errstate(invalid="ignore"):
+        for name in fields or DERIVED:
+            inputs, func = DERIVED[name]
+            if not all(i in table.schema for i in inputs):
+                ret[name] = np.full(len(rows), np.nan)
+                continue
+            ret[name] = np.asarray(func(*[table.numeric(i, rows) for i in inputs]), dtype=float)
+    return ret
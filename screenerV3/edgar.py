@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import re
+from screener.helpers.edgar import frame_url
+from .records import BalanceSheet, CashFlow, Record
+from .statements import recent
+from .symbols import SymbolIndex, shared
+
+FRAMES_DIR = "./data/edgar/frames"
+
+# us-gaap concept -> True for instant (balance sheet) values, False for durations (cash flows)
+CONCEPTS = {
+    "AssetsCurrent": True,
+    "Assets": True,
+    "Liabilities": True,
+    "LiabilitiesAndStockholdersEquity": True,
+    "StockholdersEquity": True,
+    "CashAndCashEquivalentsAtCarryingValue": True,
+    "LongTermDebt": True,
+    "LongTermDebtNoncurrent": True,
+    "LongTermDebtCurrent": True,
+    "LongTermDebtAndCapitalLeaseObligations": True,
+    "DebtCurrent": True,
+    "ShortTermBorrowings": True,
+    "Goodwill": True,
+    "IntangibleAssetsNetExcludingGoodwill": True,
+    "NetCashProvidedByUsedInOperatingActivities": False,
+    "PaymentsToAcquirePropertyPlantAndEquipment": False,
+    "PaymentsForRepurchaseOfCommonStock": False,
+}
+
+# the concepts filers report their debt under (see `EdgarFrames.__debt`)
+DEBT = ("LongTermDebt", "LongTermDebtNoncurrent", "LongTermDebtCurrent", "LongTermDebtAndCapitalLeaseObligations", "DebtCurrent", "ShortTermBorrowings")
+
+# annual cash flows read per ticker; a ticker with fewer consecutive years is left to the FMP endpoint
+YEARS = 5
+
+_PERIOD = re.compile(r"^CY(\d{4})(?:Q([1-4]))?(I?)$")
+
+
+def _period_key(period: str) -> tuple:
+    # CY2023 < CY2023Q4I < CY2024Q1I: years sort by year, instants by year and quarter
+    year, quarter, _ = _PERIOD.match(period).groups()
+    return int(year), int(quarter or 4)
+
+def _period_end(period: str) -> str:
+    # the last day of the calendar year or quarter
+    year, quarter = _period_key(period)
+    return f"{year}-{('03-31', '06-30', '09-30', '12-31')[quarter - 1]}"
+
+
+def periods(years: list[int]) -> dict[str:list[str]]:
+    """
+    Returns the frame periods to download for some calendar years: every quarter end for instant concepts,
+    and the whole year for durations.
+    """
+    return {"instant": [f"CY{y}Q{q}I" for y in years for q in range(1, 5)], "duration": [f"CY{y}" for y in years]}
+
+
+class EdgarFrames:
+    """
+    SEC EDGAR XBRL frames as a statements source for US tickers.
+
+    A frame holds one value of one concept for every filer and calendar period, so a handful of requests per
+    period covers the whole US universe. Saved frames (`<root>/<concept>/<period>.json`, see `download`) are
+    joined to tickers through the symbol index and turned into the same records the FMP statement endpoints
+    return, so `FundamentalsFetcher` can use them in place of per-ticker calls (see `StatementStore`).
+
+    - Balance sheet: the latest quarter-end instant with current assets, if no newer one is due yet (see
+      `statements.recent`). Liabilities fall back to total liabilities and equity less equity; net debt is
+      long-term and current debt (under whichever `DEBT` concepts the filer uses) less cash.
+    - Cash flow: the last 5 consecutive calendar years, the latest one recent, FCF being operating cash flow less
+      capital expenditure.
+
+    A ticker whose frames are stale, cover fewer years, or miss its debt or a year's capital expenditure is left
+    out, so the FMP endpoint is used instead of assuming zero.
+
+    Parameters:
+    - `root` (str): The saved frames. Default is `./data/edgar/frames`.
+    - `cik_path` (str): A ticker -> CIK list (`ticker: cik` per line) to use instead of the shared symbol index.
+    - `symbols` (SymbolIndex): The symbol index. Default is `symbols.shared()`.
+    """
+    def __init__(self, root: str = FRAMES_DIR, cik_path: str = None, symbols: SymbolIndex = None) -> None:
+        self.root = root
+        self.symbols = symbols or (SymbolIndex.from_sources(cik_path, None, None) if cik_path else shared())
+        self.__frames = {}
+        self.__periods = {}
+
+    def periods(self, concept: str) -> list[str]:
+        """
+        Returns the saved periods of a concept, most recent first.
+        """
+        if concept not in self.__periods:
+            path = os.path.join(self.root, concept)
+            ret = [i[:-5] for i in os.listdir(path) if i.endswith(".json") and _PERIOD.match(i[:-5])] if os.path.isdir(path) else []
+            self.__periods[concept] = sorted(ret, key=_period_key, reverse=True)
+        return self.__periods[concept]
+
+    def frame(self, concept: str, period: str) -> dict[int:float]:
+        """
+        Returns the values of a saved frame keyed by CIK (empty if the frame was not saved).
+        """
+        key = (concept, period)
+        if key not in self.__frames:
+            path = os.path.join(self.root, concept, f"{period}.json")
+            values = {}
+            if os.path.exists(path):
+                with open(path, 'r') as file:
+                    payload = json.load(file)
+                for i in payload.get("data", []) if isinstance(payload, dict) else []:
+                    if isinstance(i, dict) and isinstance(i.get("val"), (int, float)) and i.get("cik") is not None:
+                        values[int(i["cik"])] = float(i["val"])
+            self.__frames[key] = values
+        return self.__frames[key]
+
+    def _recent(self, period: str, kind: str) -> bool:
+        # no newer `quarter` or `annual` period is due yet
+        return recent(_period_end(period), kind)
+
+    def __value(self, concept: str, period: str, cik: int, default: float = None) -> float:
+        return self.frame(concept, period).get(cik, default)
+
+    def __debt(self, period: str, cik: int) -> float:
+        # the total debt of a period, None if the filer reported none of the `DEBT` concepts
+        found = {k: v for k in DEBT if (v := self.__value(k, period, cik)) is not None}
+        if not found:
+            return None
+        if "LongTermDebt" in found:
+            # includes its current portion, which `DebtCurrent` would count again
+            return found["LongTermDebt"] + found.get("ShortTermBorrowings", 0.0)
+        long_term = found.get("LongTermDebtNoncurrent", found.get("LongTermDebtAndCapitalLeaseObligations", 0.0))
+        # `DebtCurrent` is the current portion of long-term debt plus short-term borrowings
+        if "DebtCurrent" in found:
+            return long_term + found["DebtCurrent"]
+        return long_term + found.get("LongTermDebtCurrent", 0.0) + found.get("ShortTermBorrowings", 0.0)
+
+    def __balance_sheet(self, cik: int) -> BalanceSheet:
+        for period in self.periods("AssetsCurrent"):
+            current_assets = self.__value("AssetsCurrent", period, cik)
+            if current_assets is None:
+                continue
+            if not self._recent(period, "quarter"):
+                return None
+            liabilities = self.__value("Liabilities", period, cik)
+            if liabilities is None:
+                total = self.__value("LiabilitiesAndStockholdersEquity", period, cik)
+                equity = self.__value("StockholdersEquity", period, cik)
+                liabilities = total - equity if total is not None and equity is not None else None
+            cash = self.__value("CashAndCashEquivalentsAtCarryingValue", period, cik)
+            debt = self.__debt(period, cik)
+            if debt is None:
+                return None
+            intangibles = self.__value("Goodwill", period, cik, 0.0) + self.__value("IntangibleAssetsNetExcludingGoodwill", period, cik, 0.0)
+            values = {"date": period, "total_current_assets": current_assets, "total_assets": self.__value("Assets", period, cik),
+                      "total_liabilities": liabilities, "net_debt": debt - cash if cash is not None else None,
+                      "goodwill_and_intangible_assets": intangibles}
+            return _valid(BalanceSheet, values)
+        return None
+
+    def __cashflow(self, cik: int) -> list[CashFlow]:
+        ret = []
+        for period in self.periods("NetCashProvidedByUsedInOperatingActivities"):
+            if _PERIOD.match(period).group(2):
+                continue
+            operating = self.__value("NetCashProvidedByUsedInOperatingActivities", period, cik)
+            if operating is None and not ret:
+                continue
+            # a gap after the latest year would splice non-consecutive years
+            if operating is None or (ret and _period_key(period)[0] != _period_key(ret[-1].date)[0] - 1):
+                break
+            if not ret and not self._recent(period, "annual"):
+                return None
+            capex = self.__value("PaymentsToAcquirePropertyPlantAndEquipment", period, cik)
+            if capex is None:
+                return None
+            buyback = self.__value("PaymentsForRepurchaseOfCommonStock", period, cik)
+            values = {"date": period, "period": "FY", "free_cash_flow": operating - capex,
+                      "common_stock_repurchased": -buyback if buyback is not None else None,
+                      "cash_at_end_of_period": self.__value("CashAndCashEquivalentsAtCarryingValue", f"{period}Q4I", cik)}
+            ret.append(_valid(CashFlow, values))
+            if ret[-1] is None or len(ret) == YEARS:
+                break
+        return ret if len(ret) == YEARS and None not in ret else None
+
+    def statements(self, dataset: str, tickers: list[str]) -> dict[str:list[Record]]:
+        """
+        Reads the statements of some tickers, as the FMP endpoint would return them (see `StatementStore.statements`).
+
+        Returns:
+        - `dict[str:list[Record]]`: The statements of each ticker with a CIK and complete frames.
+        """
+        if dataset not in ("balance_sheet", "cashflow"):
+            return {}
+        ret = {}
+        for k in tickers:
+            cik = self.symbols.cik(k)
+            if cik is None:
+                continue
+            data = self.__balance_sheet(cik) if dataset == "balance_sheet" else self.__cashflow(cik)
+            if data is not None:
+                ret[k] = data if isinstance(data, list) else [data]
+        return ret
+
+
+def _valid(record: type, values: dict) -> Record:
+    if any(values.get(i) is None for i in record.REQUIRED):
+        return None
+    return record(**values)
+
+
+def download(years: list[int], root: str = FRAMES_DIR, concepts: list[str] = None) -> None:
+    """
+    Saves the frames of `CONCEPTS` for some calendar years (one request per concept and period).
+
+    The SEC requires a descriptive User-Agent, read from the `SEC_USER_AGENT` environment variable.
+    """
+    import requests
+    headers = {"User-Agent": os.environ.get("SEC_USER_AGENT", "market_screener admin@example.com")}
+    todo = periods(years)
+    for concept in concepts or CONCEPTS:
+        os.makedirs(os.path.join(root, concept), exist_ok=True)
+        for period in todo["instant" if CONCEPTS[concept] else "duration"]:
+            res = requests.get(frame_url(concept, period), headers=headers)
+            if res.status_code != 200:
+                print(f"No frame for {concept} {period} ({res.status_code}).")
+                continue
+            with open(os.path.join(root, concept, f"{period}.json"), 'wb') as file:
+                file.write(res.content)
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Downloads SEC XBRL frames for the EDGAR statements source.")
+    parser.add_argument("years", type=int, nargs="+", help="Calendar years to download.")
+    parser.add_argument("--root", default=FRAMES_DIR, help="Where the frames are saved.")
+    args = parser.parse_args(argv)
+    download(args.years, args.root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+from time import monotonic
+import asyncio
+import numpy as np
+import os
+from .derived import CASHFLOW_QUARTERS, derive, fiscal_years, trailing_fcf
+from .planner import Phase
+from .statements import DATASETS
+from .table import Table, FLOAT, OBJECT
+from .utilities import Handler
+
+# column -> endpoint that provides it
+FIELDS = {
+    "name": "profile",
+    "country": "profile",
+    "exchange": "profile",
+    "industry": "profile",
+    "market_cap": "profile",
+    "last_div": "profile",
+    "total_current_assets": "balance_sheet",
+    "total_assets": "balance_sheet",
+    "total_liabilities": "balance_sheet",
+    "net_debt": "balance_sheet",
+    "goodwill_and_intangible_assets": "balance_sheet",
+    "fcf_total": "cashflow",
+    "fcf_years": "cashflow",
+    "negative_fcf_years": "cashflow",
+    "buyback_total": "cashflow",
+    "cash_at_end_of_period": "cashflow",
+    "trailing_fcf": "cashflow",
+    "enterprise_value": "key_metrics",
+    "fcf_per_share_ttm": "key_metrics",
+    "tangible_asset_value": "key_metrics",
+    "market_cap_ttm": "key_metrics",
+    # the profile's price, so every snapshot prices the whole fetched universe for backtests
+    "share_price": "profile",
+    "price": "historical",
+    "price_max_5y": "historical",
+    "outstanding_shares": "floats",
+}
+
+SCHEMA = {name: OBJECT if name in ("name", "country", "exchange", "industry") else FLOAT for name in FIELDS}
+
+# endpoint -> (expected API calls per ticker, endpoints that must be fetched first)
+ENDPOINTS = {
+    "profile": (1/1000, ()),
+    "balance_sheet": (1, ("profile",)),
+    "cashflow": (1, ("profile",)),
+    # derived locally (see `derived.py`); the endpoint is only called where an input is missing
+    "key_metrics": (0.1, ("profile", "balance_sheet", "cashflow", "floats")),
+    "historical": (1, ("profile",)),
+    "floats": (0, ()),
+}
+
+
+def profile_fields(profile) -> dict:
+    return {"name": profile.company_name, "country": profile.country, "exchange": profile.exchange,
+            "industry": profile.industry, "market_cap": profile.market_cap, "share_price": profile.price, "last_div": profile.last_div or 0}
+
+def balance_sheet_fields(bs: list) -> dict:
+    return {"total_current_assets": bs[0].total_current_assets, "total_assets": bs[0].total_assets, "total_liabilities": bs[0].total_liabilities,
+            "net_debt": bs[0].net_debt, "goodwill_and_intangible_assets": bs[0].goodwill_and_intangible_assets}
+
+def cashflow_fields(cf: list) -> dict:
+    # the annual figures of the last five complete fiscal years, summed from the quarterly statements
+    years = fiscal_years(cf, truncated=len(cf) >= CASHFLOW_QUARTERS)[:5]
+    if not years:
+        return None
+    fcf = [sum(i.free_cash_flow for i in year) for year in years]
+    return {"fcf_total": sum(fcf), "fcf_years": len(fcf), "negative_fcf_years": len([i for i in fcf if i < 0]),
+            "buyback_total": sum([i.common_stock_repurchased or 0 for year in years for i in year]),
+            "cash_at_end_of_period": years[0][0].cash_at_end_of_period, "trailing_fcf": trailing_fcf(cf)}
+
+def key_metrics_fields(km) -> dict:
+    return {"enterprise_value": km.enterprise_value, "fcf_per_share_ttm": km.fcf_per_share,
+            "tangible_asset_value": km.tangible_asset_value, "market_cap_ttm": km.market_cap}
+
+def historical_fields(hist) -> dict:
+    return {"price": hist.current, "price_max_5y": round(max(hist.closes), 2)}
+
+
+RUNS_DIR = "./data/runs"
+
+# tickers per batched profile request
+PROFILE_BATCH = 1000
+
+# the API limit: at most RATE_LIMIT_REQUESTS requests in any RATE_LIMIT_WINDOW seconds (see `RateLimiter`)
+RATE_LIMIT_REQUESTS = 299
+RATE_LIMIT_WINDOW = 60
+
+
+def fundamentals_path(screen: str) -> str:
+    """
+    Returns where the fundamentals fetched by the last run of a screen are saved.
+    """
+    return os.path.join(RUNS_DIR, screen, "fundamentals.npz")
+
+def fetched(table: Table, endpoint: str, rows: np.ndarray = None) -> np.ndarray:
+    """
+    Returns, for every row of `table` (or the given rows), whether `endpoint` has returned data for it.
+    """
+    ret = np.zeros(table.alive.shape if rows is None else len(rows), dtype=bool)
+    for name in [k for k, v in FIELDS.items() if v == endpoint and k in table.schema]:
+        if table.schema[name] == OBJECT:
+            col = table[name] if rows is None else table[name][rows]
+            ret |= np.array([v is not None for v in col], dtype=bool)
+        else:
+            ret |= ~np.isnan(table.numeric(name, rows))
+    return ret
+
+
+def empty_fundamentals(tickers: list[str]) -> Table:
+    """
+    Creates a fundamentals table with one alive row per ticker and no data.
+    """
+    table = Table(SCHEMA, capacity=len(tickers))
+    for ticker in tickers:
+        table.add(ticker)
+    return table
+
+
+class RateLimiter:
+    """
+    Async token bucket that keeps requests under the API limit.
+
+    The bucket holds up to `burst` tokens and refills at `(requests - burst) / window` per second, so no `window`
+    seconds ever see more than `requests` requests. `acquire` takes a token, waiting with `asyncio.sleep` when the
+    bucket is empty, so other tasks on the loop (pipeline stages, the live publisher, signal handling) keep running.
+    Waiters are served in order, and one limiter is shared by every stage of a fetch.
+
+    Parameters:
+    - `requests` (int): Requests allowed per window. Default is `RATE_LIMIT_REQUESTS`.
+    - `window` (float): The window, in seconds. Default is `RATE_LIMIT_WINDOW`.
+    - `burst` (int): Requests that can be sent back to back. Default is 10.
+    - `metrics` (RunMetrics): Where each wait is recorded. Defaults to None.
+    """
+    def __init__(self, requests: int = RATE_LIMIT_REQUESTS, window: float = RATE_LIMIT_WINDOW, burst: int = 10, metrics=None) -> None:
+        self.rate = (requests - burst) / window
+        self.burst = burst
+        self.tokens = float(burst)
+        self.metrics = metrics
+        self.__updated = monotonic()
+        self.__lock = None
+        self.__loop = None
+
+    def __refill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.__updated) * self.rate)
+        self.__updated = now
+
+    async def acquire(self) -> None:
+        """
+        Waits until a request may be sent, and counts it.
+        """
+        loop = asyncio.get_running_loop()
+        if self.__loop is not loop:
+            # a lock belongs to one event loop, and the limiter can outlive one (e.g. successive `asyncio.run`)
+            self.__lock, self.__loop = asyncio.Lock(), loop
+        async with self.__lock:
+            self.__refill()
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+                if self.metrics is not None:
+                    self.metrics.pause(wait)
+                self.__refill()
+            self.tokens -= 1
+
+
+class FundamentalsFetcher:
+    """
+    Fetches FMP endpoints into a fundamentals table, one planner phase per endpoint.
+
+    Each phase only requests the tickers still alive in the table that it has no data for yet (so a
+    checkpointed table can be resumed), and removes a ticker when its endpoint returns no usable data
+    (unless the endpoint is optional for the screen). The key metrics phase derives its fields from the data
+    already fetched (see `derived.py`) and only calls the endpoint where an input is missing.
+
+    Parameters:
+    - `handler` (Handler): The FMP request handler.
+    - `checkpoint`: Optional function `(table) -> None` called every `every` requests, e.g. to save progress.
+    - `every` (int): Requests between checkpoints. Default is 250.
+    - `statements`: A statements source (`StatementStore`, `CompanyFacts`, `EdgarFrames`) or a list of them, tried in order. Balance sheets
+      and cash flows are read from them and only requested for the tickers they do not hold. Defaults to None.
+    - `prefilter` (Prefilter): If given, a `prefilter` phase drops the tickers that provably cannot pass the screen,
+      using bulk quotes and key metrics, before the per-ticker phases (see `screenerV3/prefilter.py`). Defaults to None.
+    - `limiter` (RateLimiter): Paces every request of the fetcher, across its concurrent stages. Defaults to a
+      `RateLimiter` at the API limit.
+    """
+    def __init__(self, handler: Handler, checkpoint=None, every: int = 250, prefilter=None, statements=None, limiter: RateLimiter = None) -> None:
+        self.handler = handler
+        # the handler's `RunMetrics`, where the rate limit waits are recorded
+        self.metrics = getattr(handler, "metrics", None)
+        self.limiter = limiter or RateLimiter(metrics=self.metrics)
+        self.requests_sent = 0
+        self.calls = {}
+        self.checkpoint = checkpoint
+        self.every = every
+        self.floats = None
+        self.prefilter = prefilter
+        self.statements = statements if isinstance(statements, list) else [statements] if statements is not None else []
+        self.bulk_metrics = None
+
+    def __sent(self, table: Table, endpoint: str) -> None:
+        self.requests_sent += 1
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.checkpoint is not None and self.requests_sent % self.every == 0:
+            self.checkpoint(table)
+
+    def __pending(self, table: Table, endpoint: str, tickers: list[str] = None) -> list[str]:
+        if tickers is None:
+            return table.all_tickers()[table.alive & ~fetched(table, endpoint)].tolist()
+        rows = table.index(tickers)
+        return table.all_tickers()[rows[table.alive[rows] & ~fetched(table, endpoint, rows)]].tolist()
+
+    def phases(self, endpoints: set[str], optional: set[str] = None) -> list[Phase]:
+        """
+        Returns the planner phases that fetch the given endpoints.
+
+        Parameters:
+        - `endpoints` (set[str]): The endpoints a screen needs (see `ENDPOINTS`).
+        - `optional` (set[str]): Endpoints whose missing data does not remove a ticker. Defaults to None.
+
+        Returns:
+        - `list[Phase]`: One phase per endpoint, in `ENDPOINTS` order.
+        """
+        optional = optional or set()
+        ret = []
+        for endpoint, (cost, requires) in ENDPOINTS.items():
+            if endpoint not in endpoints:
+                continue
+            batch = self.__batch(endpoint, endpoint in optional)
+
+            async def run(session, table: Table, batch=batch) -> None:
+                await batch(session, table, None)
+            ret.append(Phase(endpoint, run, cost=cost, requires=[i for i in requires if i in endpoints], batch=batch,
+                             batch_limit=PROFILE_BATCH if endpoint == "profile" else None))
+        if self.prefilter is not None and "profile" in endpoints and len(endpoints) > 1:
+            async def run(session, table: Table) -> None:
+                await self.fetch_bounds(session, table, None)
+            # one bulk request per run plus one quote request per batch; assumed to prune until measured, so it runs first
+            ret.append(Phase("prefilter", run, cost=2/PROFILE_BATCH, requires=["profile"], batch=self.fetch_bounds,
+                             batch_limit=PROFILE_BATCH, pass_rate=0.9))
+        return ret
+
+    def __batch(self, endpoint: str, optional: bool):
+        if endpoint == "profile":
+            return self.fetch_profiles
+        if endpoint == "floats":
+            return self.fetch_floats
+        if endpoint == "key_metrics":
+            async def run(session, table: Table, tickers: list[str] = None) -> None:
+                await self.fetch_key_metrics(session, table, tickers, optional)
+            return run
+        method, fields = {
+            "balance_sheet": ("get_balance_sheet", balance_sheet_fields),
+            "cashflow": ("get_cashflow", cashflow_fields),
+            "historical": ("get_historical", historical_fields),
+        }[endpoint]
+        fetch = getattr(self.handler, method)
+
+        async def run(session, table: Table, tickers: list[str] = None) -> None:
+            pending = self.__pending(table, endpoint, tickers)
+            local = {}
+            for source in self.statements if endpoint in DATASETS else []:
+                local.update(source.statements(endpoint, [k for k in pending if k not in local]))
+            for k in pending:
+                data = local.get(k)
+                if data is None:
+                    await self.limiter.acquire()
+                    data = await fetch(session, k)
+                    self.__sent(table, endpoint)
+                values = fields(data) if data is not None else None
+                if values is None:
+                    if not optional:
+                        table.remove(k)
+                    continue
+                table.add(k, values)
+        return run
+
+    async def fetch_profiles(self, session, table: Table, tickers: list[str] = None) -> None:
+        tickers = self.__pending(table, "profile", tickers)
+        seen = set()
+        for i in range(0, len(tickers), PROFILE_BATCH):
+            await self.limiter.acquire()
+            res = await self.handler.get_profile(session, ",".join(tickers[i:i + PROFILE_BATCH]))
+            self.__sent(table, "profile")
+            for profile in res:
+                if profile.symbol in table:
+                    seen.add(profile.symbol)
+                    table.add(profile.symbol, profile_fields(profile))
+        for k in tickers:
+            if k not in seen:
+                table.remove(k)
+
+    async def fetch_key_metrics(self, session, table: Table, tickers: list[str] = None, optional: bool = False) -> None:
+        tickers = self.__pending(table, "key_metrics", tickers)
+        if not tickers:
+            return
+        derived = derive(table, table.index(tickers))
+        complete = np.logical_and.reduce([np.isfinite(i) for i in derived.values()])
+        for i, k in enumerate(tickers):
+            if complete[i]:
+                table.add(k, {name: float(values[i]) for name, values in derived.items()})
+                continue
+            await self.limiter.acquire()
+            data = await self.handler.get_key_metrics(session, k)
+            self.__sent(table, "key_metrics")
+            if data is None:
+                if not optional:
+                    table.remove(k)
+                continue
+            table.add(k, key_metrics_fields(data))
+
+    async def fetch_floats(self, session, table: Table, tickers: list[str] = None) -> None:
+        tickers = self.__pending(table, "floats", tickers)
+        if not tickers:
+            return
+        if self.floats is None:
+            await self.limiter.acquire()
+            self.floats = await self.handler.get_floats() or {}
+            self.__sent(table, "floats")
+        for k in tickers:
+            table.set(k, "outstanding_shares", self.floats.get(k, 0))
+
+    async def fetch_bounds(self, session, table: Table, tickers: list[str] = None) -> None:
+        tickers = table.tickers() if tickers is None else [k for k in tickers if k in table]
+        if not tickers:
+            return
+        if self.bulk_metrics is None:
+            await self.limiter.acquire()
+            self.bulk_metrics = await self.handler.get_key_metrics_bulk(session) or {}
+            self.__sent(table, "prefilter")
+        for i in range(0, len(tickers), PROFILE_BATCH):
+            chunk = tickers[i:i + PROFILE_BATCH]
+            await self.limiter.acquire()
+            quotes = {quote.symbol: quote for quote in await self.handler.get_quotes(session, ",".join(chunk))}
+            self.__sent(table, "prefilter")
+            rows = table.index(chunk)
+            bounds = self.prefilter.bounds(chunk, quotes, self.bulk_metrics, table.numeric("market_cap", rows))
+            for k in np.asarray(chunk, dtype=object)[~self.prefilter.possible(table, rows, bounds)]:
+                table.remove(k)
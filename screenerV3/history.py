@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import numpy as np
+from .table import Table, OBJECT
+
+HISTORY_DIR = "./data/history"
+
+
+class RunHistory:
+    """
+    The published results of every run of a screen, by run date.
+
+    Layout of `data/history/<screen>/`:
+    - `<YYYY-MM-DD>.npz`: The results published that day (see `Table.save`); a second run the same day replaces them.
+    - `seen.json`: The last run date of every ticker that was ever published, so the "previously seen" filter
+      is one dict lookup per ticker.
+
+    `get_all_previously_seen_tickers` mirrors `Sheet`, so a history can be passed wherever the sheet client is used
+    for that filter (see `Handler.process_tickers`). Only results written to the sheet are appended, so the history
+    and the sheet's tabs hold the same names, but the tabs also hold what was published before the history existed:
+    use `SeenTickers` for both.
+
+    Parameters:
+    - `screen` (str): The screen (or screener) name.
+    - `root` (str): The history directory. Default is `./data/history`.
+    """
+    def __init__(self, screen: str, root: str = HISTORY_DIR) -> None:
+        self.screen = screen
+        self.path = os.path.join(root, screen)
+        self.seen_path = os.path.join(self.path, "seen.json")
+
+    def dates(self) -> list[str]:
+        """
+        Returns the run dates, oldest first.
+        """
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(i[:-4] for i in os.listdir(self.path) if i.endswith(".npz") and len(i) == 14)
+
+    def load(self, date: str) -> Table:
+        path = os.path.join(self.path, f"{date}.npz")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No results of '{self.screen}' on {date}.")
+        return Table.load(path)
+
+    def seen(self) -> dict[str:str]:
+        """
+        Returns the last run date of every ticker ever published.
+        """
+        if not os.path.exists(self.seen_path):
+            return {}
+        with open(self.seen_path, 'r') as file:
+            return json.load(file)
+
+    def append(self, results: Table, date: str = None) -> str:
+        """
+        Stores the results of a run.
+
+        Parameters:
+        - `results` (Table): The published results.
+        - `date` (str): The run date (`YYYY-MM-DD`). Defaults to today.
+
+        Returns:
+        - `str`: The results file.
+        """
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        path = os.path.join(self.path, f"{date}.npz")
+        results.save(path)
+        seen = self.seen()
+        for k in results.tickers():
+            seen[k] = max(seen.get(k, date), date)
+        tmp = f"{self.seen_path}.tmp"
+        with open(tmp, 'w') as file:
+            json.dump(seen, file)
+        os.replace(tmp, self.seen_path)
+        return path
+
+    def get_all_previously_seen_tickers(self, days: int = 365) -> list[str]:
+        """
+        Returns the tickers published within the last `days` days (a year by default, like `Sheet`).
+        """
+        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        return [k for k, v in self.seen().items() if v >= cutoff]
+
+    def diff(self, old: str = None, new: str = None, tolerance: float = 1e-9) -> dict:
+        """
+        Compares the results of two runs.
+
+        Parameters:
+        - `old` (str): The earlier run date. Defaults to the run before `new`.
+        - `new` (str): The later run date. Defaults to the last run.
+        - `tolerance` (float): Relative change below which a metric is unchanged. Default is 1e-9.
+
+        Returns:
+        - `dict`: The two dates, the tickers that `entered` and `left` the results (in the order of the run they are
+          in), and for tickers in both runs the metrics that `changed`, as `{ticker: {column: [old, new]}}`.
+        """
+        dates = self.dates()
+        new = new or (dates[-1] if dates else None)
+        if new is None:
+            raise FileNotFoundError(f"No results of '{self.screen}'.")
+        if old is None:
+            earlier = [i for i in dates if i < new]
+            old = earlier[-1] if earlier else None
+        after = self.load(new)
+        before = self.load(old) if old is not None else Table()
+        return {"old": old, "new": new, **diff_results(before, after, tolerance)}
+
+
+class SeenTickers:
+    """
+    The tickers seen within the last year by any of several sources (a `RunHistory`, a `Sheet`), for the
+    "previously seen" filter. Mirrors `Sheet` like `RunHistory`; None sources are ignored.
+    """
+    def __init__(self, *sources) -> None:
+        self.sources = [i for i in sources if i is not None]
+
+    def get_all_previously_seen_tickers(self) -> list[str]:
+        ret = {}
+        for source in self.sources:
+            ret.update(dict.fromkeys(source.get_all_previously_seen_tickers()))
+        return list(ret)
+
+
+def diff_results(before: Table, after: Table, tolerance: float = 1e-9) -> dict:
+    """
+    Returns the tickers that entered and left between two results tables, and the metrics that changed.
+    """
+    old, new = before.tickers(), after.tickers()
+    old_set, new_set = set(old), set(new)
+    both = [k for k in new if k in old_set]
+    changed = {}
+    if both:
+        rows_old, rows_new = before.index(both), after.index(both)
+        for name in [i for i in after.columns if i in before.schema]:
+            if after.schema[name] == OBJECT or before.schema[name] == OBJECT:
+                a, b = before[name][rows_old], after[name][rows_new]
+                differs = np.array([x != y for x, y in zip(a, b)], dtype=bool)
+            else:
+                a, b = before.numeric(name, rows_old), after.numeric(name, rows_new)
+                missing = np.isnan(a) != np.isnan(b)
+                with np.errstate(invalid="ignore"):
+                    differs = missing | (np.abs(b - a) > tolerance * np.maximum(np.abs(a), 1))
+            for i in np.flatnonzero(differs):
+                changed.setdefault(both[i], {})[name] = [_value(a[i]), _value(b[i])]
+    return {"entered": [k for k in new if k not in old_set], "left": [k for k in old if k not in new_set], "changed": changed}
+
+
+def _value(value):
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    return value
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Reports the names that entered or left a screen's results between two runs.")
+    parser.add_argument("screen", help="Screen (or screener) name.")
+    parser.add_argument("--old", default=None, help="Earlier run date (YYYY-MM-DD). Defaults to the run before --new.")
+    parser.add_argument("--new", default=None, help="Later run date. Defaults to the last run.")
+    parser.add_argument("--root", default=HISTORY_DIR, help="The history directory.")
+    parser.add_argument("--output", help="Writes the full diff to this JSON file.")
+    args = parser.parse_args(argv)
+    res = RunHistory(args.screen, args.root).diff(args.old, args.new)
+    print(f"{args.screen}: {res['old']} -> {res['new']}")
+    print(f"Entered ({len(res['entered'])}): {' '.join(res['entered'])}")
+    print(f"Left ({len(res['left'])}): {' '.join(res['left'])}")
+    for k, v in res["changed"].items():
+        print(f"{k}: " + ", ".join(f"{name} {a} -> {b}" for name, (a, b) in v.items()))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(res, file, indent=2, default=str)
+        print(f"File saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
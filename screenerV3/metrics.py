@@ -0,0 +1,179 @@
+from urllib.parse import urlsplit
+import argparse
+import json
+import os
+
+# upper bounds (seconds) of the request latency histogram buckets, as in Prometheus `le` labels
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Returns the endpoint of an FMP URL, without the API version, the symbols and the query (e.g. `profile` for
+    `/api/v3/profile/AAPL,MSFT?apikey=...`, `shares_float/all` for the floats).
+    """
+    parts = [i for i in urlsplit(url).path.split("/") if i]
+    if len(parts) > 2 and parts[0] == "api":
+        parts = parts[2:]
+    # symbols are upper case, endpoint names are not
+    if len(parts) > 1 and parts[-1] != parts[-1].lower():
+        parts = parts[:-1]
+    return "/".join(parts) or urlsplit(url).netloc
+
+
+class RunMetrics:
+    """
+    Structured telemetry of a run: what each endpoint costs, how long the run waits on the API limit, and where the
+    tickers drop out.
+
+    Transports record every request (see `Transport.get_bytes`), the fundamentals fetcher every rate limit pause,
+    and the phase planner every phase. `report` returns it all as a dict (saved as JSON), `prometheus` as the
+    Prometheus text format, so a run can be compared with the last ones or scraped by a monitoring stack.
+
+    Per endpoint:
+    - `requests`, `errors` by class (the exception name, or `HTTP <status>`), `wire_bytes` and `body_bytes`.
+    - `seconds` spent waiting on responses, and a latency histogram over `LATENCY_BUCKETS`.
+    """
+    def __init__(self) -> None:
+        self.endpoints = {}
+        self.rate_limit = {"pauses": 0, "seconds": 0.0}
+        self.phases = []
+
+    def request(self, url: str, seconds: float, wire_bytes: int = 0, body_bytes: int = 0, error: str = None) -> None:
+        """
+        Records a request.
+
+        Parameters:
+        - `url` (str): The requested URL (see `endpoint_name`).
+        - `seconds` (float): Time until the response (or the error).
+        - `wire_bytes` (int): Bytes received on the wire. Default is 0.
+        - `body_bytes` (int): Bytes of the decoded body. Default is 0.
+        - `error` (str): The error class if the request failed. Defaults to None.
+        """
+        stats = self.endpoints.get(endpoint_name(url))
+        if stats is None:
+            stats = self.endpoints[endpoint_name(url)] = {"requests": 0, "errors": {}, "wire_bytes": 0, "body_bytes": 0, "seconds": 0.0,
+                                                          "buckets": [0] * len(LATENCY_BUCKETS)}
+        stats["requests"] += 1
+        stats["wire_bytes"] += wire_bytes
+        stats["body_bytes"] += body_bytes
+        stats["seconds"] += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                stats["buckets"][i] += 1
+                break
+        if error is not None:
+            stats["errors"][error] = stats["errors"].get(error, 0) + 1
+
+    def pause(self, seconds: float) -> None:
+        """
+        Records a pause to stay under the API limit.
+        """
+        self.rate_limit["pauses"] += 1
+        self.rate_limit["seconds"] += seconds
+
+    def phase(self, name: str, entered: int, passed: int, calls: int, seconds: float) -> None:
+        """
+        Records a fetch phase (see `PhasePlanner.record`).
+        """
+        self.phases.append({"phase": name, "entered": entered, "passed": passed, "calls": calls, "seconds": round(seconds, 3)})
+
+    def report(self) -> dict:
+        """
+        Returns the run report.
+
+        Returns:
+        - `dict`: Per endpoint its counts, bytes, mean latency and cumulative latency histogram (`{"le": count}`, as
+          in Prometheus); the rate limit pauses; the phases in run order; and the totals.
+        """
+        endpoints = {}
+        for name, stats in sorted(self.endpoints.items()):
+            cumulative, histogram = 0, {}
+            for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            histogram["+Inf"] = stats["requests"]
+            endpoints[name] = {"requests": stats["requests"], "errors": dict(stats["errors"]), "wire_bytes": stats["wire_bytes"],
+                               "body_bytes": stats["body_bytes"], "seconds": round(stats["seconds"], 3),
+                               "mean_seconds": round(stats["seconds"] / stats["requests"], 4), "latency": histogram}
+        return {"endpoints": endpoints,
+                "rate_limit": {"pauses": self.rate_limit["pauses"], "seconds": round(self.rate_limit["seconds"], 3)},
+                "phases": list(self.phases),
+                "requests": sum(i["requests"] for i in endpoints.values()),
+                "errors": sum(sum(i["errors"].values()) for i in endpoints.values()),
+                "wire_bytes": sum(i["wire_bytes"] for i in endpoints.values())}
+
+    def prometheus(self, prefix: str = "screener") -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def metric(name: str, kind: str, text: str, samples: list) -> None:
+            lines.extend([f"# HELP {prefix}_{name} {text}", f"# TYPE {prefix}_{name} {kind}"])
+            for suffix, labels, value in samples:
+                label = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{prefix}_{name}{suffix}{{{label}}} {value}" if label else f"{prefix}_{name}{suffix} {value}")
+
+        report = self.report()
+        endpoints = report["endpoints"]
+        # a phase run several times (e.g. by the trickle daemon) is one series
+        phases = {}
+        for i in report["phases"]:
+            total = phases.setdefault(i["phase"], {"entered": 0, "passed": 0, "seconds": 0.0})
+            total["entered"], total["passed"], total["seconds"] = total["entered"] + i["entered"], total["passed"] + i["passed"], total["seconds"] + i["seconds"]
+        metric("requests_total", "counter", "API requests by endpoint.", [("", {"endpoint": k}, v["requests"]) for k, v in endpoints.items()])
+        metric("errors_total", "counter", "Failed API requests by endpoint and error class.",
+               [("", {"endpoint": k, "error": e}, n) for k, v in endpoints.items() for e, n in v["errors"].items()])
+        metric("response_bytes_total", "counter", "Bytes received on the wire by endpoint.",
+               [("", {"endpoint": k}, v["wire_bytes"]) for k, v in endpoints.items()])
+        metric("request_seconds", "histogram", "API request latency by endpoint.",
+               [s for k, v in endpoints.items() for s in [("_bucket", {"endpoint": k, "le": le}, n) for le, n in v["latency"].items()]
+                + [("_sum", {"endpoint": k}, v["seconds"]), ("_count", {"endpoint": k}, v["requests"])]])
+        metric("rate_limit_seconds_total", "counter", "Time blocked on the API limit.", [("", {}, report["rate_limit"]["seconds"])])
+        metric("rate_limit_pauses_total", "counter", "Pauses to stay under the API limit.", [("", {}, report["rate_limit"]["pauses"])])
+        metric("phase_seconds_total", "counter", "Wall time of each fetch phase.", [("", {"phase": k}, round(v["seconds"], 3)) for k, v in phases.items()])
+        metric("phase_tickers_total", "counter", "Tickers entering and surviving each fetch phase.",
+               [("", {"phase": k, "stage": s}, v[s]) for k, v in phases.items() for s in ("entered", "passed")])
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: str) -> tuple[str, str]:
+        """
+        Writes the JSON report to `path` and the Prometheus text next to it (`.prom`).
+
+        Returns:
+        - `tuple[str, str]`: The two files.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        prom = f"{os.path.splitext(path)[0]}.prom"
+        for file_path, content in ((path, json.dumps(self.report(), indent=2)), (prom, self.prometheus())):
+            tmp = f"{file_path}.tmp"
+            with open(tmp, 'w') as file:
+                file.write(content)
+            os.replace(tmp, file_path)
+        return path, prom
+
+
+def print_report(report: dict) -> None:
+    """
+    Prints a `RunMetrics.report`, slowest endpoints first.
+    """
+    for name, stats in sorted(report["endpoints"].items(), key=lambda i: -i[1]["seconds"]):
+        errors = ", ".join(f"{k} {v}" for k, v in stats["errors"].items()) or "no errors"
+        print(f"{name}: {stats['requests']} requests, {stats['seconds'] / 60:.1f} min ({stats['mean_seconds'] * 1000:.0f} ms each), "
+              f"{stats['wire_bytes'] / 1e6:.1f} MB, {errors}")
+    print(f"Rate limit: {report['rate_limit']['pauses']} pauses, {report['rate_limit']['seconds'] / 60:.1f} min.")
+    for i in report["phases"]:
+        print(f"Phase '{i['phase']}': {i['entered']} -> {i['passed']} tickers, {i['calls']} calls, {i['seconds'] / 60:.1f} min")
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Prints a run's metrics report: requests, latency, errors and bytes per endpoint, rate limit waits and phases.")
+    parser.add_argument("report", help="JSON report written by a run (e.g. ./data/runs/payback/metrics.json).")
+    args = parser.parse_args(argv)
+    with open(args.report, 'r') as file:
+        print_report(json.load(file))
+
+
+if __name__ == "__main__":
+    main()
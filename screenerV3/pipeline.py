@@ -0,0 +1,166 @@
+from time import perf_counter
+import asyncio
+from .planner import Phase, Step
+from .table import Table
+
+
+class StageCounter:
+    """
+    Running totals of one pipeline stage.
+    """
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.entered = 0
+        self.passed = 0
+        self.requests = 0
+        self.seconds = 0.0
+
+    @property
+    def removed(self) -> int:
+        return self.entered - self.passed
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.entered} in, {self.passed} passed, {self.removed} removed, {self.requests} requests, {self.seconds:.1f}s busy"
+
+
+class Pipeline:
+    """
+    Runs fetch phases as concurrent asyncio stages linked by bounded queues.
+
+    Tickers flow through the stages in small batches: as soon as a batch clears a stage (and the filters
+    that stage's data unlocks), it is queued for the next stage while later batches are still being
+    fetched upstream, so a slow tail in one phase no longer leaves the others idle. The bounded queues
+    apply backpressure, so at most `queue_size` batches wait between two stages.
+
+    Parameters:
+    - `phases` (list[Phase]): The phases in run order (see `PhasePlanner.plan`). Each needs a `batch` function.
+    - `steps` (list[Step]): The filters, each applied per batch once every phase it requires has run.
+    - `calls`: Function `(phase name) -> int` returning the API calls made by a phase so far.
+    - `batch_size` (int): Tickers per batch between stages. Default is 25.
+    - `queue_size` (int): Batches buffered between two stages. Default is 4.
+    - `workers` (int): Concurrent workers per stage. Default is 1.
+    - `on_pass`: Optional function `(table, tickers) -> None` called with each batch that clears every stage.
+    - `debug` (bool): If True, prints the stage counters every `progress_every` seconds. Default is False.
+    - `stop`: Optional function `() -> bool`. Once it returns True, no new batch enters a stage; batches in a stage
+      finish, and the tickers that were not processed are listed in `skipped`. Defaults to None.
+    """
+    def __init__(self, phases: list[Phase], steps: list[Step], calls, batch_size: int = 25, queue_size: int = 4,
+                 workers: int = 1, on_pass=None, debug: bool = False, progress_every: float = 30.0, stop=None) -> None:
+        for phase in phases:
+            if phase.batch is None:
+                raise ValueError(f"Phase '{phase.name}' has no batch function and cannot be streamed.")
+        self.phases = phases
+        self.calls = calls
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.workers = workers
+        self.on_pass = on_pass
+        self.debug = debug
+        self.progress_every = progress_every
+        self.stop = stop
+        self.skipped = []
+        self.counters = {phase.name: StageCounter(phase.name) for phase in phases}
+        # steps run after the first stage by which all of their required phases are done
+        self.ready = [[] for _ in phases]
+        self.leftover = []
+        done = set()
+        pending = list(steps)
+        for i, phase in enumerate(phases):
+            done.add(phase.name)
+            for step in [s for s in pending if set(s.requires) <= done]:
+                self.ready[i].append(step)
+                pending.remove(step)
+        self.leftover = pending
+
+    def __chunks(self, tickers: list[str], size: int) -> list[list[str]]:
+        return [tickers[i:i + size] for i in range(0, len(tickers), size)]
+
+    async def __source(self, table: Table, outbox: asyncio.Queue) -> None:
+        size = (self.phases[0].batch_limit or self.batch_size) if self.phases else self.batch_size
+        for chunk in self.__chunks(table.tickers(), size):
+            if self.__stopped():
+                self.skipped += chunk
+                continue
+            await outbox.put(chunk)
+        await outbox.put(None)
+
+    def __stopped(self) -> bool:
+        return self.stop is not None and self.stop()
+
+    async def __worker(self, index: int, session, table: Table, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        phase = self.phases[index]
+        counter = self.counters[phase.name]
+        while True:
+            batch = await inbox.get()
+            if batch is None:
+                # let the other workers of this stage see the end of the stream too
+                await inbox.put(None)
+                return
+            if self.__stopped():
+                self.skipped += batch
+                continue
+            for chunk in self.__chunks(batch, phase.batch_limit or self.batch_size):
+                counter.entered += len(chunk)
+                start = perf_counter()
+                await phase.batch(session, table, chunk)
+                counter.seconds += perf_counter() - start
+                alive = [k for k in chunk if k in table]
+                for step in self.ready[index]:
+                    step.run(table, alive)
+                    alive = [k for k in alive if k in table]
+                counter.passed += len(alive)
+                counter.requests = self.calls(phase.name)
+                for out in self.__chunks(alive, self.batch_size):
+                    await outbox.put(out)
+
+    async def __stage(self, index: int, session, table: Table, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        await asyncio.gather(*[self.__worker(index, session, table, inbox, outbox) for _ in range(self.workers)])
+        await outbox.put(None)
+
+    async def __sink(self, table: Table, inbox: asyncio.Queue) -> None:
+        while True:
+            batch = await inbox.get()
+            if batch is None:
+                return
+            if self.on_pass is not None:
+                self.on_pass(table, batch)
+
+    async def __progress(self) -> None:
+        while True:
+            await asyncio.sleep(self.progress_every)
+            print(self.report())
+
+    def report(self) -> str:
+        """
+        Returns one line of counters per stage.
+        """
+        return "\n".join(str(i) for i in self.counters.values())
+
+    async def run(self, session, table: Table) -> dict[str:StageCounter]:
+        """
+        Streams the alive tickers of `table` through every stage.
+
+        Returns:
+        - `dict[str:StageCounter]`: The counters of each stage, keyed by phase name.
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(len(self.phases) + 1)]
+        tasks = [asyncio.create_task(self.__source(table, queues[0]))]
+        for i in range(len(self.phases)):
+            tasks.append(asyncio.create_task(self.__stage(i, session, table, queues[i], queues[i + 1])))
+        tasks.append(asyncio.create_task(self.__sink(table, queues[-1])))
+        progress = asyncio.create_task(self.__progress()) if self.debug else None
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            if progress is not None:
+                progress.cancel()
+        for step in self.leftover:
+            step.run(table)
+        for phase in self.phases:
+            self.counters[phase.name].requests = self.calls(phase.name)
+        print(self.report()) if self.debug else None
+        return self.counters
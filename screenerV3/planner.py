@@ -0,0 +1,190 @@
+from datetime import datetime
+from itertools import permutations
+from time import perf_counter
+import json
+import os
+from .profiling import section
+
+DEFAULT_STATS_PATH = "./data/phase_stats.json"
+
+
+class Phase:
+    """
+    A fetch phase of a screen.
+
+    Parameters:
+    - `name` (str): Unique name of the phase, used as the statistics key.
+    - `run`: Coroutine function `(session, table) -> None` that fetches data for the alive tickers and removes the ones that fail.
+    - `cost` (float): Expected API calls per ticker, used until measured statistics exist.
+    - `requires` (tuple): Names of the phases that must run first.
+    - `batch`: Optional coroutine function `(session, table, tickers) -> None` that does the same for some tickers only,
+      used by the streaming pipeline. Defaults to None.
+    - `batch_limit` (int): Tickers per `batch` call, if the phase needs a specific batch size (e.g. batched profiles).
+    - `pass_rate` (float): Expected share of tickers that survive the phase, used until measured statistics exist. Default is 1.0.
+    """
+    def __init__(self, name: str, run, cost: float = 1, requires: tuple = (), batch=None, batch_limit: int = None, pass_rate: float = 1.0) -> None:
+        self.name = name
+        self.run = run
+        self.cost = cost
+        self.requires = tuple(requires)
+        self.batch = batch
+        self.batch_limit = batch_limit
+        self.pass_rate = pass_rate
+
+
+class Step:
+    """
+    A local (no API call) computation or filter, run as soon as every phase it requires has completed.
+
+    Parameters:
+    - `name` (str): Name of the step.
+    - `run`: Function `(table, tickers=None) -> None` that computes columns and/or removes tickers, for the
+      given tickers only if `tickers` is passed.
+    - `requires` (tuple): Names of the phases whose data the step reads.
+    """
+    def __init__(self, name: str, run, requires: tuple = ()) -> None:
+        self.name = name
+        self.run = run
+        self.requires = tuple(requires)
+
+
+class PhasePlanner:
+    """
+    Orders the phases of a screen to minimise the expected number of API calls.
+
+    Each run records, per phase, how many tickers entered, how many survived (including the steps the
+    phase unlocked) and how many calls it made. The plan is the dependency-respecting order with the
+    lowest expected calls per ticker, using pass rates and costs measured over the last `history` runs
+    of the same screen and universe. Each record also goes to `metrics` (a `RunMetrics`), if given.
+    """
+    def __init__(self, screen: str, universe: str, stats_path: str = DEFAULT_STATS_PATH, history: int = 8, metrics=None) -> None:
+        self.screen = screen
+        self.universe = universe
+        self.stats_path = stats_path
+        self.history = history
+        self.metrics = metrics
+        self.stats = self.__load()
+
+    def __load(self) -> dict:
+        if not os.path.exists(self.stats_path):
+            return {}
+        with open(self.stats_path, 'r') as file:
+            return json.load(file)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.stats_path) or ".", exist_ok=True)
+        with open(self.stats_path, 'w') as file:
+            json.dump(self.stats, file, indent=2)
+
+    def __runs(self, phase: str) -> list[dict]:
+        return self.stats.get(self.screen, {}).get(self.universe, {}).get(phase, [])
+
+    def record(self, phase: str, entered: int, passed: int, calls: int, seconds: float = 0.0) -> None:
+        """
+        Records the outcome of a phase for the current run.
+
+        Parameters:
+        - `phase` (str): The phase name.
+        - `entered` (int): Tickers alive when the phase started.
+        - `passed` (int): Tickers alive after the phase and the steps it unlocked.
+        - `calls` (int): API calls made by the phase.
+        - `seconds` (float): Wall time of the phase.
+        """
+        runs = self.stats.setdefault(self.screen, {}).setdefault(self.universe, {}).setdefault(phase, [])
+        runs.append({"date": datetime.now().strftime("%Y-%m-%d"), "entered": entered, "passed": passed, "calls": calls, "seconds": round(seconds, 2)})
+        del runs[:-self.history]
+        if self.metrics is not None:
+            self.metrics.phase(phase, entered, passed, calls, seconds)
+
+    def pass_rate(self, phase: Phase) -> float:
+        """
+        Returns the measured share of tickers that survive a phase, or its expected pass rate if it has never run.
+        """
+        runs = self.__runs(phase.name)
+        entered = sum(i["entered"] for i in runs)
+        if entered == 0:
+            return phase.pass_rate
+        return sum(i["passed"] for i in runs) / entered
+
+    def cost(self, phase: Phase) -> float:
+        """
+        Returns the measured API calls per ticker of a phase, or its declared cost if it has never run.
+        """
+        runs = self.__runs(phase.name)
+        entered = sum(i["entered"] for i in runs)
+        if entered == 0:
+            return phase.cost
+        return sum(i["calls"] for i in runs) / entered
+
+    def latency(self, phase: Phase, default: float) -> float:
+        """
+        Returns the measured wall seconds per API call of a phase (rate limit pauses included), or `default` if it has never made calls.
+        """
+        runs = self.__runs(phase.name)
+        calls = sum(i["calls"] for i in runs)
+        if calls == 0:
+            return default
+        return sum(i.get("seconds", 0) for i in runs) / calls
+
+    def expected_calls(self, order: list[Phase]) -> float:
+        """
+        Returns the expected API calls per starting ticker for an order of phases.
+        """
+        survivors = 1.0
+        total = 0.0
+        for phase in order:
+            total += survivors * self.cost(phase)
+            survivors *= self.pass_rate(phase)
+        return total
+
+    def plan(self, phases: list[Phase]) -> list[Phase]:
+        """
+        Returns the cheapest order of `phases` that respects their dependencies.
+
+        Ties keep the declared order, so a screen without statistics runs as written.
+        """
+        best, best_cost = list(phases), None
+        for order in permutations(phases):
+            done = set()
+            valid = True
+            for phase in order:
+                if not set(phase.requires) <= done:
+                    valid = False
+                    break
+                done.add(phase.name)
+            if not valid:
+                continue
+            cost = self.expected_calls(order)
+            if best_cost is None or cost < best_cost - 1e-9:
+                best, best_cost = list(order), cost
+        return best
+
+    async def execute(self, phases: list[Phase], steps: list[Step], session, table, requests, debug: bool = False) -> None:
+        """
+        Runs the phases in planned order, running each step once its required phases are done, and saves the statistics.
+
+        Parameters:
+        - `phases` (list[Phase]): The phases of the screen.
+        - `steps` (list[Step]): The local computations and filters of the screen.
+        - `session`: The transport passed to each phase.
+        - `table` (Table): The screening state.
+        - `requests`: Function returning the number of API calls made so far.
+        - `debug` (bool): If True, prints a summary after each phase. Default is False.
+        """
+        pending = list(steps)
+        done = set()
+        for phase in self.plan(phases):
+            entered = len(table)
+            calls = requests()
+            start = perf_counter()
+            with section(f"phase.{phase.name}"):
+                await phase.run(session, table)
+            done.add(phase.name)
+            for step in [i for i in pending if set(i.requires) <= done]:
+                step.run(table)
+                pending.remove(step)
+            self.record(phase.name, entered, len(table), requests() - calls, perf_counter() - start)
+            print(f"Phase '{phase.name}' complete.\n{entered - len(table)} stocks removed.\n{len(table)} remaining.") if debug else None
+        for step in pending:
+            step.run(table)
+        self.save()
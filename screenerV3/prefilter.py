@@ -0,0 +1,295 @@
+import ast
+import numpy as np
+from .fundamentals import FIELDS
+from .screens import CONSTANTS, METRICS, Expression, ScreenDefinition
+from .table import Table, OBJECT
+
+# fields that can still be missing once their endpoint has returned data
+NULLABLE = {"market_cap_ttm"}
+
+# returned instead of an interval for text values
+_TEXT = None
+
+
+def _interval(lo, hi, nan) -> tuple:
+    # NaN bounds (e.g. inf - inf) mean the bound is unknown
+    nan = nan | np.isnan(lo) | np.isnan(hi)
+    return np.where(np.isnan(lo), -np.inf, lo), np.where(np.isnan(hi), np.inf, hi), nan
+
+
+def _products(a: tuple, b: tuple, op) -> tuple:
+    values = [op(x, y) for x in a[:2] for y in b[:2]]
+    nan = a[2] | b[2] | np.logical_or.reduce([np.isnan(i) for i in values])
+    lo = np.minimum.reduce([np.where(np.isnan(i), -np.inf, i) for i in values])
+    hi = np.maximum.reduce([np.where(np.isnan(i), np.inf, i) for i in values])
+    return lo, hi, nan
+
+
+class Bounds:
+    """
+    Evaluates screen expressions over intervals instead of values.
+
+    Every number is a `(lo, hi, nan)` triple of arrays: the value lies in `[lo, hi]` (infinite ends
+    meaning unbounded) or, where `nan` is set, may be NaN. Fetched fundamentals are exact intervals;
+    missing ones use the bounds passed in, or are unbounded. A predicate evaluates to `(may_true,
+    may_false)`; where `may_true` is False, no value inside the bounds can make it hold.
+
+    Parameters:
+    - `definition` (ScreenDefinition): The screen.
+    - `table` (Table): The fundamentals.
+    - `rows` (np.ndarray): The table rows to evaluate (see `Table.index`).
+    - `bounds` (dict): `(lo, hi)` arrays over `rows`, keyed by field or metric name.
+    - `nullable` (set): Fields that may be NaN once fetched.
+    """
+    def __init__(self, definition: ScreenDefinition, table: Table, rows: np.ndarray, bounds: dict, nullable: set) -> None:
+        self.definition = definition
+        self.table = table
+        self.rows = rows
+        self.bounds = bounds
+        self.nullable = nullable
+        self.cache = {}
+
+    def __full(self, value) -> np.ndarray:
+        return np.array(np.broadcast_to(np.asarray(value, dtype=float), (len(self.rows),)))
+
+    def __exact(self, value) -> tuple:
+        value = self.__full(value)
+        return _interval(value, value, np.zeros(len(self.rows), dtype=bool))
+
+    def __unknown(self) -> tuple:
+        n = len(self.rows)
+        return np.full(n, -np.inf), np.full(n, np.inf), np.ones(n, dtype=bool)
+
+    def truth(self, expr: Expression) -> tuple:
+        """
+        Returns `(may_true, may_false)` arrays over the rows for a predicate.
+        """
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return self.__truth(expr.tree)
+
+    def __name(self, name: str) -> tuple:
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return self.__unknown() if np.isnan(value) else self.__exact(value)
+        if name in self.definition.params:
+            value = self.definition.params[name]
+            return self.__exact(value) if isinstance(value, (int, float)) else _TEXT
+        if name in self.cache:
+            return self.cache[name]
+        if name in FIELDS:
+            ret = self.__field(name)
+        else:
+            ret = self.__metric(name)
+        self.cache[name] = ret
+        return ret
+
+    def __field(self, name: str) -> tuple:
+        if name in self.table.schema and self.table.schema[name] == OBJECT:
+            return _TEXT
+        n = len(self.rows)
+        lo, hi = self.bounds.get(name, (np.full(n, -np.inf), np.full(n, np.inf)))
+        lo, hi = self.__full(lo), self.__full(hi)
+        nan = np.full(n, name in self.nullable)
+        if name in self.table.schema:
+            value = self.table.numeric(name, self.rows)
+            known = ~np.isnan(value)
+            lo, hi, nan = np.where(known, value, lo), np.where(known, value, hi), nan & ~known
+        return _interval(lo, hi, nan)
+
+    def __metric(self, name: str) -> tuple:
+        ret = self.__num(self.definition.metrics[name].tree)
+        if ret is _TEXT or name not in self.bounds or self.definition.metrics[name].source != METRICS.get(name):
+            return ret
+        # both contain the true value, so their intersection does too; an empty one means the bulk data disagrees
+        lo = np.maximum(ret[0], self.__full(self.bounds[name][0]))
+        hi = np.minimum(ret[1], self.__full(self.bounds[name][1]))
+        valid = lo <= hi
+        return np.where(valid, lo, ret[0]), np.where(valid, hi, ret[1]), ret[2]
+
+    def __num(self, node: ast.AST) -> tuple:
+        if isinstance(node, ast.Name):
+            return self.__name(node.id)
+        if isinstance(node, ast.Constant):
+            return self.__exact(node.value) if isinstance(node.value, (int, float)) else _TEXT
+        if isinstance(node, ast.BinOp):
+            a, b = self.__num(node.left), self.__num(node.right)
+            if a is _TEXT or b is _TEXT:
+                return _TEXT
+            if isinstance(node.op, ast.Add):
+                return _interval(a[0] + b[0], a[1] + b[1], a[2] | b[2])
+            if isinstance(node.op, ast.Sub):
+                return _interval(a[0] - b[1], a[1] - b[0], a[2] | b[2])
+            if isinstance(node.op, ast.Mult):
+                return _products(a, b, np.multiply)
+            if isinstance(node.op, ast.Div):
+                lo, hi, nan = _products(a, b, np.divide)
+                zero = (b[0] <= 0) & (b[1] >= 0)
+                # x / 0 is +-inf, 0 / 0 is NaN
+                return (np.where(zero, -np.inf, lo), np.where(zero, np.inf, hi),
+                        nan | (zero & (a[0] <= 0) & (a[1] >= 0)))
+            return self.__unknown()
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            a = self.__num(node.operand)
+            return _TEXT if a is _TEXT else (-a[1], -a[0], a[2])
+        if isinstance(node, ast.Call) and node.func.id in ("round", "int", "abs", "where", "select"):
+            return self.__call(node)
+        if isinstance(node, (ast.Compare, ast.BoolOp, ast.UnaryOp, ast.Call)):
+            may_true, may_false = self.__truth(node)
+            n = len(self.rows)
+            return np.where(may_false, 0.0, 1.0), np.where(may_true, 1.0, 0.0), np.zeros(n, dtype=bool)
+        return _TEXT
+
+    def __call(self, node: ast.Call) -> tuple:
+        name = node.func.id
+        if name in ("round", "int", "abs"):
+            a = self.__num(node.args[0])
+            if a is _TEXT:
+                return _TEXT
+            if name == "abs":
+                lo = np.where(a[0] >= 0, a[0], np.where(a[1] <= 0, -a[1], 0.0))
+                return lo, np.maximum(np.abs(a[0]), np.abs(a[1])), a[2]
+            if len(node.args) > 1 and not isinstance(node.args[1], ast.Constant):
+                # rounding to a non-negative number of digits moves a value by at most 0.5
+                return a[0] - 0.5, a[1] + 0.5, a[2]
+            digits = int(node.args[1].value) if len(node.args) > 1 else 0
+            # rounding is monotonic, so it maps the ends of the interval
+            return np.round(a[0], digits), np.round(a[1], digits), a[2]
+        # where(cond, a, b) and select(..., value, ..., [default]) lie within the union of their values
+        values = node.args[1:] if name == "where" else node.args[1:len(node.args) - len(node.args) % 2:2]
+        default = node.args[-1] if name == "select" and len(node.args) % 2 else None
+        values = [self.__num(i) for i in values + ([default] if default is not None else [])]
+        if not values or any(i is _TEXT for i in values):
+            return _TEXT
+        nan = np.logical_or.reduce([i[2] for i in values])
+        if name == "select" and default is None:
+            nan = np.ones(len(self.rows), dtype=bool)
+        return np.minimum.reduce([i[0] for i in values]), np.maximum.reduce([i[1] for i in values]), nan
+
+    def __truth(self, node: ast.AST) -> tuple:
+        n = len(self.rows)
+        unknown = np.ones(n, dtype=bool), np.ones(n, dtype=bool)
+        if isinstance(node, ast.BoolOp):
+            values = [self.__truth(i) for i in node.values]
+            if isinstance(node.op, ast.And):
+                return np.logical_and.reduce([i[0] for i in values]), np.logical_or.reduce([i[1] for i in values])
+            return np.logical_or.reduce([i[0] for i in values]), np.logical_and.reduce([i[1] for i in values])
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            may_true, may_false = self.__truth(node.operand)
+            return may_false, may_true
+        if isinstance(node, ast.Compare):
+            may_true, may_false = np.ones(n, dtype=bool), np.zeros(n, dtype=bool)
+            left = node.left
+            for op, right in zip(node.ops, node.comparators):
+                t, f = self.__compare(op, left, right) if not isinstance(op, (ast.In, ast.NotIn)) else unknown
+                may_true, may_false = may_true & t, may_false | f
+                left = right
+            return may_true, may_false
+        if isinstance(node, ast.Call) and node.func.id == "isfinite":
+            a = self.__num(node.args[0])
+            if a is _TEXT:
+                return unknown
+            return ~((a[0] == a[1]) & np.isinf(a[0]) & ~a[2]), a[2] | np.isinf(a[0]) | np.isinf(a[1])
+        if isinstance(node, ast.Call) and node.func.id in ("startswith", "contains"):
+            return unknown
+        # a bare number is true when non-zero
+        return self.__compare(ast.NotEq(), node, ast.Constant(0))
+
+    def __compare(self, op: ast.cmpop, left: ast.AST, right: ast.AST) -> tuple:
+        a, b = self.__num(left), self.__num(right)
+        n = len(self.rows)
+        if a is _TEXT or b is _TEXT:
+            return np.ones(n, dtype=bool), np.ones(n, dtype=bool)
+        nan = a[2] | b[2]
+        lt, le = a[0] < b[1], a[0] <= b[1]
+        gt, ge = a[1] > b[0], a[1] >= b[0]
+        eq = le & ge
+        ne = ~((a[0] == a[1]) & (b[0] == b[1]) & (a[0] == b[0]))
+        # NaN compares False, except for !=
+        return {
+            ast.Lt: (lt, ge | nan),
+            ast.LtE: (le, gt | nan),
+            ast.Gt: (gt, le | nan),
+            ast.GtE: (ge, lt | nan),
+            ast.Eq: (eq, ne | nan),
+            ast.NotEq: (ne | nan, eq),
+        }[type(op)]
+
+
+class Prefilter:
+    """
+    Drops tickers that provably cannot pass a screen before any per-ticker call is made.
+
+    Bulk endpoints (batch quotes and the key metrics TTM of every company) give approximate values of
+    some fundamentals for a fraction of a call per ticker. Each value is widened by `tolerance` into a
+    conservative interval, the screen's `require` and `any` expressions are evaluated over those intervals
+    (see `Bounds`), and a ticker is dropped only if a predicate is false for every value inside them.
+    Anything the bulk data says nothing about (e.g. the 5 year FCF history) stays unbounded, so the
+    predicates that read it can never drop a ticker here.
+
+    Parameters:
+    - `definition` (ScreenDefinition): The screen.
+    - `exhaustive` (bool): If True, predicates that read a screen parameter are ignored, as in `ScreenDefinition.steps`. Default is False.
+    - `tolerance` (float): Relative slack around each bulk value, covering the gap between bulk and per-ticker data. Default is 0.25.
+    """
+    def __init__(self, definition: ScreenDefinition, exhaustive: bool = False, tolerance: float = 0.25) -> None:
+        self.definition = definition
+        self.tolerance = tolerance
+        self.require = [i for i in definition.require if not (exhaustive and definition.parametric(i))]
+        self.any = [] if exhaustive and any(definition.parametric(i) for i in definition.any) else list(definition.any)
+        self.nullable = NULLABLE | {k for k, v in FIELDS.items() if v in definition.optional}
+
+    def bounds(self, tickers: list[str], quotes: dict, metrics: dict, market_cap: np.ndarray) -> dict[str:tuple]:
+        """
+        Derives `(lo, hi)` bounds from bulk records.
+
+        Monetary values get a slack of `tolerance` times the larger of their magnitude and the market cap,
+        so values close to zero are not taken as exact.
+
+        Parameters:
+        - `tickers` (list[str]): The tickers, in row order.
+        - `quotes` (dict): `Quote` records keyed by ticker.
+        - `metrics` (dict): `KeyMetricsTTM` records keyed by ticker.
+        - `market_cap` (np.ndarray): The profile market caps of `tickers`.
+
+        Returns:
+        - `dict[str:tuple]`: Arrays of lower and upper bounds, keyed by field or metric name. NaN bounds are unknown.
+        """
+        t = self.tolerance
+
+        def column(records: dict, attr: str) -> np.ndarray:
+            return np.array([getattr(records[k], attr) if k in records and getattr(records[k], attr) is not None else np.nan
+                             for k in tickers], dtype=float)
+
+        def around(value: np.ndarray, scale) -> tuple:
+            slack = t * np.maximum(np.abs(value), scale)
+            return value - slack, value + slack
+
+        price = column(quotes, "price")
+        ev = column(metrics, "enterprise_value")
+        market_cap_ttm = column(metrics, "market_cap")
+        # EV = market cap + net debt
+        slack = t * (np.abs(ev) + np.abs(market_cap_ttm))
+        return {
+            "price": around(price, 0),
+            # the highest close of the last 5 years is at least the current one
+            "price_max_5y": (price * (1 - t), np.full(len(tickers), np.inf)),
+            "outstanding_shares": around(column(quotes, "shares_outstanding"), 0),
+            "enterprise_value": around(ev, market_cap),
+            "market_cap_ttm": around(market_cap_ttm, market_cap),
+            "tangible_asset_value": around(column(metrics, "tangible_asset_value"), market_cap),
+            "fcf_per_share_ttm": around(column(metrics, "fcf_per_share"), price),
+            "net_debt": (ev - market_cap_ttm - slack, ev - market_cap_ttm + slack),
+            "ncav": around(column(metrics, "net_current_asset_value"), market_cap),
+        }
+
+    def possible(self, table: Table, rows: np.ndarray, bounds: dict) -> np.ndarray:
+        """
+        Returns, for each of `rows`, whether the ticker can still pass the screen.
+        """
+        env = Bounds(self.definition, table, rows, bounds, self.nullable)
+        ret = np.ones(len(rows), dtype=bool)
+        for expr in self.require:
+            ret &= env.truth(expr)[0]
+        if self.any:
+            ret &= np.logical_or.reduce([env.truth(i)[0] for i in self.any])
+        return ret
@@ -0,0 +1,223 @@
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+import atexit
+import cProfile
+import inspect
+import io
+import os
+import pstats
+import tracemalloc
+
+# set to 1 (or a directory) to profile every stage and Google Sheets call of the process
+PROFILE_ENV = "SCREENER_PROFILE"
+PROFILE_DIR = "./data/profiles"
+
+_profiler = None
+
+
+class _Section:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak = 0
+        # allocating line -> bytes still allocated when the section exited, summed over its calls
+        self.allocated = {}
+
+
+class Profiler:
+    """
+    CPU (cProfile) and memory (tracemalloc) profile of the sections of a run.
+
+    A section is a stage (`fetch`, `screen`, `publish`, `live`), a sequential fetch phase (`phase.<name>`) or a
+    Google Sheets call (`sheet.<method>`). Sections nest: the enclosing section is paused while an inner one runs, so
+    each profile only holds its own time (a sheet write inside a live run is in `sheet.append_row_data`, not in
+    `live`). A section entered several times accumulates into one profile. The streaming pipeline runs its phases
+    concurrently, so they share the stage's profile.
+
+    `finish` writes one `<section>.prof` per section (for `pstats` or snakeviz) and `summary.txt`, with each section's
+    time, peak traced memory, and its top functions by cumulative time and top allocating lines.
+
+    Parameters:
+    - `root` (str): Directory of the profiles; each run writes to a timestamped subdirectory. Default is `./data/profiles`.
+    - `top` (int): Functions and allocation lines listed per section. Default is 15.
+    - `memory` (bool): If True, traces allocations (slower). Default is True.
+    """
+    def __init__(self, root: str = PROFILE_DIR, top: int = 15, memory: bool = True) -> None:
+        self.path = os.path.join(root, datetime.now().strftime("%Y-%m-%d-%H%M%S"))
+        self.top = top
+        self.memory = memory
+        self.sections = {}
+        self.__stack = []
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __enter_section(self, name: str) -> tuple:
+        section = self.sections.get(name) or self.sections.setdefault(name, _Section(name))
+        if self.__stack:
+            outer = self.__stack[-1][0]
+            outer.profile.disable()
+        if self.memory:
+            self.__fold_peak()
+            tracemalloc.reset_peak()
+        entry = (section, perf_counter(), self.__snapshot() if self.memory else None)
+        self.__stack.append(entry)
+        section.calls += 1
+        section.profile.enable()
+        return entry
+
+    def __exit_section(self, entry: tuple) -> None:
+        section, start, before = entry
+        section.profile.disable()
+        section.seconds += perf_counter() - start
+        self.__stack.remove(entry)
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            section.peak = max(section.peak, peak)
+            for stat in self.__snapshot().compare_to(before, "lineno"):
+                if stat.size_diff:
+                    line = str(stat.traceback)
+                    section.allocated[line] = section.allocated.get(line, 0) + stat.size_diff
+            # memory is inclusive: the enclosing section saw this peak too
+            for outer, _, _ in self.__stack:
+                outer.peak = max(outer.peak, peak)
+            tracemalloc.reset_peak()
+        if self.__stack:
+            self.__stack[-1][0].profile.enable()
+
+    def __snapshot(self) -> tracemalloc.Snapshot:
+        # without the profiler's own allocations
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)])
+
+    def __fold_peak(self) -> None:
+        if self.__stack:
+            peak = tracemalloc.get_traced_memory()[1]
+            for outer, _, _ in self.__stack:
+                outer.peak = max(outer.peak, peak)
+
+    @contextmanager
+    def section(self, name: str):
+        """
+        Profiles the body of the `with` block as section `name`.
+        """
+        entry = self.__enter_section(name)
+        try:
+            yield
+        finally:
+            self.__exit_section(entry)
+
+    def summary(self) -> str:
+        """
+        Returns the summary: per section (slowest first) its calls, time and peak memory, top functions and allocations.
+        """
+        lines = []
+        for section in sorted(self.sections.values(), key=lambda i: -i.seconds):
+            lines.append(f"== {section.name}: {section.calls} call(s), {section.seconds:.2f}s, peak {section.peak / 1e6:.1f} MB")
+            stream = io.StringIO()
+            pstats.Stats(section.profile, stream=stream).sort_stats("cumulative").print_stats(self.top)
+            lines.extend(i for i in stream.getvalue().splitlines() if i.strip())
+            for line, size in sorted(section.allocated.items(), key=lambda i: -abs(i[1]))[:self.top]:
+                lines.append(f"  {line}: {size / 1e3:+.1f} KB")
+        return "\n".join(lines) + "\n"
+
+    def finish(self, debug: bool = True) -> str:
+        """
+        Writes the profiles and the summary, and prints each section's time and peak memory.
+
+        Returns:
+        - `str`: The directory of the profiles.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        for section in self.sections.values():
+            section.profile.dump_stats(os.path.join(self.path, f"{section.name}.prof"))
+        with open(os.path.join(self.path, "summary.txt"), 'w') as file:
+            file.write(self.summary())
+        if debug:
+            for section in sorted(self.sections.values(), key=lambda i: -i.seconds):
+                print(f"{section.name}: {section.calls} call(s), {section.seconds:.1f}s, peak {section.peak / 1e6:.1f} MB")
+            print(f"Profiles saved to {self.path}")
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return self.path
+
+
+def start(root: str = None, top: int = 15, memory: bool = True) -> Profiler:
+    """
+    Starts profiling the process (once); the profiles are written by `finish`, or at exit.
+
+    Parameters:
+    - `root` (str): Directory of the profiles. Defaults to the `SCREENER_PROFILE` environment variable if it is a
+      path, else `./data/profiles`.
+    - `top` (int): Functions and allocation lines listed per section. Default is 15.
+    - `memory` (bool): If True, traces allocations. Default is True.
+
+    Returns:
+    - `Profiler`: The active profiler.
+    """
+    global _profiler
+    if _profiler is None:
+        env = os.environ.get(PROFILE_ENV, "")
+        _profiler = Profiler(root or (env if env not in ("", "0", "1", "true") else PROFILE_DIR), top, memory)
+        atexit.register(finish)
+    return _profiler
+
+def start_from_env() -> Profiler:
+    """
+    Starts profiling if `SCREENER_PROFILE` is set (and not `0`).
+    """
+    return start() if os.environ.get(PROFILE_ENV, "0") != "0" else None
+
+def finish(debug: bool = True) -> str:
+    """
+    Stops profiling and writes the profiles (see `Profiler.finish`).
+
+    Returns:
+    - `str`: The directory of the profiles, or None if profiling was off.
+    """
+    global _profiler
+    if _profiler is None:
+        return None
+    profiler, _profiler = _profiler, None
+    return profiler.finish(debug)
+
+def profiled(name: str):
+    """
+    Decorator that profiles each call of a function (or coroutine function) as section `name` while profiling is on.
+    Off, the only cost is one check per call.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                if _profiler is None:
+                    return await func(*args, **kwargs)
+                with _profiler.section(name):
+                    return await func(*args, **kwargs)
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if _profiler is None:
+                    return func(*args, **kwargs)
+                with _profiler.section(name):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def section(name: str):
+    """
+    Returns a context manager that profiles its body as section `name` while profiling is on, else does nothing.
+    """
+    return _profiler.section(name) if _profiler is not None else _NULL
+
+
+class _Null:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL = _Null()
@@ -0,0 +1,97 @@
+import asyncio
+import numpy as np
+from .screens import ScreenDefinition
+from .table import Table
+
+
+class SheetPublisher:
+    """
+    Publishes passing results to the day's tab while a run is still fetching.
+
+    Tickers that clear every pipeline stage are screened straight away and buffered. A background task
+    appends the buffer to the sheet every `batch_rows` rows or `interval` seconds, running the gspread
+    calls in a worker thread so sheet I/O overlaps the fetch. `close` then rewrites the tab once in the
+    final sort order, which also repairs anything a failed flush missed.
+
+    Parameters:
+    - `definition` (ScreenDefinition): The screen, which selects the tab layout.
+    - `sheet_client` (Sheet): The Google Sheet to publish to.
+    - `batch_rows` (int): Buffered rows that trigger a flush. Default is 20.
+    - `interval` (float): Maximum seconds between flushes of a non-empty buffer. Default is 60.
+    - `debug` (bool): If True, prints each flush. Default is False.
+    """
+    def __init__(self, definition: ScreenDefinition, sheet_client, batch_rows: int = 20, interval: float = 60.0, debug: bool = False) -> None:
+        self.definition = definition
+        self.sheet_client = sheet_client
+        self.batch_rows = batch_rows
+        self.interval = interval
+        self.debug = debug
+        self.columns = None if definition.sheet_module else list(definition.columns)
+        self.buffer = []
+        self.published = 0
+        self.task = None
+        self.closed = False
+        self.wake = None
+
+    def __create_tab(self) -> None:
+        if self.definition.sheet_module == "alpha":
+            self.sheet_client.create_alpha_module_tab()
+        elif self.definition.sheet_module == "beta":
+            self.sheet_client.create_beta_module_tab()
+        else:
+            self.sheet_client.create_module_tab(["Ticker"] + self.columns)
+
+    async def start(self) -> None:
+        """
+        Creates the day's tab and starts the background flushes.
+        """
+        self.wake = asyncio.Event()
+        await asyncio.to_thread(self.__create_tab)
+        self.task = asyncio.create_task(self.__run())
+
+    def passed(self, table: Table, tickers: list[str]) -> None:
+        """
+        Screens tickers that cleared every stage and buffers their rows. Used as the pipeline's `on_pass`.
+        """
+        rows = np.zeros(table.alive.shape, dtype=bool)
+        rows[table.index(tickers)] = True
+        self.buffer.extend(self.definition.evaluate(table, rows).rows())
+        if len(self.buffer) >= self.batch_rows:
+            self.wake.set()
+
+    async def __run(self) -> None:
+        while not self.closed:
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Appends the buffered rows to the tab.
+        """
+        rows, self.buffer = self.buffer, []
+        if not rows:
+            return
+        try:
+            await asyncio.to_thread(self.sheet_client.append_row_data, rows, self.definition.sheet_module, self.columns)
+            self.published += len(rows)
+            print(f"{len(rows)} rows published ({self.published} so far).") if self.debug else None
+        except Exception as e:
+            # keep the rows for the next flush; the final rewrite publishes everything regardless
+            self.buffer = rows + self.buffer
+            print(f"Unable to publish {len(rows)} rows: {e}")
+
+    async def close(self, results: Table = None) -> None:
+        """
+        Stops the background flushes and, if `results` is given, rewrites the tab with them in order.
+        """
+        self.closed = True
+        if self.task is not None:
+            self.wake.set()
+            await self.task
+        if results is not None:
+            await asyncio.to_thread(self.sheet_client.rewrite_row_data, results, self.definition.sheet_module, self.columns)
+            print(f"{len(results)} rows published in final order.") if self.debug else None
@@ -0,0 +1,297 @@
+import csv
+import io
+import json
+
+
+class Record:
+    """
+    Base class for the typed FMP records used by the screeners.
+
+    Subclasses declare `FIELDS`, a mapping of attribute name to `(FMP key, type)`, and
+    `REQUIRED`, the attributes that must be present for the record to be valid. Decoding
+    validates and converts every field once, so the screening code can read attributes
+    directly instead of probing dictionaries inside `try/except` blocks.
+    """
+    __slots__ = ()
+    FIELDS: dict[str:tuple] = {}
+    REQUIRED: tuple = ()
+
+    def __init__(self, **values) -> None:
+        for attr in self.FIELDS:
+            setattr(self, attr, values.get(attr))
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{attr}={getattr(self, attr)!r}" for attr in self.FIELDS)
+        return f"{type(self).__name__}({values})"
+
+    @classmethod
+    def keys(cls) -> set[str]:
+        """
+        Returns the FMP keys read by this record.
+        """
+        return {key for key, _ in cls.FIELDS.values()}
+
+    @classmethod
+    def from_mapping(cls, item: dict) -> "Record":
+        """
+        Validates a decoded JSON object and converts it into a record.
+
+        Parameters:
+        - `item` (dict): A single JSON object from an FMP payload.
+
+        Returns:
+        - `Record`: The record, or None if a required field is missing or malformed.
+        """
+        if not isinstance(item, dict):
+            return None
+        values = {}
+        for attr, (key, kind) in cls.FIELDS.items():
+            value = _convert(item.get(key), kind)
+            if value is None and attr in cls.REQUIRED:
+                return None
+            values[attr] = value
+        return cls(**values)
+
+
+def _convert(value, kind: type):
+    if value is None or isinstance(value, bool):
+        return None
+    if kind is str:
+        return str(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Profile(Record):
+    __slots__ = ("symbol", "company_name", "market_cap", "price", "country", "exchange", "industry", "last_div")
+    FIELDS = {
+        "symbol": ("symbol", str),
+        "company_name": ("companyName", str),
+        "market_cap": ("mktCap", float),
+        "price": ("price", float),
+        "country": ("country", str),
+        "exchange": ("exchange", str),
+        "industry": ("industry", str),
+        "last_div": ("lastDiv", float),
+    }
+    REQUIRED = ("symbol", "market_cap", "industry")
+
+
+class BalanceSheet(Record):
+    __slots__ = ("date", "total_current_assets", "total_assets", "total_liabilities", "net_debt", "goodwill_and_intangible_assets")
+    FIELDS = {
+        "date": ("date", str),
+        "total_current_assets": ("totalCurrentAssets", float),
+        "total_assets": ("totalAssets", float),
+        "total_liabilities": ("totalLiabilities", float),
+        "net_debt": ("netDebt", float),
+        "goodwill_and_intangible_assets": ("goodwillAndIntangibleAssets", float),
+    }
+    REQUIRED = ("total_current_assets", "total_liabilities", "net_debt")
+
+
+class CashFlow(Record):
+    __slots__ = ("date", "period", "free_cash_flow", "common_stock_repurchased", "cash_at_end_of_period")
+    FIELDS = {
+        "date": ("date", str),
+        "period": ("period", str),
+        "free_cash_flow": ("freeCashFlow", float),
+        "common_stock_repurchased": ("commonStockRepurchased", float),
+        "cash_at_end_of_period": ("cashAtEndOfPeriod", float),
+    }
+    REQUIRED = ("free_cash_flow", "cash_at_end_of_period")
+
+
+class KeyMetricsTTM(Record):
+    __slots__ = ("symbol", "market_cap", "enterprise_value", "fcf_per_share", "tangible_asset_value", "net_current_asset_value")
+    FIELDS = {
+        "symbol": ("symbol", str),
+        "market_cap": ("marketCapTTM", float),
+        "enterprise_value": ("enterpriseValueTTM", float),
+        "fcf_per_share": ("freeCashFlowPerShareTTM", float),
+        "tangible_asset_value": ("tangibleAssetValueTTM", float),
+        "net_current_asset_value": ("netCurrentAssetValueTTM", float),
+    }
+    REQUIRED = ("enterprise_value", "fcf_per_share", "tangible_asset_value")
+
+
+class Quote(Record):
+    __slots__ = ("symbol", "price", "market_cap", "shares_outstanding")
+    FIELDS = {
+        "symbol": ("symbol", str),
+        "price": ("price", float),
+        "market_cap": ("marketCap", float),
+        "shares_outstanding": ("sharesOutstanding", float),
+    }
+    REQUIRED = ("symbol",)
+
+
+class Listing(Record):
+    __slots__ = ("symbol", "exchange", "type")
+    FIELDS = {
+        "symbol": ("symbol", str),
+        "exchange": ("exchangeShortName", str),
+        "type": ("type", str),
+    }
+    REQUIRED = ("symbol",)
+
+
+class SymbolChange(Record):
+    __slots__ = ("date", "old_symbol", "new_symbol")
+    FIELDS = {
+        "date": ("date", str),
+        "old_symbol": ("oldSymbol", str),
+        "new_symbol": ("newSymbol", str),
+    }
+    REQUIRED = ("old_symbol", "new_symbol")
+
+
+class ShareFloat(Record):
+    __slots__ = ("symbol", "outstanding_shares")
+    FIELDS = {
+        "symbol": ("symbol", str),
+        "outstanding_shares": ("outstandingShares", float),
+    }
+    REQUIRED = ("symbol", "outstanding_shares")
+
+
+class PriceHistory(Record):
+    __slots__ = ("symbol", "closes")
+    FIELDS = {
+        "symbol": ("symbol", str),
+        "closes": ("historical", list),
+    }
+    REQUIRED = ("closes",)
+
+    @classmethod
+    def keys(cls) -> set[str]:
+        return {"symbol", "historical", "close"}
+
+    @classmethod
+    def from_mapping(cls, item: dict) -> "PriceHistory":
+        if not isinstance(item, dict) or not isinstance(item.get("historical"), list):
+            return None
+        closes = [_convert(i.get("close"), float) for i in item["historical"] if isinstance(i, dict)]
+        if not closes or None in closes:
+            return None
+        return cls(symbol=_convert(item.get("symbol"), str), closes=closes)
+
+    @property
+    def current(self) -> float:
+        """
+        Returns the most recent close.
+        """
+        return self.closes[0]
+
+
+def load_payload(raw: bytes, record: type) -> object:
+    """
+    Parses a raw JSON payload, keeping only the keys read by `record`.
+
+    Unused keys are dropped as each object is decoded, so the full FMP objects are never built.
+
+    Parameters:
+    - `raw` (bytes): The response body.
+    - `record` (type): The `Record` subclass the payload will be converted into.
+
+    Returns:
+    - The parsed payload, or None if `raw` is empty or not valid JSON.
+    """
+    if not raw:
+        return None
+    wanted = record.keys()
+    try:
+        return json.loads(raw, object_pairs_hook=lambda pairs: {k: v for k, v in pairs if k in wanted})
+    except ValueError:
+        return None
+
+
+def decode_many(raw: bytes, record: type) -> list[Record]:
+    """
+    Decodes a batched payload (e.g. several profiles), skipping invalid entries.
+
+    Returns:
+    - `list`: The valid records, possibly empty.
+    """
+    payload = load_payload(raw, record)
+    if not isinstance(payload, list):
+        return []
+    ret = []
+    for item in payload:
+        rec = record.from_mapping(item)
+        if rec is not None:
+            ret.append(rec)
+    return ret
+
+
+def decode_statements(raw: bytes, record: type) -> list[Record]:
+    """
+    Decodes a statement history (most recent period first).
+
+    Returns:
+    - `list`: The records, or None if the payload is empty or any period is invalid.
+    """
+    payload = load_payload(raw, record)
+    if not isinstance(payload, list) or len(payload) == 0:
+        return None
+    ret = [record.from_mapping(item) for item in payload]
+    if None in ret:
+        return None
+    return ret
+
+
+def decode_one(raw: bytes, record: type) -> Record:
+    """
+    Decodes a payload holding a single object, or a list whose first entry is used.
+
+    Returns:
+    - `Record`: The record, or None if it is missing or invalid.
+    """
+    payload = load_payload(raw, record)
+    if isinstance(payload, list):
+        payload = payload[0] if payload else None
+    return record.from_mapping(payload)
+
+
+def decode_floats(raw: bytes) -> dict[str:float]:
+    """
+    Decodes the `shares_float/all` payload into a ticker -> outstanding shares index.
+
+    Returns:
+    - `dict`: Outstanding shares keyed by ticker, or None if the payload is invalid.
+    """
+    payload = load_payload(raw, ShareFloat)
+    if not isinstance(payload, list):
+        return None
+    ret = {}
+    for item in payload:
+        rec = ShareFloat.from_mapping(item)
+        if rec is not None:
+            ret[rec.symbol] = rec.outstanding_shares
+    return ret
+
+
+def decode_csv(raw: bytes, record: type) -> dict[str:Record]:
+    """
+    Decodes a CSV bulk payload (e.g. `key-metrics-ttm-bulk`) into a ticker -> record index.
+
+    Empty cells are treated as missing values. Rows without a valid `symbol` are skipped.
+
+    Returns:
+    - `dict`: Records keyed by ticker, or None if `raw` is empty or not CSV.
+    """
+    if not raw:
+        return None
+    try:
+        reader = csv.DictReader(io.StringIO(raw.decode("utf-8-sig")))
+        rows = list(reader)
+    except (UnicodeDecodeError, csv.Error):
+        return None
+    ret = {}
+    for row in rows:
+        rec = record.from_mapping({k: v for k, v in row.items() if v != ""})
+        if rec is not None and getattr(rec, "symbol", None):
+            ret[rec.symbol] = rec
+    return ret
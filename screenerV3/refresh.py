@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import json
+import os
+from screener.helpers.edgar import convert_company_tickers
+from .records import Listing, SymbolChange, decode_many
+from .symbols import SUFFIXES, TICKERS_PATH, canonical, suffix_country
+
+COMPANY_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+
+# exchanges whose symbols have no suffix and make up the USA list
+US_EXCHANGES = ("NYSE", "NASDAQ", "AMEX")
+
+
+def build(listings: list[Listing], edgar: dict[str:int] = None) -> dict[str:list]:
+    """
+    Builds a new country -> tickers universe of every stock from bulk symbol lists (`--build`). Existing lists are
+    curated, so `refresh` never adds these to them.
+
+    Only stocks are kept. A listing's country is the one of its exchange suffix (see `symbols.SUFFIXES`); symbols
+    without a suffix count for the USA when they trade on a US exchange and, given the EDGAR list, file with the SEC
+    (which drops the funds and trusts FMP lists as stocks).
+
+    Parameters:
+    - `listings` (list[Listing]): FMP's stock list.
+    - `edgar` (dict[str:int]): The EDGAR ticker -> CIK list (`company_tickers.json`). Default is None.
+
+    Returns:
+    - `dict[str:list]`: The sorted tickers of each country in `SUFFIXES`.
+    """
+    ret = {country: set() for country in SUFFIXES}
+    filers = {canonical(k) for k in edgar} if edgar is not None else None
+    for i in listings:
+        if i.type not in (None, "stock"):
+            continue
+        symbol = canonical(i.symbol)
+        country = suffix_country(symbol)
+        if country is None or (country == "USA" and (i.exchange not in US_EXCHANGES or (filers is not None and symbol not in filers))):
+            continue
+        ret[country].add(symbol)
+    return {k: sorted(v) for k, v in ret.items()}
+
+
+def renames(changes: list[SymbolChange]) -> dict[str:str]:
+    """
+    Returns the current symbol of every renamed ticker, following chains of changes (`A -> B`, then `B -> C`).
+    """
+    step = {}
+    for i in sorted(changes, key=lambda i: i.date or ""):
+        step[canonical(i.old_symbol)] = canonical(i.new_symbol)
+    ret = {}
+    for old in step:
+        new, seen = step[old], {old}
+        while new in step and new not in seen:
+            seen.add(new)
+            new = step[new]
+        ret[old] = new
+    return ret
+
+
+def diff(current: dict[str:list], listings: list[Listing], changes: list[SymbolChange] = None) -> dict[str:dict]:
+    """
+    Returns the tickers of each country that were delisted or renamed.
+
+    A ticker FMP no longer lists is renamed when a symbol change leads to a listed symbol, else removed. Nothing is
+    added: the lists are curated (e.g. `non_banking_tickers.json` has no banks), so new listings are not theirs to take.
+
+    Returns:
+    - `dict[str:dict]`: Per country that changed, the `removed` tickers and the `renamed` ones (`{old: new}`).
+    """
+    listed = {canonical(i.symbol) for i in listings}
+    renamed = renames(changes or [])
+    ret = {}
+    for country, tickers in current.items():
+        change = {"removed": [], "renamed": {}}
+        for k in tickers:
+            symbol = canonical(k)
+            if symbol in listed:
+                continue
+            if renamed.get(symbol) in listed:
+                change["renamed"][k] = renamed[symbol]
+            else:
+                change["removed"].append(k)
+        if change["removed"] or change["renamed"]:
+            ret[country] = change
+    return ret
+
+
+def apply(current: dict[str:list], changes: dict[str:dict]) -> dict[str:list]:
+    """
+    Applies a `diff` to a universe. Renamed tickers keep their place, and a new symbol already in the list is not repeated.
+    """
+    ret = {}
+    for country, tickers in current.items():
+        change = changes.get(country, {"removed": [], "renamed": {}})
+        removed, seen = set(change["removed"]), set()
+        ret[country] = []
+        for k in tickers:
+            k = change["renamed"].get(k, k)
+            if k not in removed and canonical(k) not in seen:
+                seen.add(canonical(k))
+                ret[country].append(k)
+    return ret
+
+
+def refresh(path: str, listings: list[Listing], changes: list[SymbolChange] = None, dry_run: bool = False, debug: bool = False) -> dict[str:dict]:
+    """
+    Refreshes a universe file (e.g. `data/cleaned_tickers.json`): delisted tickers are dropped and renamed ones
+    follow their new symbol (see `diff`). The file is only rewritten when a country changed.
+
+    Parameters:
+    - `path` (str): The country -> tickers JSON file.
+    - `listings` (list[Listing]): FMP's stock list.
+    - `changes` (list[SymbolChange]): FMP's symbol changes. Default is None.
+    - `dry_run` (bool): If True, the file is left as is. Default is False.
+    - `debug` (bool): If True, prints the changes of each country. Default is False.
+
+    Returns:
+    - `dict[str:dict]`: The changes (see `diff`).
+    """
+    with open(path, 'r') as file:
+        current = json.load(file)
+    ret = diff(current, listings, changes)
+    for country, change in ret.items():
+        print(f"{country}: {len(change['removed'])} removed, {len(change['renamed'])} renamed.") if debug else None
+    if ret and not dry_run:
+        _write(path, apply(current, ret))
+    return ret
+
+
+def _write(path: str, universe: dict[str:list]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as file:
+        json.dump(universe, file, indent=2)
+    os.replace(tmp, path)
+
+
+async def download(handler, tickers_path: str = TICKERS_PATH) -> tuple[list[Listing], list[SymbolChange]]:
+    """
+    Downloads FMP's stock list and symbol changes (one request each) and saves the SEC `company_tickers.json` (one
+    request) over `tickers_path`.
+
+    The SEC requires a descriptive User-Agent, read from the `SEC_USER_AGENT` environment variable.
+    """
+    import requests
+    async with handler.session() as session:
+        listings = await handler.get_stock_list(session)
+        changes = await handler.get_symbol_changes(session)
+    res = requests.get(COMPANY_TICKERS_URL, headers={"User-Agent": os.environ.get("SEC_USER_AGENT", "market_screener admin@example.com")})
+    if res.status_code == 200:
+        with open(tickers_path, 'wb') as file:
+            file.write(res.content)
+    else:
+        print(f"Unable to download company_tickers.json ({res.status_code}).")
+    return listings, changes
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Drops delisted tickers from universe files and follows renamed ones, from FMP's stock list and symbol changes.")
+    parser.add_argument("paths", nargs="+", help="The country -> tickers JSON files to refresh (e.g. ./data/cleaned_tickers.json), or with --build the new file.")
+    parser.add_argument("--build", action="store_true", help="Writes a new universe of every listed stock to the (new) path instead.")
+    parser.add_argument("--stock-list", default=None, help="A saved FMP stock list (JSON) to use instead of downloading it.")
+    parser.add_argument("--symbol-changes", default=None, help="Saved FMP symbol changes (JSON), read with --stock-list.")
+    parser.add_argument("--company-tickers", default=None, help="The SEC company_tickers.json, for --build: read as is with --stock-list, else downloaded over. Default is ./data/older-data/company_tickers.json.")
+    parser.add_argument("--dry-run", action="store_true", help="Prints the changes without writing them.")
+    parser.add_argument("--transport", default=None, help="HTTP transport (aiohttp or httpx).")
+    args = parser.parse_args(argv)
+    if args.stock_list:
+        with open(args.stock_list, 'rb') as file:
+            listings = decode_many(file.read(), Listing)
+        changes = []
+        if args.symbol_changes:
+            with open(args.symbol_changes, 'rb') as file:
+                changes = decode_many(file.read(), SymbolChange)
+        tickers_path = args.company_tickers
+    else:
+        from .utilities import Handler
+        tickers_path = args.company_tickers or TICKERS_PATH
+        listings, changes = asyncio.run(download(Handler(args.transport), tickers_path))
+    if not listings:
+        print("No listings, nothing refreshed.")
+        return
+    if args.build:
+        edgar = convert_company_tickers(tickers_path) if tickers_path and os.path.exists(tickers_path) else None
+        for path in args.paths:
+            if os.path.exists(path):
+                print(f"{path} exists: --build only writes new files.")
+                continue
+            universe = build(listings, edgar)
+            print(f"{path}: {sum(len(i) for i in universe.values())} tickers.")
+            if not args.dry_run:
+                _write(path, universe)
+        return
+    for path in args.paths:
+        print(f"{path}:")
+        refresh(path, listings, changes, dry_run=args.dry_run, debug=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+from datetime import datetime
+import argparse
+import numpy as np
+from .fundamentals import ENDPOINTS, FIELDS, fetched
+from .prefilter import NULLABLE, Bounds
+from .screens import ScreenDefinition, load_screen
+from .snapshots import SNAPSHOTS_DIR, SnapshotStore
+from .table import Table, OBJECT
+
+# (relative move of the last fundamentals that can flip the screen's outcome, days between refreshes), nearest first;
+# names the largest move cannot flip fall in a last tier refreshed every quarter
+TIERS = ((0.1, 7), (0.5, 28))
+FAR_INTERVAL = 91
+
+# values that change sign: their slack scales with the market cap (like `Prefilter.bounds`), so values near zero are not
+# taken as exact; every other value moves relative to itself
+SIGNED = {"net_debt", "fcf_total", "trailing_fcf", "enterprise_value", "tangible_asset_value"}
+
+
+class RefreshScheduler:
+    """
+    Picks the tickers a run refreshes within an API budget, nearest to the screen's thresholds first.
+
+    Each ticker is scored from its latest archived snapshot (see `SnapshotStore`). Its fundamentals are widened by each
+    tier's tolerance into intervals (values that change sign relative to the market cap) and the screen's `require` and `any`
+    expressions are evaluated over them (see `prefilter.Bounds`). The ticker's tier is the first one whose move can flip
+    its outcome. A ticker at an NCAV ratio of 2.4 against a 2.5 cutoff is in the first tier and refreshed every week, one
+    at 40 in the last and refreshed every quarter. Missing values are unbounded, so a ticker that never reached a phase is
+    as near as the data it lacks allows.
+
+    The score is the days since the snapshot over the tier's interval, so a ticker is due at 1. Tickers are taken by
+    score until the budget is spent, each costing the calls of the endpoints its last fetch reached. Tickers without a
+    snapshot are due, in the middle tier, and cost every endpoint of the screen.
+
+    Parameters:
+    - `definition` (ScreenDefinition): The screen whose thresholds are active.
+    - `store` (SnapshotStore): The snapshot archive.
+    - `now` (datetime): The date staleness is measured at. Defaults to now.
+    """
+    def __init__(self, definition: ScreenDefinition, store: SnapshotStore, now: datetime = None) -> None:
+        self.definition = definition
+        self.store = store
+        self.now = now or datetime.now()
+        self.__latest = None
+
+    def __load(self) -> tuple:
+        if self.__latest is None:
+            table, dates, date, ticker = self.store.load()
+            # the last snapshot of each ticker
+            order = np.lexsort((date, ticker))
+            last = np.ones(len(order), dtype=bool)
+            last[:-1] = ticker[order][1:] != ticker[order][:-1]
+            rows = order[last]
+            age = np.array([(self.now - datetime.strptime(i, "%Y-%m-%d")).days for i in dates], dtype=float)
+            self.__latest = table, {k: row for k, row in zip(ticker[rows].tolist(), rows.tolist())}, age[date] if len(date) else age
+        return self.__latest
+
+    def __tiers(self, table: Table, rows: np.ndarray) -> np.ndarray:
+        text = {name: table[name][rows] for name in table.schema if table.schema[name] == OBJECT}
+        local = Table.from_arrays([str(i) for i in range(len(rows))], text, {name: OBJECT for name in text})
+        market_cap = table.numeric("market_cap", rows) if "market_cap" in table.schema else np.full(len(rows), np.nan)
+        price = table.numeric("price", rows) if "price" in table.schema else np.full(len(rows), np.nan)
+        nullable = NULLABLE | {k for k, v in FIELDS.items() if v in self.definition.optional}
+        # `Bounds` cannot tell text predicates, which no move flips, so they are evaluated as is where their fields are known
+        exact, namespace = {}, self.definition.namespace(local)
+        for expr in self.definition.require + self.definition.any:
+            names = self.definition.fields(expr)
+            if names and all(i in text for i in names):
+                known = np.logical_and.reduce([np.array([v is not None for v in text[i]], dtype=bool) for i in names])
+                value = np.broadcast_to(np.asarray(expr.evaluate(namespace), dtype=bool), known.shape)
+                exact[expr.source] = value | ~known, ~value | ~known
+        ret = np.full(len(rows), len(TIERS))
+        for tier in reversed(range(len(TIERS))):
+            tolerance = TIERS[tier][0]
+            bounds = {}
+            for name in [i for i in FIELDS if i in table.schema and table.schema[i] != OBJECT]:
+                value = table.numeric(name, rows)
+                scale = market_cap if name in SIGNED else price if name == "fcf_per_share_ttm" else 0
+                slack = tolerance * np.fmax(np.abs(value), scale)
+                bounds[name] = value - slack, value + slack
+            env = Bounds(self.definition, local, np.arange(len(rows)), bounds, nullable)
+            may_pass, may_fail = np.ones(len(rows), dtype=bool), np.zeros(len(rows), dtype=bool)
+            for expr in self.definition.require:
+                t, f = exact[expr.source] if expr.source in exact else env.truth(expr)
+                may_pass, may_fail = may_pass & t, may_fail | f
+            if self.definition.any:
+                truths = [exact[i.source] if i.source in exact else env.truth(i) for i in self.definition.any]
+                may_pass &= np.logical_or.reduce([i[0] for i in truths])
+                may_fail |= np.logical_and.reduce([i[1] for i in truths])
+            ret[may_pass & may_fail] = tier
+        return ret
+
+    def __costs(self, table: Table, rows: np.ndarray) -> np.ndarray:
+        endpoints = self.definition.endpoints
+        ret = np.full(len(rows), ENDPOINTS["profile"][0])
+        for endpoint in [i for i in endpoints if i != "profile"]:
+            ret += np.where(fetched(table, endpoint, rows), ENDPOINTS[endpoint][0], 0)
+        return ret
+
+    def scores(self, tickers: list[str]) -> dict[str:np.ndarray]:
+        """
+        Scores tickers for refreshing.
+
+        Returns:
+        - `dict[str:np.ndarray]`: Per ticker, its `tier` (an index into `TIERS`, `len(TIERS)` for the far tier), the
+          days since its snapshot (`age`, NaN without one), its `score` and its expected `cost` in API calls.
+        """
+        table, latest, age = self.__load()
+        intervals = np.array([i[1] for i in TIERS] + [FAR_INTERVAL], dtype=float)
+        known = np.array([k in latest for k in tickers], dtype=bool)
+        rows = np.array([latest.get(k, 0) for k in tickers], dtype=int)[known]
+        tier = np.full(len(tickers), min(1, len(TIERS)))
+        ret_age = np.full(len(tickers), np.nan)
+        cost = np.full(len(tickers), sum(ENDPOINTS[i][0] for i in self.definition.endpoints))
+        if len(rows):
+            tier[known], ret_age[known], cost[known] = self.__tiers(table, rows), age[rows], self.__costs(table, rows)
+        score = np.where(known, ret_age / intervals[tier], 1.0)
+        return {"tier": tier, "age": ret_age, "score": score, "cost": cost}
+
+    def select(self, tickers: list[str], budget: float, debug: bool = False) -> list[str]:
+        """
+        Returns the tickers to refresh, in `tickers` order.
+
+        Parameters:
+        - `tickers` (list[str]): The universe.
+        - `budget` (float): API calls the run may spend.
+        - `debug` (bool): If True, prints the tickers due and picked per tier. Default is False.
+
+        Returns:
+        - `list[str]`: The highest scored tickers whose expected cost fits in the budget. Ties go to the nearer tier.
+        """
+        scores = self.scores(tickers)
+        order = np.lexsort((scores["tier"], -scores["score"]))
+        picked = np.zeros(len(tickers), dtype=bool)
+        picked[order[np.cumsum(scores["cost"][order]) <= budget]] = True
+        if debug:
+            for tier in range(len(TIERS) + 1):
+                mask = scores["tier"] == tier
+                due = mask & (scores["score"] >= 1)
+                print(f"Tier {tier}: {int(mask.sum())} tickers, {int(due.sum())} due, {int((mask & picked).sum())} refreshed.")
+            print(f"{int(picked.sum())} of {len(tickers)} tickers refreshed for about {scores['cost'][picked].sum():.0f} requests.")
+        return [k for k, i in zip(tickers, picked) if i]
+
+    def order(self, tickers: list[str]) -> list[str]:
+        """
+        Returns `tickers` with the likeliest passers first, so a run that stops early (see `fetch_stage`) has screened them.
+
+        Per the latest snapshots, the tickers that passed the screen come first, then the nearest tiers, then the tickers
+        of the industries with the highest pass rates (smoothed towards the overall rate). Tickers without a snapshot are
+        in the middle tier, at the overall rate. Ties keep `tickers` order.
+        """
+        table, latest, _ = self.__load()
+        if not latest:
+            return list(tickers)
+        passed = self.definition.complete(table) & self.definition.mask(table)
+        rows = np.array(list(latest.values()), dtype=int)
+        overall = float(passed[rows].mean())
+        industry = table["industry"] if "industry" in table.schema else np.full(len(table.alive), None, dtype=object)
+        counts = {}
+        for i in rows:
+            count = counts.setdefault(industry[i], [0, 0])
+            count[0], count[1] = count[0] + int(passed[i]), count[1] + 1
+        # an industry seen a few times weighs little against the overall rate
+        rates = {k: (p + 5 * overall) / (n + 5) for k, (p, n) in counts.items()}
+        last, rate = np.zeros(len(tickers), dtype=bool), np.full(len(tickers), overall)
+        for i, k in enumerate(tickers):
+            row = latest.get(k)
+            if row is not None:
+                last[i], rate[i] = passed[row], rates[industry[row]]
+        order = np.lexsort((-rate, self.scores(tickers)["tier"], ~last))
+        return [tickers[i] for i in order]
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Prints which tickers a screen's next run would refresh within an API budget.")
+    parser.add_argument("screen", help="Screen name (e.g. payback) or path to a screen YAML file.")
+    parser.add_argument("--tickers", required=True, help="JSON file of tickers keyed by country, or a compiled universe.")
+    parser.add_argument("--budget", type=float, required=True, help="API calls the run may spend.")
+    parser.add_argument("--snapshots", default=SNAPSHOTS_DIR, help="The snapshot archive.")
+    args = parser.parse_args(argv)
+    from .universe import Universe
+    RefreshScheduler(load_screen(args.screen), SnapshotStore(args.snapshots)).select(Universe.load(args.tickers).tickers, args.budget, debug=True)
+
+
+if __name__ == "__main__":
+    main()
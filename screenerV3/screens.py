@@ -0,0 +1,432 @@
+import ast
+import os
+import numpy as np
+import yaml
+from .fundamentals import ENDPOINTS, FIELDS, fetched
+from .planner import Step
+from .table import Table, INT, OBJECT
+
+SCREENS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "screens")
+
+# derived metrics available to every screen; a screen can override them in its own `metrics` section
+METRICS = {
+    "ncav": "total_current_assets - total_liabilities",
+    "ncav_ratio": "market_cap / ncav",
+    "fcf_average": "fcf_total / 5",
+    "fcf_yield": "fcf_average / market_cap * 100",
+    "ttm_fcf": "fcf_per_share_ttm * outstanding_shares",
+    "afcf": "(ttm_fcf + fcf_total) / 5",
+    "p_afcf": "market_cap / afcf",
+    "ev_afcf": "enterprise_value / afcf",
+    "p_tbv": "market_cap / tangible_asset_value",
+    "price_metric_5y": "(price_max_5y - price) / price * 100",
+}
+
+CONSTANTS = {"nan": np.nan, "inf": np.inf, "True": True, "False": False}
+
+
+def _startswith(values: np.ndarray, prefixes: list[str]) -> np.ndarray:
+    values = np.asarray(values).astype(str)
+    ret = np.zeros(values.shape, dtype=bool)
+    for prefix in prefixes:
+        ret |= np.char.startswith(values, prefix)
+    return ret
+
+def _contains(values: np.ndarray, parts: list[str]) -> np.ndarray:
+    values = np.asarray(values).astype(str)
+    ret = np.zeros(values.shape, dtype=bool)
+    for part in parts:
+        ret |= np.char.find(values, part) >= 0
+    return ret
+
+def _select(*args) -> np.ndarray:
+    # select(cond_1, value_1, cond_2, value_2, ..., [default]) -> first value whose condition holds
+    default = args[-1] if len(args) % 2 else np.nan
+    return np.select([np.asarray(i, dtype=bool) for i in args[0:len(args) - len(args) % 2:2]], list(args[1::2]), default=default)
+
+def _where(cond, x, y) -> np.ndarray:
+    # a text choice keeps the other values as they are (numpy would turn them all into strings)
+    if isinstance(x, str) or isinstance(y, str):
+        x, y = [np.asarray(i, dtype=object) if not isinstance(i, str) else i for i in (x, y)]
+    return np.where(cond, x, y)
+
+FUNCTIONS = {
+    "round": lambda x, n=0: np.round(x, int(n)),
+    "int": np.round,
+    "abs": np.abs,
+    "where": _where,
+    "isfinite": lambda x: np.isfinite(np.asarray(x, dtype=float)),
+    "startswith": _startswith,
+    "contains": _contains,
+    "select": _select,
+}
+
+_BINARY = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide, ast.Pow: np.power,
+}
+
+_COMPARE = {
+    ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+
+
+class Expression:
+    """
+    A vectorised expression over fundamentals columns, e.g. `0 < p_afcf < 10` or `country not in ["CN", "HK"]`.
+
+    Supports arithmetic, (chained) comparisons, `and`/`or`/`not`, `in`/`not in` against literal lists and the
+    functions in `FUNCTIONS`. Names are resolved against the fundamentals columns, metrics and screen parameters.
+    """
+    def __init__(self, source) -> None:
+        self.source = str(source)
+        try:
+            self.tree = ast.parse(self.source.strip(), mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression '{self.source}': {e.msg}")
+        self.names = set()
+        self.__validate(self.tree)
+
+    def __validate(self, node: ast.AST) -> None:
+        if isinstance(node, ast.Name):
+            if node.id not in CONSTANTS:
+                self.names.add(node.id)
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float, str)):
+                raise ValueError(f"Unsupported literal in '{self.source}'.")
+        elif isinstance(node, (ast.List, ast.Tuple)):
+            for i in node.elts:
+                if not isinstance(i, ast.Constant):
+                    raise ValueError(f"Lists may only hold literals in '{self.source}'.")
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise ValueError(f"Unsupported function call in '{self.source}'.")
+            for i in node.args:
+                self.__validate(i)
+        elif isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            self.__validate(node.left)
+            self.__validate(node.right)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+            self.__validate(node.operand)
+        elif isinstance(node, ast.BoolOp):
+            for i in node.values:
+                self.__validate(i)
+        elif isinstance(node, ast.Compare):
+            self.__validate(node.left)
+            for op, i in zip(node.ops, node.comparators):
+                if type(op) not in _COMPARE and not isinstance(op, (ast.In, ast.NotIn)):
+                    raise ValueError(f"Unsupported comparison in '{self.source}'.")
+                if isinstance(op, (ast.In, ast.NotIn)) and not isinstance(i, (ast.List, ast.Tuple)):
+                    raise ValueError(f"`in` requires a literal list in '{self.source}'.")
+                self.__validate(i)
+        else:
+            raise ValueError(f"Unsupported syntax '{type(node).__name__}' in '{self.source}'.")
+
+    @property
+    def is_int(self) -> bool:
+        """
+        True if the expression is wrapped in `int(...)`, i.e. its column should be emitted as integers.
+        """
+        return isinstance(self.tree, ast.Call) and self.tree.func.id == "int"
+
+    def evaluate(self, env):
+        """
+        Evaluates the expression.
+
+        Parameters:
+        - `env`: A mapping from names to arrays or scalars (see `Namespace`).
+
+        Returns:
+        - An array over all table rows, or a scalar for constant expressions.
+        """
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return self.__eval(self.tree, env)
+
+    def __eval(self, node: ast.AST, env):
+        if isinstance(node, ast.Name):
+            return CONSTANTS[node.id] if node.id in CONSTANTS else env[node.id]
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, (ast.List, ast.Tuple)):
+            return [i.value for i in node.elts]
+        if isinstance(node, ast.Call):
+            return FUNCTIONS[node.func.id](*[self.__eval(i, env) for i in node.args])
+        if isinstance(node, ast.BinOp):
+            return _BINARY[type(node.op)](self.__eval(node.left, env), self.__eval(node.right, env))
+        if isinstance(node, ast.UnaryOp):
+            value = self.__eval(node.operand, env)
+            return np.logical_not(value) if isinstance(node.op, ast.Not) else np.negative(value)
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            ret = self.__eval(node.values[0], env)
+            for i in node.values[1:]:
+                ret = combine(ret, self.__eval(i, env))
+            return ret
+        # ast.Compare: a < b < c -> (a < b) & (b < c)
+        ret = True
+        left = self.__eval(node.left, env)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = self.__eval(comparator, env)
+            if isinstance(op, (ast.In, ast.NotIn)):
+                result = np.isin(np.asarray(left, dtype=object), right)
+                result = np.logical_not(result) if isinstance(op, ast.NotIn) else result
+            else:
+                result = _COMPARE[type(op)](left, right)
+            ret = np.logical_and(ret, result)
+            left = right
+        return ret
+
+
+class Namespace:
+    """
+    Resolves expression names for one evaluation over a fundamentals table: screen parameters,
+    then fundamentals columns, then metrics (evaluated on demand and cached).
+
+    If `rows` is given, arrays only cover those rows of the table (see `Table.index`).
+    """
+    def __init__(self, table: Table, metrics: dict[str:Expression], params: dict[str:float], cache: dict = None, rows: np.ndarray = None) -> None:
+        self.table = table
+        self.metrics = metrics
+        self.params = params
+        self.cache = dict(cache or {})
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.table.alive) if self.rows is None else len(self.rows)
+
+    def __getitem__(self, name: str):
+        if name in self.params:
+            return self.params[name]
+        if name not in self.cache:
+            if name in self.table.schema:
+                if self.table.schema[name] == OBJECT:
+                    self.cache[name] = self.table[name] if self.rows is None else self.table[name][self.rows]
+                else:
+                    self.cache[name] = self.table.numeric(name, self.rows)
+            elif name in self.metrics:
+                self.cache[name] = self.metrics[name].evaluate(self)
+            elif name in FIELDS:
+                self.cache[name] = np.full(len(self), np.nan)
+            else:
+                raise KeyError(f"Unknown field, metric or parameter '{name}'.")
+        return self.cache[name]
+
+
+class ScreenDefinition:
+    """
+    A screen compiled from a YAML definition.
+
+    Keys:
+    - `name`: Name of the screen (used for statistics and run files).
+    - `sheet_module`: Sheet layout used to publish the results (`alpha`, `beta` or omitted for a generic tab).
+    - `sheet_name`: Google Sheet the results are published to. Defaults to `Screener`.
+    - `params`: Named thresholds referenced by the expressions; overridable without editing the expressions.
+    - `metrics`: Screen-specific derived metrics (override `METRICS`).
+    - `require`: Expressions every result must satisfy. Each one is applied as soon as its endpoints are fetched.
+    - `any`: Expressions of which at least one must hold.
+    - `optional`: Endpoints whose missing data does not remove a ticker.
+    - `columns`: Output columns, as `Display Name: expression`. Wrap in `int(...)` for integer columns.
+    - `sort`: Output columns to sort on, ascending; prefix with `-` for descending.
+    """
+    def __init__(self, name: str, require: list = None, any: list = None, metrics: dict = None, params: dict = None,
+                 columns: dict = None, sort: list = None, optional: list = None, sheet_module: str = None, sheet_name: str = "Screener") -> None:
+        self.name = name
+        self.sheet_module = sheet_module
+        self.sheet_name = sheet_name
+        self.params = dict(params or {})
+        self.metrics = {k: Expression(v) for k, v in METRICS.items()}
+        self.metrics.update({k: Expression(v) for k, v in (metrics or {}).items()})
+        self.require = [Expression(i) for i in (require or [])]
+        self.any = [Expression(i) for i in (any or [])]
+        self.columns = {k: Expression(v) for k, v in (columns or {}).items()}
+        self.sort = list(sort or [])
+        self.optional = set(optional or [])
+        for i in self.sort:
+            if i.lstrip("-") not in self.columns:
+                raise ValueError(f"Sort column '{i}' is not an output column of screen '{name}'.")
+        for expr in self.require + self.any + list(self.columns.values()):
+            self.fields(expr)
+
+    @classmethod
+    def from_yaml(cls, path: str) -> "ScreenDefinition":
+        with open(path, 'r') as file:
+            return cls(**yaml.safe_load(file))
+
+    def with_params(self, **params) -> "ScreenDefinition":
+        """
+        Returns a copy of the screen with some parameters overridden.
+        """
+        unknown = [i for i in params if i not in self.params]
+        if unknown:
+            raise ValueError(f"Unknown parameters {unknown} for screen '{self.name}'.")
+        ret = object.__new__(type(self))
+        ret.__dict__.update(self.__dict__)
+        ret.params = {**self.params, **params}
+        return ret
+
+    def fields(self, expr: Expression, seen: set = None) -> set[str]:
+        """
+        Returns the fundamentals columns an expression reads, following metrics recursively.
+        """
+        seen = seen if seen is not None else set()
+        ret = set()
+        for name in expr.names:
+            if name in self.params or name in seen:
+                continue
+            if name in FIELDS:
+                ret.add(name)
+            elif name in self.metrics:
+                seen.add(name)
+                ret |= self.fields(self.metrics[name], seen)
+            else:
+                raise ValueError(f"Unknown field, metric or parameter '{name}' in screen '{self.name}'.")
+        return ret
+
+    def parametric(self, expr: Expression, seen: set = None) -> bool:
+        """
+        Returns True if an expression reads a screen parameter, directly or through metrics.
+        """
+        seen = seen if seen is not None else set()
+        for name in expr.names:
+            if name in self.params:
+                return True
+            if name in self.metrics and name not in FIELDS and name not in seen:
+                seen.add(name)
+                if self.parametric(self.metrics[name], seen):
+                    return True
+        return False
+
+    def endpoints_of(self, expr: Expression) -> set[str]:
+        return {FIELDS[i] for i in self.fields(expr)}
+
+    @property
+    def endpoints(self) -> set[str]:
+        """
+        The endpoints needed to evaluate the screen and its output columns.
+        """
+        ret = set()
+        for expr in self.require + self.any + list(self.columns.values()):
+            ret |= self.endpoints_of(expr)
+        return ret
+
+    def __ordered(self, endpoints: set[str]) -> tuple:
+        return tuple(i for i in ENDPOINTS if i in endpoints)
+
+    def namespace(self, table: Table, cache: dict = None, rows: np.ndarray = None) -> Namespace:
+        return Namespace(table, self.metrics, self.params, cache, rows)
+
+    def static_values(self, table: Table) -> dict:
+        """
+        Evaluates every metric that does not depend on a parameter.
+
+        The returned cache can be passed to `evaluate` for each parameter set of a sweep, so only
+        the parametric expressions are recomputed.
+        """
+        env = self.namespace(table)
+        for name, expr in self.metrics.items():
+            if not self.parametric(expr) and self.fields(expr) <= set(table.schema):
+                env[name]
+        return env.cache
+
+    def steps(self, debug: bool = False, exhaustive: bool = False) -> list[Step]:
+        """
+        Returns one planner step per `require` expression, plus one for the `any` group.
+
+        Each step removes the failing tickers as soon as the endpoints it reads have been fetched.
+        With `exhaustive`, filters that read a parameter are left out so that the fetched fundamentals
+        can be re-screened with any parameter values (see `screenerV3/sweep.py`).
+        """
+        ret = []
+        for expr in self.require:
+            if exhaustive and self.parametric(expr):
+                continue
+            ret.append(Step(expr.source, self.__filter([expr], all, debug), self.__ordered(self.endpoints_of(expr))))
+        if self.any and not (exhaustive and any(self.parametric(i) for i in self.any)):
+            endpoints = set()
+            for expr in self.any:
+                endpoints |= self.endpoints_of(expr)
+            ret.append(Step("any", self.__filter(self.any, any, debug), self.__ordered(endpoints)))
+        return ret
+
+    def __filter(self, exprs: list[Expression], combine, debug: bool):
+        def run(table: Table, tickers: list[str] = None) -> None:
+            if tickers is not None and len(tickers) == 0:
+                return
+            rows = None if tickers is None else table.index(tickers)
+            env = self.namespace(table, rows=rows)
+            masks = [np.broadcast_to(np.asarray(i.evaluate(env), dtype=bool), (len(env),)) for i in exprs]
+            mask = np.logical_and.reduce(masks) if combine is all else np.logical_or.reduce(masks)
+            if tickers is not None:
+                for k in np.asarray(tickers, dtype=object)[~mask]:
+                    table.remove(k)
+                return
+            removed = table.keep(mask)
+            print(f"{removed} stocks removed by '{' or '.join(i.source for i in exprs)}'.") if debug else None
+        return run
+
+    def complete(self, table: Table) -> np.ndarray:
+        """
+        Returns, for every row of `table`, whether every non-optional endpoint of the screen returned data for it.
+
+        After an exhaustive run these are the rows a re-screen can be evaluated on, whether or not they are alive.
+        """
+        ret = np.ones(table.alive.shape, dtype=bool)
+        for endpoint in self.endpoints - self.optional:
+            ret &= fetched(table, endpoint)
+        return ret
+
+    def mask(self, table: Table, env: Namespace = None) -> np.ndarray:
+        """
+        Returns, for every row of `table`, whether it passes the whole screen (ignoring the alive mask).
+        """
+        env = env or self.namespace(table)
+        shape = table.alive.shape
+        ret = np.ones(shape, dtype=bool)
+        for expr in self.require:
+            ret &= np.broadcast_to(np.asarray(expr.evaluate(env), dtype=bool), shape)
+        if self.any:
+            ret &= np.logical_or.reduce([np.broadcast_to(np.asarray(i.evaluate(env), dtype=bool), shape) for i in self.any])
+        return ret
+
+    def evaluate(self, table: Table, rows: np.ndarray = None, cache: dict = None) -> Table:
+        """
+        Applies the screen to a fundamentals table.
+
+        Parameters:
+        - `table` (Table): The fundamentals.
+        - `rows` (np.ndarray): Boolean mask of the candidate rows. Defaults to the alive rows.
+        - `cache` (dict): Precomputed values from `static_values`. Defaults to None.
+
+        Returns:
+        - `Table`: The passing tickers with the output columns, sorted.
+        """
+        env = self.namespace(table, cache)
+        rows = np.flatnonzero((table.alive if rows is None else rows) & self.mask(table, env))
+        columns, schema = {}, {}
+        for name, expr in self.columns.items():
+            value = expr.evaluate(env)
+            value = np.broadcast_to(np.asarray(value), table.alive.shape)[rows]
+            columns[name] = value
+            if expr.is_int:
+                schema[name] = INT
+            elif value.dtype.kind in "OUS":
+                schema[name] = OBJECT
+                columns[name] = value.astype(object)
+        ret = Table.from_arrays(table.all_tickers()[rows].tolist(), columns, schema)
+        if self.sort:
+            ret.sort([i.lstrip("-") for i in self.sort], [i.startswith("-") for i in self.sort])
+        return ret
+
+
+def load_screen(name: str) -> ScreenDefinition:
+    """
+    Loads a screen definition.
+
+    Parameters:
+    - `name` (str): A path to a YAML file, or the name of a screen in `screenerV3/screens/` (e.g. `payback`).
+
+    Returns:
+    - `ScreenDefinition`: The compiled screen.
+    """
+    path = name if os.path.exists(name) else os.path.join(SCREENS_DIR, f"{name}.yaml")
+    return ScreenDefinition.from_yaml(path)
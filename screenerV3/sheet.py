@@ -2,6 +2,8 @@ from datetime import datetime
 import gspread
 from time import sleep
 import re
+from .profiling import profiled
+from .table import Table
 
 class Sheet:
     def __init__(self, sheet_path:str = "./service_account.json", file_name:str = 'Screener') -> None:
@@ -45,30 +47,82 @@ class Sheet:
         sheet = self.__get_worksheet_names()[-1]
         sheet.append_row(values= ["Ticker", "Company Name", "NCAV Ratio",  "EV/aFCF", "P/TBV Ratio", "HQ Location", " ", "FV Upside", "5Y Price Metric"],table_range='A1:I1')
     
-    def add_alpha_row_data(self, data: dict):
+    def __alpha_payload(self, k: str, v: dict) -> list:
+        return [k, str(v['Name']), f"{v['FV Upside Metric']}%", f"{v['5Y Price Metric']}%", " ", v["NCAV Ratio"], v["EV/aFCF"], v["Payback Rating"], v["5Y average"], str(v['HQ Location'])]
+
+    def __beta_payload(self, k: str, v: dict) -> list:
+        return [k, str(v['Name']), v["NCAV Ratio"], v["EV/aFCF"], v["P/TBV Ratio"], str(v['HQ Location']), " ", f"{v['FV Upside Metric']}%", f"{v['5Y Price Metric']}%"]
+
+    def __payload(self, k: str, v: dict, columns: list[str]) -> list:
+        return [k] + [v[i] if isinstance(v[i], (int, float)) else "N/A" if v[i] is None else str(v[i]) for i in columns]
+
+    def __payloads(self, rows: list[tuple], module: str = None, columns: list[str] = None) -> list[list]:
+        if module == "alpha":
+            return [self.__alpha_payload(k, v) for k, v in rows]
+        if module == "beta":
+            return [self.__beta_payload(k, v) for k, v in rows]
+        return [self.__payload(k, v, columns) for k, v in rows]
+
+    @profiled("sheet.add_alpha_row_data")
+    def add_alpha_row_data(self, data: Table):
         sheet = self.__get_worksheet_names()[-1]
         itr = 2
-        for k, v in data.items():
-            payload = [k, str(v['Name']), f"{v['FV Upside Metric']}%", f"{v['5Y Price Metric']}%", " ", v["NCAV Ratio"], v["EV/aFCF"], v["Payback Rating"], v["5Y average"], str(v['HQ Location'])]
-            sheet.append_row(values= payload, table_range=f'A{itr}:J{itr}')
+        for k, v in data.rows():
+            sheet.append_row(values= self.__alpha_payload(k, v), table_range=f'A{itr}:J{itr}')
             itr+= 1
             sleep(2)
     
-    def add_beta_row_data(self, data: dict):
+    @profiled("sheet.add_beta_row_data")
+    def add_beta_row_data(self, data: Table):
         sheet = self.__get_worksheet_names()[-1]
         itr = 2
-        for k, v in data.items():
-            payload = [k, str(v['Name']), v["NCAV Ratio"], v["EV/aFCF"], v["P/TBV Ratio"], str(v['HQ Location']), " ", f"{v['FV Upside Metric']}%", f"{v['5Y Price Metric']}%"]
-            sheet.append_row(values= payload, table_range=f'A{itr}:I{itr}')
+        for k, v in data.rows():
+            sheet.append_row(values= self.__beta_payload(k, v), table_range=f'A{itr}:I{itr}')
             itr+= 1
             sleep(2)
     
+    @profiled("sheet.add_row_data")
+    def add_row_data(self, data: Table, columns: list[str]):
+        sheet = self.__get_worksheet_names()[-1]
+        itr = 2
+        for k, v in data.rows(na="N/A"):
+            sheet.append_row(values= self.__payload(k, v, columns), table_range=f'A{itr}')
+            itr+= 1
+            sleep(2)
+
+    @profiled("sheet.append_row_data")
+    def append_row_data(self, rows: list[tuple], module: str = None, columns: list[str] = None) -> None:
+        """
+        Appends rows below the last filled row of the current tab in a single request.
+
+        Parameters:
+        - `rows` (list[tuple]): `(ticker, values)` pairs, as yielded by `Table.rows`.
+        - `module` (str): The tab layout (`alpha`, `beta`, or None for `columns`).
+        - `columns` (list[str]): The columns written after the ticker when `module` is None.
+        """
+        if not rows:
+            return
+        sheet = self.__get_worksheet_names()[-1]
+        sheet.append_rows(values= self.__payloads(rows, module, columns), table_range='A1')
+
+    @profiled("sheet.rewrite_row_data")
+    def rewrite_row_data(self, data: Table, module: str = None, columns: list[str] = None) -> None:
+        """
+        Replaces every row below the header of the current tab with `data`, in its order, in two requests.
+        """
+        sheet = self.__get_worksheet_names()[-1]
+        sheet.batch_clear(['A2:Z'])
+        payloads = self.__payloads(list(data.rows()), module, columns)
+        if payloads:
+            sheet.update(values= payloads, range_name='A2')
+    
     def get_all_worksheets(self) -> list[gspread.Worksheet]:
         try:
             return self.__get_worksheet_names()
         except:
             return []
     
+    @profiled("sheet.create_alpha_module_tab")
     def create_alpha_module_tab(self):
         try:
             name = f"{self.today.day}-{self.month_dict[self.today.month]}-{self.today.year}"
@@ -79,6 +133,7 @@ class Sheet:
         except:
             print("Unable to add new tab. Tab already exists.")
     
+    @profiled("sheet.create_beta_module_tab")
     def create_beta_module_tab(self):
         try:
             name = f"{self.today.day}-{self.month_dict[self.today.month]}-{self.today.year}"
@@ -89,6 +144,17 @@ class Sheet:
         except:
             print("Unable to add new tab. Tab already exists.")
     
+    @profiled("sheet.create_module_tab")
+    def create_module_tab(self, header: list[str]):
+        try:
+            name = f"{self.today.day}-{self.month_dict[self.today.month]}-{self.today.year}"
+            self.file.add_worksheet(title = name, rows = 0, cols = 0)
+            self.__get_worksheet_names()[-1].append_row(values= header, table_range='A1')
+            print(f"Sheet {name} added.")
+            self._was_sheet_added_today = True
+        except:
+            print("Unable to add new tab. Tab already exists.")
+    
     def get_previously_seen_tickers(self)-> list[str]:
         try:
             today = f"{self.today.day}-{self.month_dict[self.today.month]}-{self.today.year}"
@@ -100,6 +166,7 @@ class Sheet:
         except:
             return []
     
+    @profiled("sheet.get_all_previously_seen_tickers")
     def get_all_previously_seen_tickers(self) -> list[str]:
         '''
         Returns all tickers seen in the last year (52 weeks).
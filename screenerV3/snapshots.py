@@ -0,0 +1,93 @@
+from datetime import datetime
+import os
+import numpy as np
+import pandas as pd
+from .table import Table, BOOL, OBJECT
+
+SNAPSHOTS_DIR = "./data/snapshots"
+
+
+class SnapshotStore:
+    """
+    Append-only archive of the fundamentals (and prices) fetched by every run.
+
+    Each run adds one file, `<root>/<YYYY-MM-DD>/<screen>-<HHMMSS>.npz` (see `Table.save`), and nothing is ever
+    rewritten, so the archive is a point-in-time history of what each screen saw. `load` stacks every snapshot
+    into one table for the backtest (see `backtest.py`).
+
+    Parameters:
+    - `root` (str): The archive directory. Default is `./data/snapshots`.
+    """
+    def __init__(self, root: str = SNAPSHOTS_DIR) -> None:
+        self.root = root
+
+    def append(self, table: Table, screen: str, when: datetime = None) -> str:
+        """
+        Archives the fundamentals of a run.
+
+        Returns:
+        - `str`: The snapshot file.
+        """
+        when = when or datetime.now()
+        path = os.path.join(self.root, when.strftime("%Y-%m-%d"), f"{screen}-{when.strftime('%H%M%S')}.npz")
+        if os.path.exists(path):
+            raise FileExistsError(f"Snapshot {path} already exists.")
+        table.save(path)
+        return path
+
+    def dates(self) -> list[str]:
+        """
+        Returns the dates with snapshots, oldest first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(i for i in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, i)) and len(i) == 10)
+
+    def files(self, date: str) -> list[str]:
+        """
+        Returns the snapshots of a date, most recent first.
+        """
+        path = os.path.join(self.root, date)
+        return sorted([os.path.join(path, i) for i in os.listdir(path) if i.endswith(".npz") and not i.endswith(".tmp.npz")],
+                      key=lambda i: i.rsplit("-", 1)[-1], reverse=True)
+
+    def load(self, start: str = None, end: str = None) -> tuple:
+        """
+        Stacks the snapshots into one table with one row per date and ticker.
+
+        Snapshots of the same date (several screens, or re-runs) are merged: each value comes from the most recent
+        snapshot that has it.
+
+        Parameters:
+        - `start` (str): First date kept (`YYYY-MM-DD`). Defaults to the oldest.
+        - `end` (str): Last date kept. Defaults to the most recent.
+
+        Returns:
+        - `tuple`: The stacked `Table`, the dates (oldest first) and, for each row, its date (an index into the
+          dates) and ticker.
+        """
+        frames, schema = [], {}
+        dates = [i for i in self.dates() if (start is None or i >= start) and (end is None or i <= end)]
+        for i, date in enumerate(dates):
+            for path in self.files(date):
+                table = Table.load(path)
+                schema = {**table.schema, **schema}
+                frame = pd.DataFrame({name: table[name] for name in table.schema})
+                frame["__date__"] = i
+                frame["__ticker__"] = table.all_tickers().astype(str)
+                frames.append(frame)
+        if not frames:
+            return Table(), dates, np.array([], dtype=int), np.array([], dtype=str)
+        # `first` skips missing values, and the files of a date are read most recent first
+        merged = pd.concat(frames, ignore_index=True).groupby(["__date__", "__ticker__"], sort=True).first().reset_index()
+        date, ticker = merged["__date__"].to_numpy(dtype=int), merged["__ticker__"].to_numpy(dtype=str)
+        columns = {}
+        for name, kind in schema.items():
+            values = merged[name].to_numpy(dtype=object if kind == OBJECT else float, copy=True)
+            if kind == BOOL:
+                values = np.nan_to_num(values) != 0
+            elif kind == OBJECT:
+                values[pd.isna(merged[name]).to_numpy()] = None
+            columns[name] = values
+        keys = [f"{dates[d]}:{t}" for d, t in zip(date, ticker)]
+        return Table.from_arrays(keys, columns, schema), dates, date, ticker
@@ -0,0 +1,350 @@
+from datetime import datetime
+from time import perf_counter
+import json
+import math
+import os
+from .fundamentals import RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW, RUNS_DIR, FundamentalsFetcher, empty_fundamentals, fetched
+from .history import RunHistory
+from .metrics import print_report
+from .pipeline import Pipeline
+from .planner import PhasePlanner
+from .prefilter import Prefilter
+from .profiling import profiled
+from .publisher import SheetPublisher
+from .screens import ScreenDefinition
+from .snapshots import SnapshotStore
+from .statements import DATASETS
+from .table import Table
+
+# seconds per API call assumed for a phase without statistics, before rate limit pauses
+DEFAULT_LATENCY = 0.3
+
+# Google Sheets requests: creating the day's tab, reading the tabs of the last year, rows per live flush
+SHEET_TAB_CALLS = 3
+SHEET_SEEN_CALLS = 53
+LIVE_BATCH_ROWS = 20
+
+
+class RunStore:
+    """
+    On-disk handoff between the fetch, screen and publish stages of a screen.
+
+    Layout of `data/runs/<screen>/`:
+    - `fundamentals.npz`: The fetched fundamentals (checkpointed while fetching).
+    - `results.npz`: The screened, sorted results.
+    - `manifest.json`: Universe, flags, request count and completion time of each stage.
+    - `metrics.json`, `metrics.prom`: The requests, latencies, errors, rate limit waits and phases of the last fetch
+      (see `RunMetrics`).
+    """
+    def __init__(self, screen: str, root: str = RUNS_DIR) -> None:
+        self.screen = screen
+        self.path = os.path.join(root, screen)
+        self.fundamentals_path = os.path.join(self.path, "fundamentals.npz")
+        self.results_path = os.path.join(self.path, "results.npz")
+        self.manifest_path = os.path.join(self.path, "manifest.json")
+        self.metrics_path = os.path.join(self.path, "metrics.json")
+
+    def manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, 'r') as file:
+            return json.load(file)
+
+    def update_manifest(self, **values) -> dict:
+        manifest = {**self.manifest(), **values}
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.manifest_path, 'w') as file:
+            json.dump(manifest, file, indent=2)
+        return manifest
+
+    def save_fundamentals(self, table: Table) -> None:
+        table.save(self.fundamentals_path)
+
+    def load_fundamentals(self) -> Table:
+        if not os.path.exists(self.fundamentals_path):
+            raise FileNotFoundError(f"No fundamentals for '{self.screen}' at {self.fundamentals_path}. Run the fetch stage first.")
+        return Table.load(self.fundamentals_path)
+
+    def save_results(self, table: Table) -> None:
+        table.save(self.results_path)
+
+    def resumable(self, universe: str, exhaustive: bool) -> bool:
+        """
+        Returns True if an unfinished fetch of the same universe (and mode) can be resumed.
+        """
+        manifest = self.manifest()
+        return (manifest.get("fetched") is None and manifest.get("universe") == universe
+                and manifest.get("exhaustive") == exhaustive and os.path.exists(self.fundamentals_path))
+
+    def load_results(self) -> Table:
+        if not os.path.exists(self.results_path):
+            raise FileNotFoundError(f"No results for '{self.screen}' at {self.results_path}. Run the screen stage first.")
+        return Table.load(self.results_path)
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+@profiled("fetch")
+async def fetch_stage(definition: ScreenDefinition, tickers: list[str], handler, store: RunStore, universe: str,
+                      debug: bool = False, exhaustive: bool = False, resume: bool = True, streaming: bool = True, on_pass=None,
+                      prefilter: bool = False, statements=None, snapshots: SnapshotStore = None, target: int = None,
+                      time_limit: float = None) -> Table:
+    """
+    Fetches the fundamentals of a screen into its run store.
+
+    The table is checkpointed while fetching. An unfinished fetch of the same universe is resumed,
+    only requesting the endpoints each ticker is still missing.
+
+    Parameters:
+    - `definition` (ScreenDefinition): The screen.
+    - `tickers` (list[str]): The universe to fetch.
+    - `handler` (Handler): The FMP request handler.
+    - `store` (RunStore): Where the fundamentals are written.
+    - `universe` (str): Name of the universe, used for planner statistics and resuming.
+    - `debug` (bool): If True, prints progress. Default is False.
+    - `exhaustive` (bool): If True, filters that read a screen parameter do not prune tickers. Default is False.
+    - `resume` (bool): If False, always starts a new fetch. Default is True.
+    - `streaming` (bool): If True, the phases run as overlapping pipeline stages (see `Pipeline`); otherwise
+      each phase finishes for the whole universe before the next starts. Default is True.
+    - `on_pass`: Optional function `(table, tickers) -> None` called with tickers that cleared every stage
+      (streaming only). Defaults to None.
+    - `prefilter` (bool): If True, tickers that bulk quotes and key metrics prove cannot pass are dropped
+      before the per-ticker calls (see `Prefilter`). The bulk values are TTM and can be staler than the per-ticker
+      statements, so a dropped ticker may have passed on fresh data: opt-in. Default is False.
+    - `statements`: Local statements sources (`StatementStore`, `EdgarFrames`, or a list of them) to read balance
+      sheets and cash flows from before requesting them. Defaults to None.
+    - `snapshots` (SnapshotStore): If given, the finished fetch is archived there for backtests. Defaults to None.
+    - `target` (int): Stops once this many tickers cleared every stage (streaming only). Defaults to None.
+    - `time_limit` (float): Stops after this many seconds (streaming only). Defaults to None.
+      When a run stops early, the tickers it did not get to are removed, so the partial results stay exact; order
+      `tickers` likeliest passers first (see `RefreshScheduler.order`) to make the most of it.
+
+    Returns:
+    - `Table`: The fundamentals.
+    """
+    manifest = store.manifest()
+    if resume and store.resumable(universe, exhaustive):
+        table = store.load_fundamentals()
+        print(f"Resuming fetch started {manifest.get('started')}.")
+    else:
+        table = empty_fundamentals(tickers)
+        store.update_manifest(screen=definition.name, universe=universe, exhaustive=exhaustive, started=_now(),
+                              fetched=None, screened=None, published=None, results=None, requests=0, skipped=0)
+
+    sent = store.manifest().get("requests", 0)
+
+    def checkpoint(table: Table) -> None:
+        store.save_fundamentals(table)
+        store.update_manifest(requests=sent + fetcher.requests_sent)
+
+    fetcher = FundamentalsFetcher(handler, checkpoint=checkpoint, prefilter=Prefilter(definition, exhaustive) if prefilter else None,
+                                  statements=statements)
+    # exhaustive runs prune less, so they keep their own phase statistics
+    planner = PhasePlanner(f"{definition.name}-exhaustive" if exhaustive else definition.name, universe, metrics=fetcher.metrics)
+    print(f"Screening {len(table)} stocks...")
+    phases = fetcher.phases(definition.endpoints, definition.optional)
+    try:
+        async with handler.session() as session:
+            if streaming:
+                passed, deadline = [0], perf_counter() + time_limit if time_limit is not None else None
+
+                def passing(table: Table, tickers: list[str]) -> None:
+                    passed[0] += len(tickers)
+                    if on_pass is not None:
+                        on_pass(table, tickers)
+
+                def stop() -> bool:
+                    return (target is not None and passed[0] >= target) or (deadline is not None and perf_counter() > deadline)
+                pipeline = Pipeline(planner.plan(phases), definition.steps(debug, exhaustive), lambda name: fetcher.calls.get(name, 0),
+                                    on_pass=passing, debug=debug, stop=stop)
+                for counter in (await pipeline.run(session, table)).values():
+                    planner.record(counter.name, counter.entered, counter.passed, counter.requests, counter.seconds)
+                planner.save()
+                for k in pipeline.skipped:
+                    table.remove(k)
+                store.update_manifest(skipped=len(pipeline.skipped))
+                print(f"Stopped early, {len(pipeline.skipped)} tickers not screened.") if pipeline.skipped else None
+            else:
+                await planner.execute(phases, definition.steps(debug, exhaustive), session, table, lambda: fetcher.requests_sent, debug)
+    except BaseException:
+        # keep what was fetched so the next run can resume from here
+        checkpoint(table)
+        if fetcher.metrics is not None:
+            fetcher.metrics.save(store.metrics_path)
+        raise
+
+    print(f"{fetcher.requests_sent} requests sent") if debug else None
+    checkpoint(table)
+    if fetcher.metrics is not None:
+        fetcher.metrics.save(store.metrics_path)
+        print_report(fetcher.metrics.report()) if debug else None
+    store.update_manifest(fetched=_now())
+    if snapshots is not None:
+        store.update_manifest(snapshot=snapshots.append(table, definition.name))
+    return table
+
+
+def plan_stage(definition: ScreenDefinition, tickers: list[str], handler, store: RunStore, universe: str, exhaustive: bool = False,
+               resume: bool = True, prefilter: bool = False, statements=None, sheet: str = None, seen_from_sheet: bool = False) -> dict:
+    """
+    Estimates what a fetch (and publish) would cost, without any API call: a dry run.
+
+    Phases are taken in planned order with their measured pass rates, costs and seconds per call (see `PhasePlanner`).
+    Tickers already fetched by a resumable run, and statements the local `statements` sources hold, are not requested.
+
+    Parameters:
+    - `definition` (ScreenDefinition): The screen.
+    - `tickers` (list[str]): The universe, after the previously-seen filter.
+    - `handler` (Handler): The FMP request handler (not called).
+    - `store` (RunStore): The run store, checked for a resumable fetch.
+    - `universe` (str): Name of the universe, for the planner statistics.
+    - `exhaustive`, `resume`, `prefilter`, `statements`: As in `fetch_stage`.
+    - `sheet` (str): How results are published: `publish` (row by row), `live` (see `live_stage`) or None. Default is None.
+    - `seen_from_sheet` (bool): If True, the previously-seen filter reads the sheet's tabs. Default is False.
+
+    Returns:
+    - `dict`: Per phase (in run order) the tickers entering, the calls, the cache hits and the seconds; the totals,
+      the expected results, the Google Sheets calls, and the minutes of API limit the calls use up.
+    """
+    fetcher = FundamentalsFetcher(handler, prefilter=Prefilter(definition, exhaustive) if prefilter else None, statements=statements)
+    planner = PhasePlanner(f"{definition.name}-exhaustive" if exhaustive else definition.name, universe)
+    table = store.load_fundamentals() if resume and store.resumable(universe, exhaustive) else None
+    survivors = float(len(table) if table is not None else len(tickers))
+    start = survivors
+    # calls are paced to the API limit when they come back faster
+    default = max(DEFAULT_LATENCY, RATE_LIMIT_WINDOW / RATE_LIMIT_REQUESTS)
+    phases, seconds = [], 0.0
+    for phase in planner.plan(fetcher.phases(definition.endpoints, definition.optional)):
+        done = int(fetched(table, phase.name)[table.alive].sum()) if table is not None and phase.name != "prefilter" else 0
+        pending = max(survivors - done, 0)
+        hits = 0.0
+        if phase.name in DATASETS and fetcher.statements and tickers:
+            local = {}
+            for source in fetcher.statements:
+                local.update(source.statements(phase.name, [k for k in tickers if k not in local]))
+            hits = pending * len(local) / len(tickers)
+        if phase.name == "floats":
+            calls = 1.0 if pending else 0.0
+        elif phase.batch_limit is not None:
+            calls = math.ceil(pending / phase.batch_limit) + (1 if phase.name == "prefilter" and pending else 0)
+        else:
+            calls = (pending - hits) * (phase.cost if hits else planner.cost(phase))
+        phases.append({"phase": phase.name, "entering": round(survivors), "calls": round(calls), "cache_hits": round(hits),
+                       "seconds": round(calls * planner.latency(phase, default))})
+        seconds += phases[-1]["seconds"]
+        survivors *= planner.pass_rate(phase)
+    results = round(survivors)
+    sheets = SHEET_SEEN_CALLS if seen_from_sheet else 0
+    if sheet == "publish":
+        # one request and a 2 second pause per row (see `Sheet.add_row_data`)
+        sheets += SHEET_TAB_CALLS + 1 + results
+        seconds += 2 * results
+    elif sheet == "live":
+        sheets += SHEET_TAB_CALLS + 2 * math.ceil(results / LIVE_BATCH_ROWS) + 3
+    calls = sum(i["calls"] for i in phases)
+    return {"screen": definition.name, "tickers": round(start), "resumed": table is not None, "phases": phases, "calls": calls,
+            "cache_hits": sum(i["cache_hits"] for i in phases), "results": results, "sheets_calls": sheets, "seconds": round(seconds),
+            "limit_minutes": round(calls / RATE_LIMIT_REQUESTS * RATE_LIMIT_WINDOW / 60, 1)}
+
+
+def print_plan(plan: dict) -> None:
+    """
+    Prints a `plan_stage` estimate.
+    """
+    print(f"Dry run of '{plan['screen']}': {plan['tickers']} tickers{' (resumed)' if plan['resumed'] else ''}.")
+    for i in plan["phases"]:
+        print(f"{i['phase']}: {i['entering']} in, ~{i['calls']} calls, {i['cache_hits']} cache hits, ~{i['seconds'] / 60:.1f} min")
+    print(f"~{plan['calls']} API calls ({plan['limit_minutes']} min of API limit per key), {plan['cache_hits']} cache hits, "
+          f"~{plan['results']} results, {plan['sheets_calls']} Google Sheets calls.")
+    print(f"Estimated run time: ~{plan['seconds'] / 60:.0f} minute(s) (phases run one after the other; streaming overlaps them).")
+
+
+@profiled("screen")
+def screen_stage(definition: ScreenDefinition, store: RunStore, table: Table = None) -> Table:
+    """
+    Screens the fetched fundamentals and writes the results. Makes no API calls, so it can be re-run freely.
+
+    Parameters:
+    - `definition` (ScreenDefinition): The screen.
+    - `store` (RunStore): The run store holding the fundamentals.
+    - `table` (Table): The fundamentals, if already in memory. Defaults to loading them from `store`.
+
+    Returns:
+    - `Table`: The results.
+    """
+    table = table if table is not None else store.load_fundamentals()
+    results = definition.evaluate(table)
+    store.save_results(results)
+    store.update_manifest(screened=_now(), results=len(results))
+    return results
+
+
+@profiled("publish")
+def publish_stage(definition: ScreenDefinition, results: Table, sheet_client=None, xlsx_path: str = None, store: RunStore = None,
+                  history: RunHistory = None, debug: bool = False) -> None:
+    """
+    Publishes screening results to a Google Sheet and/or an Excel file.
+
+    Parameters:
+    - `definition` (ScreenDefinition): The screen, which selects the sheet layout.
+    - `results` (Table): The results.
+    - `sheet_client` (Sheet): The Google Sheet to publish to. Defaults to None (no sheet).
+    - `xlsx_path` (str): The Excel file to write. Defaults to None (no file).
+    - `store` (RunStore): If given, the publish time is recorded in its manifest. Defaults to None.
+    - `history` (RunHistory): If given, the results are stored under today's date (see `history.py`) when they were
+      written to the sheet. Defaults to None.
+    - `debug` (bool): If True, prints progress. Default is False.
+    """
+    if sheet_client is not None:
+        if definition.sheet_module == "alpha":
+            sheet_client.create_alpha_module_tab()
+            sheet_client.add_alpha_row_data(results)
+        elif definition.sheet_module == "beta":
+            sheet_client.create_beta_module_tab()
+            sheet_client.add_beta_row_data(results)
+        else:
+            columns = list(definition.columns)
+            sheet_client.create_module_tab(["Ticker"] + columns)
+            sheet_client.add_row_data(results, columns)
+        print("Google Sheet updated.") if debug else None
+    if xlsx_path is not None:
+        results.to_frame().to_excel(xlsx_path)
+        print(f"File saved to {xlsx_path}")
+    if store is not None:
+        store.update_manifest(published=_now())
+    # only what the sheet now holds, so the history never skips names nobody saw
+    if history is not None and sheet_client is not None:
+        history.append(results)
+
+
+@profiled("live")
+async def live_stage(definition: ScreenDefinition, tickers: list[str], handler, store: RunStore, universe: str, sheet_client,
+                     debug: bool = False, exhaustive: bool = False, resume: bool = True, prefilter: bool = False, statements=None,
+                     snapshots: SnapshotStore = None, history: RunHistory = None, target: int = None, time_limit: float = None) -> Table:
+    """
+    Fetches, screens and publishes in one go, appending passing names to the day's tab as soon as they are final.
+
+    Uses the streaming fetch. Once fetching is done the tab is rewritten in the screen's sort order, and the results
+    are stored in `history` if given.
+
+    Returns:
+    - `Table`: The results.
+    """
+    publisher = SheetPublisher(definition, sheet_client, debug=debug)
+    await publisher.start()
+    try:
+        table = await fetch_stage(definition, tickers, handler, store, universe, debug=debug, exhaustive=exhaustive,
+                                  resume=resume, on_pass=publisher.passed, prefilter=prefilter, statements=statements, snapshots=snapshots,
+                                  target=target, time_limit=time_limit)
+    except BaseException:
+        await publisher.close()
+        raise
+    results = screen_stage(definition, store, table)
+    await publisher.close(results)
+    store.update_manifest(published=_now())
+    if history is not None:
+        history.append(results)
+    print("Google Sheet updated.") if debug else None
+    return results
@@ -0,0 +1,269 @@
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import csv
+import json
+import os
+import shutil
+import numpy as np
+from .derived import CASHFLOW_QUARTERS, fiscal_years
+from .records import BalanceSheet, CashFlow, Record
+
+BULK_DIR = "./data/bulk"
+
+# fundamentals endpoint -> (FMP bulk dataset, record)
+DATASETS = {
+    "balance_sheet": ("balance-sheet-statement-bulk", BalanceSheet),
+    "cashflow": ("cash-flow-statement-bulk", CashFlow),
+}
+
+# statements read per ticker, matching the per-ticker requests (see `Handler`)
+LIMITS = {
+    "balance_sheet": 5,
+    "cashflow": CASHFLOW_QUARTERS,
+}
+
+# rows parsed per chunk while ingesting
+CHUNK_ROWS = 50000
+
+# days after a statement's date before the next one is due (the period plus the filing deadline); an older latest
+# statement means the store missed a filing, so the endpoint is called instead
+STALE_AFTER = {"quarter": 92 + 90, "annual": 365 + 120}
+
+
+class Partition:
+    """
+    One ingested period of a bulk dataset (e.g. the 2024 quarterly balance sheets), memory-mapped.
+
+    Rows are sorted by symbol, then most recent date first, so the statements of a ticker are a contiguous slice.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, "meta.json"), 'r') as file:
+            self.meta = json.load(file)
+        self.columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in self.meta["columns"]}
+        self.symbols = self.columns["symbol"]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def slices(self, tickers: list[str]) -> tuple:
+        """
+        Returns the `(start, stop)` row arrays of each ticker's statements (empty where absent).
+        """
+        keys = np.asarray(tickers, dtype=str)
+        return np.searchsorted(self.symbols, keys, side="left"), np.searchsorted(self.symbols, keys, side="right")
+
+
+class StatementStore:
+    """
+    A local columnar store of FMP bulk financial statements.
+
+    Each bulk file (one dataset, fiscal year and period) is streamed into its own partition directory,
+    `<root>/<dataset>/<year>-<period>/`, holding one `.npy` array per column and a `meta.json`. Partitions
+    are memory-mapped when read, so a lookup only touches the rows of the requested tickers. Re-ingesting
+    a period replaces its partition.
+
+    Parameters:
+    - `root` (str): The store directory. Default is `./data/bulk`.
+    """
+    def __init__(self, root: str = BULK_DIR) -> None:
+        self.root = root
+        self.__partitions = {}
+
+    def __path(self, dataset: str, year: int, period: str) -> str:
+        return os.path.join(self.root, dataset, f"{int(year)}-{period}")
+
+    def ingest(self, dataset: str, year: int, period: str, path: str) -> int:
+        """
+        Streams a bulk CSV file into a partition.
+
+        Only the columns read by the dataset's record are kept. Rows without a symbol or date are skipped.
+
+        Parameters:
+        - `dataset` (str): The fundamentals endpoint (a key of `DATASETS`).
+        - `year` (int): The fiscal year of the file.
+        - `period` (str): `quarter` or `annual`.
+        - `path` (str): The CSV file.
+
+        Returns:
+        - `int`: The rows written.
+        """
+        record = DATASETS[dataset][1]
+        text = [attr for attr, (_, kind) in record.FIELDS.items() if kind is str]
+        numeric = [attr for attr, (_, kind) in record.FIELDS.items() if kind is not str]
+        chunks = {name: [] for name in ["symbol"] + text + numeric}
+        with open(path, 'r', newline='', encoding="utf-8-sig") as file:
+            reader = csv.DictReader(file)
+            rows = []
+            for row in reader:
+                if row.get("symbol") and row.get("date"):
+                    rows.append(row)
+                if len(rows) == CHUNK_ROWS:
+                    self.__chunk(rows, record, text, numeric, chunks)
+                    rows = []
+            self.__chunk(rows, record, text, numeric, chunks)
+        columns = {name: np.concatenate(values) if values else np.array([], dtype=str if name in text or name == "symbol" else float)
+                   for name, values in chunks.items()}
+        # by symbol, then most recent first
+        order = np.argsort(columns["date"], kind="stable")[::-1]
+        order = order[np.argsort(columns["symbol"][order], kind="stable")]
+        target = self.__path(dataset, year, period)
+        tmp = f"{target}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), values[order])
+        with open(os.path.join(tmp, "meta.json"), 'w') as file:
+            json.dump({"dataset": dataset, "year": int(year), "period": period, "rows": len(order), "columns": list(columns),
+                       "ingested": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, file, indent=2)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+        self.__partitions.pop(target, None)
+        return len(order)
+
+    def __chunk(self, rows: list[dict], record: type, text: list[str], numeric: list[str], chunks: dict) -> None:
+        if not rows:
+            return
+        chunks["symbol"].append(np.array([row["symbol"] for row in rows], dtype=str))
+        for attr in text:
+            key = record.FIELDS[attr][0]
+            chunks[attr].append(np.array([row.get(key) or "" for row in rows], dtype=str))
+        for attr in numeric:
+            key = record.FIELDS[attr][0]
+            chunks[attr].append(np.array([_number(row.get(key)) for row in rows], dtype=float))
+
+    def partitions(self, dataset: str, period: str = "quarter") -> list[int]:
+        """
+        Returns the ingested fiscal years of a dataset and period, most recent first.
+        """
+        path = os.path.join(self.root, dataset)
+        if not os.path.isdir(path):
+            return []
+        suffix = f"-{period}"
+        return sorted([int(i[:-len(suffix)]) for i in os.listdir(path) if i.endswith(suffix) and i[:-len(suffix)].isdigit()], reverse=True)
+
+    def partition(self, dataset: str, year: int, period: str = "quarter") -> Partition:
+        path = self.__path(dataset, year, period)
+        if path not in self.__partitions:
+            self.__partitions[path] = Partition(path)
+        return self.__partitions[path]
+
+    def statements(self, dataset: str, tickers: list[str], period: str = "quarter", limit: int = None) -> dict[str:list[Record]]:
+        """
+        Reads the statements of some tickers, as the per-ticker endpoint would return them.
+
+        Parameters:
+        - `dataset` (str): The fundamentals endpoint (a key of `DATASETS`).
+        - `tickers` (list[str]): The tickers.
+        - `period` (str): `quarter` or `annual`. Default is `quarter`.
+        - `limit` (int): Statements per ticker. Defaults to `LIMITS[dataset]`.
+
+        Returns:
+        - `dict[str:list[Record]]`: The statements (most recent first) of each ticker the store fully covers: `limit`
+          statements from consecutive fiscal years, as many complete fiscal years as the endpoint would return, and a
+          latest statement no newer filing is due for (see `STALE_AFTER`). Other tickers, and tickers with an invalid
+          statement (like `decode_statements` does), are left out so they can be requested instead.
+        """
+        record = DATASETS[dataset][1]
+        limit = limit or LIMITS[dataset]
+        found = {k: [] for k in tickers}
+        last = None
+        for year in self.partitions(dataset, period):
+            pending = [k for k, v in found.items() if len(v) < limit]
+            # a missing fiscal year would splice non-consecutive statements
+            if not pending or (last is not None and year != last - 1):
+                break
+            last = year
+            part = self.partition(dataset, year, period)
+            starts, stops = part.slices(pending)
+            for k, start, stop in zip(pending, starts, stops):
+                for row in range(start, min(stop, start + limit - len(found[k]))):
+                    found[k].append(_record(record, part.columns, row))
+        # the complete fiscal years in a full window of quarters (5 in 24, whatever the current quarter)
+        years = (limit - 3) // 4 if dataset == "cashflow" and period == "quarter" else 0
+        ret = {}
+        for k, v in found.items():
+            if len(v) == limit and None not in v and len(fiscal_years(v, truncated=True)) >= years and recent(v[0].date, period):
+                ret[k] = v
+        return ret
+
+
+def recent(date: str, period: str = "quarter", today: datetime = None) -> bool:
+    """
+    Returns True if no newer statement than one dated `date` (`YYYY-MM-DD`) is due yet on `today` (defaults to
+    now, see `STALE_AFTER`).
+    """
+    try:
+        return (today or _today()) - datetime.strptime(date[:10], "%Y-%m-%d") <= timedelta(days=STALE_AFTER[period])
+    except (TypeError, ValueError):
+        return False
+
+def _today() -> datetime:
+    return datetime.now()
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _record(record: type, columns: dict, row: int) -> Record:
+    values = {}
+    for attr, (_, kind) in record.FIELDS.items():
+        value = columns[attr][row]
+        if kind is str:
+            value = str(value) or None
+        else:
+            value = None if np.isnan(value) else float(value)
+        if value is None and attr in record.REQUIRED:
+            return None
+        values[attr] = value
+    return record(**values)
+
+
+async def download(handler, store: StatementStore, dataset: str, years: list[int], period: str = "quarter") -> None:
+    """
+    Downloads bulk statement files from FMP and ingests them, one request per fiscal year.
+    """
+    os.makedirs(store.root, exist_ok=True)
+    async with handler.session() as session:
+        for year in years:
+            raw = await handler.get_bulk_statements(session, DATASETS[dataset][0], year, period)
+            if raw is None:
+                print(f"Unable to download {dataset} {year} {period}.")
+                continue
+            path = os.path.join(store.root, f"{dataset}-{year}-{period}.csv")
+            with open(path, 'wb') as file:
+                file.write(raw)
+            rows = store.ingest(dataset, year, period, path)
+            os.remove(path)
+            print(f"{dataset} {year} {period}: {rows} statements.")
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingests FMP bulk financial statements into the local statement store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    sub = commands.add_parser("ingest", help="Ingest a bulk CSV file already on disk.")
+    sub.add_argument("dataset", choices=list(DATASETS))
+    sub.add_argument("year", type=int)
+    sub.add_argument("path")
+    sub.add_argument("--period", default="quarter", choices=["quarter", "annual"])
+    sub = commands.add_parser("download", help="Download and ingest bulk files from FMP.")
+    sub.add_argument("dataset", choices=list(DATASETS))
+    sub.add_argument("years", type=int, nargs="+")
+    sub.add_argument("--period", default="quarter", choices=["quarter", "annual"])
+    sub.add_argument("--transport", default=None, help="HTTP transport (aiohttp or httpx).")
+    for sub in commands.choices.values():
+        sub.add_argument("--root", default=BULK_DIR, help="The statement store directory.")
+    args = parser.parse_args(argv)
+    store = StatementStore(args.root)
+    if args.command == "ingest":
+        print(f"{store.ingest(args.dataset, args.year, args.period, args.path)} statements ingested.")
+    else:
+        from .utilities import Handler
+        asyncio.run(download(Handler(args.transport), store, args.dataset, args.years, args.period))
+
+
+if __name__ == "__main__":
+    main()
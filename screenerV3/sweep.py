@@ -0,0 +1,135 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from time import perf_counter
+import argparse
+import json
+import os
+from .fundamentals import fundamentals_path
+from .screens import ScreenDefinition, load_screen
+from .table import Table
+
+# parameter sets per worker task; small grids are evaluated in-process
+CHUNK_SIZE = 16
+
+_worker = {}
+
+
+def expand_grid(grid: dict[str:list]) -> list[dict]:
+    """
+    Expands a parameter grid into every combination of values.
+
+    Parameters:
+    - `grid` (dict): Values to try, keyed by parameter name, e.g. `{"ncav_ratio_max": [2.5, 3.0]}`.
+
+    Returns:
+    - `list[dict]`: One parameter set per combination, in grid order.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*[grid[i] for i in names])]
+
+
+def load_fundamentals(screen: str, path: str = None) -> Table:
+    """
+    Loads the fundamentals saved by the last run of a screen.
+    """
+    path = path or fundamentals_path(screen)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No saved fundamentals for '{screen}' at {path}. Run the screen first.")
+    return Table.load(path)
+
+
+class Sweep:
+    """
+    Re-screens saved fundamentals with different parameter values, without any API calls.
+
+    Candidate rows are the tickers for which every non-optional endpoint returned data. After a normal run
+    the parameter filters have already pruned the fundamentals, so counts are exact when tightening a
+    threshold and a lower bound when loosening it; run the screen with `exhaustive=True` for exact counts
+    in both directions.
+
+    Parameters:
+    - `definition` (ScreenDefinition): The screen.
+    - `table` (Table): The fundamentals (see `load_fundamentals`).
+    - `top` (int): Number of ranked tickers kept per parameter set. Default is 25.
+    """
+    def __init__(self, definition: ScreenDefinition, table: Table, top: int = 25) -> None:
+        self.definition = definition
+        self.table = table
+        self.top = top
+        self.rows = definition.complete(table)
+        self.cache = definition.static_values(table)
+
+    def evaluate(self, params: dict) -> dict:
+        """
+        Evaluates one parameter set.
+
+        Returns:
+        - `dict`: The parameter set, the pass count and the top ranked tickers.
+        """
+        res = self.definition.with_params(**params).evaluate(self.table, self.rows, self.cache)
+        return {"params": params, "passed": len(res), "tickers": res.tickers()[:self.top]}
+
+    def run(self, param_sets: list[dict], processes: int = None) -> list[dict]:
+        """
+        Evaluates every parameter set, fanning large sweeps out over a process pool.
+
+        Parameters:
+        - `param_sets` (list[dict]): The parameter sets (see `expand_grid`).
+        - `processes` (int): Worker processes. Defaults to the CPU count; 1 evaluates in-process.
+
+        Returns:
+        - `list[dict]`: One result per parameter set, in input order.
+        """
+        processes = processes or os.cpu_count() or 1
+        if processes == 1 or len(param_sets) <= CHUNK_SIZE:
+            return [self.evaluate(i) for i in param_sets]
+        chunks = [param_sets[i:i + CHUNK_SIZE] for i in range(0, len(param_sets), CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(self.definition, self.table, self.top)) as pool:
+            return [res for chunk in pool.map(_evaluate_chunk, chunks) for res in chunk]
+
+
+def _init_worker(definition: ScreenDefinition, table: Table, top: int) -> None:
+    # each worker builds its sweep (and static metric cache) once, then receives only parameter sets
+    _worker["sweep"] = Sweep(definition, table, top)
+
+def _evaluate_chunk(param_sets: list[dict]) -> list[dict]:
+    return [_worker["sweep"].evaluate(i) for i in param_sets]
+
+
+def parse_param(arg: str) -> tuple:
+    """
+    Parses a `name=v1,v2,...` command line argument.
+    """
+    name, _, values = arg.partition("=")
+    if not name or not values:
+        raise argparse.ArgumentTypeError(f"Expected name=v1,v2,... but got '{arg}'.")
+    return name, [float(i) for i in values.split(",")]
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Re-screen saved fundamentals over a grid of screen parameters.")
+    parser.add_argument("screen", help="Screen name (e.g. multi_metric) or path to a screen YAML file.")
+    parser.add_argument("--param", action="append", type=parse_param, default=[], help="Values to try, e.g. ncav_ratio_max=2.5,3.0. Repeatable.")
+    parser.add_argument("--fundamentals", help="Saved fundamentals file. Defaults to the screen's last run.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes. Defaults to the CPU count.")
+    parser.add_argument("--top", type=int, default=10, help="Ranked tickers kept per parameter set.")
+    parser.add_argument("--output", help="Writes the full results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    definition = load_screen(args.screen)
+    table = load_fundamentals(definition.name, args.fundamentals)
+    param_sets = expand_grid(dict(args.param)) if args.param else [{}]
+    start = perf_counter()
+    results = Sweep(definition, table, args.top).run(param_sets, args.processes)
+    print(f"{len(results)} parameter sets evaluated in {perf_counter() - start:.2f}s.")
+    for res in results:
+        params = ", ".join(f"{k}={v}" for k, v in res["params"].items()) or "defaults"
+        print(f"{params}: {res['passed']} passed. {' '.join(res['tickers'])}")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"File saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
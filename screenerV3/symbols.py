@@ -0,0 +1,196 @@
+from datetime import datetime
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+from screener.helpers.edgar import convert_cik_list, convert_company_tickers
+
+SYMBOLS_DIR = "./data/symbols"
+CIK_PATH = "./data/older-data/cik.txt"
+TICKERS_PATH = "./data/older-data/company_tickers.json"
+UNIVERSE_PATH = "./data/cleaned_tickers.json"
+
+# country -> FMP exchange suffix
+SUFFIXES = {
+    'Japan': '.T',
+    'Canada': '.TO',
+    'Austria': '.VI',
+    'Belgium': '.BR',
+    'Estonia': '.TL',
+    'France': '.PA',
+    'Germany': '.DE',
+    'Greece': '.AT',
+    'Hungary': '.BD',
+    'Italy': '.MI',
+    'Latvia': '.RG',
+    'Lithuania': '.VS',
+    'Netherlands': '.AS',
+    'Poland': '.WS',
+    'Portugal': '.LS',
+    'Romania': '.RO',
+    'Finland': '.HE',
+    'Spain': '.MC',
+    'Sweden': '.ST',
+    'Switzerland': '.SW',
+    'United Kingdom': '.L',
+    'New Zealand': '.NZ',
+    'Czech Republic': '.PR',
+    'USA': ''}
+
+_COUNTRIES = {v: k for k, v in SUFFIXES.items() if v}
+
+
+def canonical(ticker: str) -> str:
+    """
+    Returns the FMP spelling of a ticker: upper case, exchange suffix kept, and US share classes written with a dash
+    (EDGAR's `brk-b`, `BRK.B` and `BRK/B` are all `BRK-B`).
+    """
+    ret = ticker.strip().upper().replace("/", "-")
+    base, dot, suffix = ret.rpartition(".")
+    if dot and f".{suffix}" in _COUNTRIES:
+        return f"{base.replace('.', '-')}.{suffix}"
+    return ret.replace(".", "-")
+
+def suffix_country(ticker: str) -> str:
+    """
+    Returns the country of a ticker's exchange suffix (`USA` without one, None for an unknown suffix).
+    """
+    base, dot, suffix = canonical(ticker).rpartition(".")
+    return _COUNTRIES.get(f".{suffix}") if dot else "USA"
+
+
+class SymbolIndex:
+    """
+    One ticker <-> CIK <-> country index shared by the data sources.
+
+    Built once (`build`) from the EDGAR CIK list, the SEC `company_tickers.json` and the ticker universe, and saved
+    under `root` as `.npy` columns. The columns are memory-mapped and turned into dicts on the first lookup, so every
+    lookup is O(1) and nothing is parsed again per run. All tickers are stored in their `canonical` form.
+
+    Parameters:
+    - `root` (str): The saved index. Default is `./data/symbols`.
+    """
+    def __init__(self, root: str = SYMBOLS_DIR) -> None:
+        self.root = root
+        self.__ciks = None
+        self.__tickers = None
+        self.__countries = None
+
+    @classmethod
+    def from_sources(cls, cik_path: str = CIK_PATH, tickers_path: str = TICKERS_PATH, universe_path: str = UNIVERSE_PATH) -> "SymbolIndex":
+        """
+        Returns an index built in memory from the source files (missing files are skipped), without saving it.
+        """
+        ret = cls(None)
+        ret.__set(*_sources(cik_path, tickers_path, universe_path))
+        return ret
+
+    def __set(self, symbols: list[str], ciks: list[int], countries: list[str]) -> None:
+        self.__ciks = {k: v for k, v in zip(symbols, ciks) if v >= 0}
+        self.__countries = {k: v for k, v in zip(symbols, countries) if v}
+        self.__tickers = {}
+        for k, v in self.__ciks.items():
+            self.__tickers.setdefault(v, k)
+
+    def __load(self) -> None:
+        if self.__ciks is not None:
+            return
+        path = os.path.join(self.root, "meta.json") if self.root else None
+        if path is None or not os.path.exists(path):
+            self.__set([], [], [])
+            return
+        columns = {name: np.load(os.path.join(self.root, f"{name}.npy"), mmap_mode="r") for name in ("symbol", "cik", "country")}
+        self.__set(columns["symbol"].tolist(), columns["cik"].tolist(), columns["country"].tolist())
+
+    def build(self, cik_path: str = CIK_PATH, tickers_path: str = TICKERS_PATH, universe_path: str = UNIVERSE_PATH) -> int:
+        """
+        Builds the index from the source files and saves it under `root`, replacing it.
+
+        Parameters:
+        - `cik_path` (str): The EDGAR ticker -> CIK list. It wins over `company_tickers.json`.
+        - `tickers_path` (str): The SEC `company_tickers.json`.
+        - `universe_path` (str): The country -> tickers universe, for the countries.
+
+        Returns:
+        - `int`: The symbols saved.
+        """
+        symbols, ciks, countries = _sources(cik_path, tickers_path, universe_path)
+        tmp = f"{self.root}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "symbol.npy"), np.array(symbols, dtype=str))
+        np.save(os.path.join(tmp, "cik.npy"), np.array(ciks, dtype=np.int64))
+        np.save(os.path.join(tmp, "country.npy"), np.array(countries, dtype=str))
+        with open(os.path.join(tmp, "meta.json"), 'w') as file:
+            json.dump({"rows": len(symbols), "sources": [cik_path, tickers_path, universe_path],
+                       "built": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, file, indent=2)
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.replace(tmp, self.root)
+        self.__ciks = None
+        return len(symbols)
+
+    def cik(self, ticker: str) -> int:
+        """
+        Returns the CIK of a ticker, or None.
+        """
+        self.__load()
+        return self.__ciks.get(canonical(ticker))
+
+    def ticker(self, cik: int) -> str:
+        """
+        Returns the primary ticker of a CIK (the first listed by the sources), or None.
+        """
+        self.__load()
+        return self.__tickers.get(int(cik))
+
+    def country(self, ticker: str) -> str:
+        """
+        Returns the country a ticker is listed in: from the universe, else from its exchange suffix.
+        """
+        self.__load()
+        symbol = canonical(ticker)
+        return self.__countries.get(symbol) or suffix_country(symbol)
+
+
+def _sources(cik_path: str, tickers_path: str, universe_path: str) -> tuple:
+    # (symbols, CIKs or -1, countries or "") merged from the source files
+    ciks = {}
+    if tickers_path and os.path.exists(tickers_path):
+        ciks.update({canonical(k): v for k, v in convert_company_tickers(tickers_path).items()})
+    if cik_path and os.path.exists(cik_path):
+        ciks.update({canonical(k): v for k, v in convert_cik_list(cik_path).items()})
+    countries = {}
+    if universe_path and os.path.exists(universe_path):
+        with open(universe_path, 'r') as file:
+            for country, tickers in json.load(file).items():
+                for k in tickers:
+                    countries.setdefault(canonical(k), country)
+    symbols = list(ciks) + [k for k in countries if k not in ciks]
+    return symbols, [ciks.get(k, -1) for k in symbols], [countries.get(k, "") for k in symbols]
+
+
+_shared = None
+
+def shared() -> SymbolIndex:
+    """
+    Returns the process-wide index: the saved one if built, else one built from the default source files.
+    """
+    global _shared
+    if _shared is None:
+        _shared = SymbolIndex() if os.path.exists(os.path.join(SYMBOLS_DIR, "meta.json")) else SymbolIndex.from_sources()
+    return _shared
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Builds the ticker <-> CIK <-> country symbol index.")
+    parser.add_argument("--cik", default=CIK_PATH, help="The EDGAR ticker -> CIK list.")
+    parser.add_argument("--company-tickers", default=TICKERS_PATH, help="The SEC company_tickers.json.")
+    parser.add_argument("--universe", default=UNIVERSE_PATH, help="The country -> tickers universe.")
+    parser.add_argument("--root", default=SYMBOLS_DIR, help="Where the index is saved.")
+    args = parser.parse_args(argv)
+    print(f"{SymbolIndex(args.root).build(args.cik, args.company_tickers, args.universe)} symbols indexed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+FLOAT = "f"
+INT = "i"
+BOOL = "b"
+OBJECT = "O"
+
+
+def infer_kind(value) -> str:
+    """
+    Infers the column kind used to store a value.
+
+    Parameters:
+    - `value`: A cell value.
+
+    Returns:
+    - `str`: One of `FLOAT`, `INT`, `BOOL` or `OBJECT`.
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return BOOL
+    if isinstance(value, (int, np.integer)):
+        return INT
+    if isinstance(value, (float, np.floating)):
+        return FLOAT
+    return OBJECT
+
+
+class Table:
+    """
+    Columnar, array-backed table of per-ticker screening state.
+
+    Each column is a single numpy array (one row per ticker) and removed tickers are only
+    flagged in the `alive` mask, so filtering a phase is a mask flip rather than a `dict.pop`
+    and whole-universe calculations can be written as array expressions.
+
+    Column kinds:
+    - `FLOAT`: float64, missing values are NaN.
+    - `INT`: stored as float64 (so values can be missing) and emitted as `int`.
+    - `BOOL`: bool, missing values are False.
+    - `OBJECT`: any Python object (names, countries, ...), missing values are None.
+    """
+    def __init__(self, schema: dict[str:str] = None, capacity: int = 256) -> None:
+        self.__capacity = max(capacity, 1)
+        self.__size = 0
+        self.__index = {}
+        self.__tickers = np.empty(self.__capacity, dtype=object)
+        self.__alive = np.zeros(self.__capacity, dtype=bool)
+        self.__columns = {}
+        self.__order = None
+        self.schema = {}
+        for name, kind in (schema or {}).items():
+            self.add_column(name, kind)
+
+    @classmethod
+    def from_dict(cls, data: dict[str:dict], schema: dict[str:str] = None) -> "Table":
+        """
+        Builds a table from a dict of per-ticker dicts.
+
+        Parameters:
+        - `data` (dict): Rows keyed by ticker.
+        - `schema` (dict): Optional column kinds; other columns are inferred from their values.
+
+        Returns:
+        - `Table`: The table, in the iteration order of `data`.
+        """
+        table = cls(schema, capacity=len(data))
+        for ticker, values in data.items():
+            table.add(ticker, values)
+        return table
+
+    @classmethod
+    def from_arrays(cls, tickers: list[str], columns: dict[str:np.ndarray], schema: dict[str:str] = None) -> "Table":
+        """
+        Builds a table from whole columns.
+
+        Parameters:
+        - `tickers` (list[str]): One ticker per row.
+        - `columns` (dict): Arrays aligned with `tickers`, keyed by column name.
+        - `schema` (dict): Optional column kinds; other kinds are implied by the array dtypes.
+
+        Returns:
+        - `Table`: The table, with every row alive.
+        """
+        table = cls(capacity=len(tickers))
+        for ticker in tickers:
+            table.add(ticker)
+        for name, values in columns.items():
+            table.assign(name, values, (schema or {}).get(name))
+        return table
+
+    @classmethod
+    def load(cls, path: str) -> "Table":
+        """
+        Loads a table written by `save`.
+
+        Parameters:
+        - `path` (str): The `.npz` file.
+
+        Returns:
+        - `Table`: The table, including its removed rows and sort order.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            schema = json.loads(str(data["__schema__"]))
+            tickers = data["__tickers__"].tolist()
+            table = cls(capacity=len(tickers))
+            for ticker in tickers:
+                table.add(ticker)
+            for name, kind in schema.items():
+                values = data[f"col:{name}"]
+                if kind == OBJECT:
+                    values = values.astype(object)
+                    values[data[f"null:{name}"]] = None
+                table.assign(name, values, kind)
+            table.keep(data["__alive__"])
+            if "__order__" in data:
+                table.__order = data["__order__"]
+        return table
+
+    def save(self, path: str) -> None:
+        """
+        Saves the table (all rows, the alive mask and the sort order) to a compressed `.npz` file.
+
+        Object columns are stored as strings.
+        """
+        arrays = {
+            "__schema__": np.array(json.dumps(self.schema)),
+            "__tickers__": self.all_tickers().astype(str),
+            "__alive__": self.alive,
+        }
+        if self.__order is not None:
+            arrays["__order__"] = self.__order
+        for name, kind in self.schema.items():
+            values = self[name]
+            if kind == OBJECT:
+                arrays[f"null:{name}"] = np.array([v is None for v in values], dtype=bool)
+                values = np.array(["" if v is None else str(v) for v in values], dtype=str)
+            arrays[f"col:{name}"] = values
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # write then rename, so an interrupted save never leaves a truncated file behind
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, path)
+
+    def __len__(self) -> int:
+        return int(self.__alive[:self.__size].sum())
+
+    def __contains__(self, ticker: str) -> bool:
+        row = self.__index.get(ticker)
+        return row is not None and bool(self.__alive[row])
+
+    def __iter__(self):
+        return iter(self.tickers())
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.__columns)
+
+    @property
+    def alive(self) -> np.ndarray:
+        """
+        Returns the alive mask over all rows (including removed ones).
+        """
+        return self.__alive[:self.__size]
+
+    def __empty(self, kind: str, length: int) -> np.ndarray:
+        if kind in (FLOAT, INT):
+            return np.full(length, np.nan)
+        if kind == BOOL:
+            return np.zeros(length, dtype=bool)
+        return np.full(length, None, dtype=object)
+
+    def __grow(self) -> None:
+        capacity = self.__capacity * 2
+        self.__tickers = np.concatenate([self.__tickers, np.empty(self.__capacity, dtype=object)])
+        self.__alive = np.concatenate([self.__alive, np.zeros(self.__capacity, dtype=bool)])
+        for name, kind in self.schema.items():
+            self.__columns[name] = np.concatenate([self.__columns[name], self.__empty(kind, self.__capacity)])
+        self.__capacity = capacity
+
+    def __upcast(self, name: str, value) -> None:
+        kind = self.schema[name]
+        new = infer_kind(value)
+        if value is None or new == kind or kind == OBJECT:
+            return
+        if kind == INT and new == FLOAT:
+            self.schema[name] = FLOAT
+            return
+        if kind == FLOAT and new == INT:
+            return
+        col = self.__columns[name].astype(object)
+        if kind in (FLOAT, INT):
+            col[np.isnan(self.__columns[name])] = None
+            if kind == INT:
+                col = np.array([None if v is None else int(v) for v in col], dtype=object)
+        self.__columns[name] = col
+        self.schema[name] = OBJECT
+
+    def add_column(self, name: str, kind: str = FLOAT) -> None:
+        """
+        Adds an empty column. Does nothing if the column already exists.
+        """
+        if name in self.__columns:
+            return
+        self.schema[name] = kind
+        self.__columns[name] = self.__empty(kind, self.__capacity)
+
+    def drop_column(self, name: str) -> None:
+        self.schema.pop(name, None)
+        self.__columns.pop(name, None)
+
+    def add(self, ticker: str, values: dict = None) -> None:
+        """
+        Adds a ticker (or revives a removed one) and sets the given values.
+
+        Parameters:
+        - `ticker` (str): The stock ticker symbol.
+        - `values` (dict): Column values for the ticker. Defaults to None.
+        """
+        row = self.__index.get(ticker)
+        if row is None:
+            if self.__size == self.__capacity:
+                self.__grow()
+            row = self.__size
+            self.__size += 1
+            self.__index[ticker] = row
+            self.__tickers[row] = ticker
+            self.__order = None
+        self.__alive[row] = True
+        for name, value in (values or {}).items():
+            self.__set_row(row, name, value)
+
+    def __set_row(self, row: int, name: str, value) -> None:
+        if name not in self.__columns:
+            self.add_column(name, infer_kind(value))
+        else:
+            self.__upcast(name, value)
+        if value is None and self.schema[name] in (FLOAT, INT):
+            value = np.nan
+        self.__columns[name][row] = value
+
+    def set(self, ticker: str, name: str, value) -> None:
+        """
+        Sets a single cell, creating or widening the column if needed.
+        """
+        self.__set_row(self.__index[ticker], name, value)
+
+    def get(self, ticker: str, name: str, default=None):
+        """
+        Returns a single cell as a Python value, or `default` if it is missing.
+        """
+        row = self.__index.get(ticker)
+        if row is None or name not in self.__columns:
+            return default
+        value = self.__value(name, row)
+        return default if value is None else value
+
+    def __value(self, name: str, row: int):
+        value = self.__columns[name][row]
+        kind = self.schema[name]
+        if kind in (FLOAT, INT):
+            if np.isnan(value):
+                return None
+            return int(value) if kind == INT else float(value)
+        if kind == BOOL:
+            return bool(value)
+        return value
+
+    def remove(self, ticker: str) -> bool:
+        """
+        Flags a ticker as removed.
+
+        Returns:
+        - `bool`: True if the ticker was alive.
+        """
+        row = self.__index.get(ticker)
+        if row is None or not self.__alive[row]:
+            return False
+        self.__alive[row] = False
+        return True
+
+    def keep(self, mask: np.ndarray) -> int:
+        """
+        Removes every alive row where `mask` is False.
+
+        Parameters:
+        - `mask` (np.ndarray): A boolean array over all rows (see `alive`).
+
+        Returns:
+        - `int`: The number of tickers removed.
+        """
+        before = len(self)
+        self.__alive[:self.__size] &= np.asarray(mask, dtype=bool)
+        return before - len(self)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.__columns[name][:self.__size]
+
+    def __setitem__(self, name: str, values: np.ndarray) -> None:
+        self.assign(name, values)
+
+    def assign(self, name: str, values: np.ndarray, kind: str = None) -> None:
+        """
+        Replaces a whole column with an array over all rows (see `alive`).
+
+        Parameters:
+        - `name` (str): The column name.
+        - `values` (np.ndarray): The new values.
+        - `kind` (str): The column kind. Defaults to the kind implied by the array's dtype.
+        """
+        values = np.asarray(values)
+        if kind is None:
+            if values.dtype == bool:
+                kind = BOOL
+            elif np.issubdtype(values.dtype, np.integer):
+                kind = INT
+            elif np.issubdtype(values.dtype, np.floating):
+                kind = FLOAT
+            else:
+                kind = OBJECT
+        col = self.__empty(kind, self.__capacity)
+        col[:self.__size] = values
+        self.schema[name] = kind
+        self.__columns[name] = col
+
+    def index(self, tickers: list[str]) -> np.ndarray:
+        """
+        Returns the row of each ticker (see `alive`).
+        """
+        return np.array([self.__index[t] for t in tickers], dtype=int)
+
+    def numeric(self, name: str, rows: np.ndarray = None) -> np.ndarray:
+        """
+        Returns a column as floats, with missing or non-numeric cells as NaN.
+
+        Parameters:
+        - `name` (str): The column name.
+        - `rows` (np.ndarray): Only return these rows (see `index`). Defaults to all rows.
+        """
+        if name not in self.__columns:
+            return np.full(self.__size if rows is None else len(rows), np.nan)
+        col = self[name] if rows is None else self[name][rows]
+        if self.schema[name] in (FLOAT, INT, BOOL):
+            return col.astype(float)
+        return np.array([v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in col], dtype=float)
+
+    def __alive_rows(self) -> np.ndarray:
+        if self.__order is None:
+            return np.flatnonzero(self.alive)
+        return self.__order[self.__alive[self.__order]]
+
+    def sort(self, names: list[str], descending: list[bool] = None) -> None:
+        """
+        Orders the alive rows by the given columns (first column is the primary key).
+
+        Missing values are sorted last.
+
+        Parameters:
+        - `names` (list[str]): The columns to sort on.
+        - `descending` (list[bool]): Per-column sort direction. Defaults to ascending.
+        """
+        rows = np.flatnonzero(self.alive)
+        descending = descending or [False] * len(names)
+        keys = []
+        for name, desc in zip(reversed(names), reversed(descending)):
+            col = self.numeric(name)[rows]
+            keys.append(np.where(np.isnan(col), np.inf, -col if desc else col))
+        self.__order = rows[np.lexsort(keys)] if keys else rows
+
+    def all_tickers(self) -> np.ndarray:
+        """
+        Returns the ticker of every row (including removed ones), aligned with the column arrays.
+        """
+        return self.__tickers[:self.__size]
+
+    def tickers(self) -> list[str]:
+        """
+        Returns the alive tickers in table order.
+        """
+        return self.__tickers[self.__alive_rows()].tolist()
+
+    def rows(self, na=None):
+        """
+        Iterates over the alive rows in table order.
+
+        Parameters:
+        - `na`: The value emitted for missing cells. Defaults to None.
+
+        Returns:
+        - An iterator of `(ticker, dict)` pairs.
+        """
+        for row in self.__alive_rows():
+            values = {}
+            for name in self.__columns:
+                value = self.__value(name, row)
+                values[name] = na if value is None else value
+            yield self.__tickers[row], values
+
+    def to_dict(self, na=None) -> dict[str:dict]:
+        return dict(self.rows(na))
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the alive rows as a DataFrame indexed by ticker.
+        """
+        rows = self.__alive_rows()
+        data = {name: self.__columns[name][rows] for name in self.__columns}
+        df = pd.DataFrame(data, index=self.__tickers[rows])
+        for name, kind in self.schema.items():
+            if kind == INT:
+                df[name] = df[name].astype("Int64")
+        return df
@@ -0,0 +1,341 @@
+from time import perf_counter
+import asyncio
+import aiohttp
+import gzip
+from urllib.parse import urlsplit
+import json
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli else "gzip, deflate"
+
+# where `LocalTransport` reads its responses, unless `FMP_LOCAL_DIR` is set
+LOCAL_DIR = "./data/fmp-local"
+
+
+def decode_body(raw: bytes, encoding: str = None) -> bytes:
+    """
+    Decompresses a response body according to its `Content-Encoding` header.
+
+    Parameters:
+    - `raw` (bytes): The body as it was received on the wire.
+    - `encoding` (str): The value of the `Content-Encoding` header. Defaults to None.
+
+    Returns:
+    - `bytes`: The decompressed body.
+    """
+    encoding = (encoding or "").strip().lower()
+    if encoding == "gzip":
+        return gzip.decompress(raw)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(raw)
+        except zlib.error:
+            return zlib.decompress(raw, -zlib.MAX_WBITS)
+    if encoding == "br" and brotli:
+        return brotli.decompress(raw)
+    return raw
+
+
+class Transport:
+    """
+    Base class for the HTTP clients used to talk to FMP.
+
+    A transport is an async context manager that owns its connection pool and keeps
+    running totals of requests, bytes on the wire and decoded bytes so that clients
+    can be compared against each other. If `metrics` (a `RunMetrics`) is set, every request is
+    also recorded there by endpoint, with its latency, size and error class.
+
+    A response with a status other than 200 counts as an error and is returned as None. The legacy
+    handlers parsed every response with `response.json()`, so they got FMP's error JSON instead.
+    """
+    name = "base"
+
+    def __init__(self, max_connections: int = 100) -> None:
+        self.max_connections = max_connections
+        self.stats = {"requests": 0, "errors": 0, "wire_bytes": 0, "body_bytes": 0}
+        self.metrics = None
+        self.__first_request = None
+        self.__last_response = None
+
+    @classmethod
+    def unavailable(cls) -> str:
+        """
+        Tells why this transport cannot be benchmarked against FMP.
+
+        Returns:
+        - `str`: The reason, or None if it can.
+        """
+        return None
+
+    async def __aenter__(self) -> "Transport":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        raise NotImplementedError
+
+    async def _fetch(self, url: str) -> tuple[int, bytes, int]:
+        """
+        Performs a single GET request.
+
+        Returns:
+        - `tuple`: The status code, the decoded body and the number of bytes received on the wire.
+        """
+        raise NotImplementedError
+
+    async def get_bytes(self, url: str) -> bytes:
+        """
+        Performs a GET request and returns the decoded body.
+
+        Parameters:
+        - `url` (str): The URL to request.
+
+        Returns:
+        - `bytes`: The response body, or None if the request failed or the status was not 200.
+        """
+        start = perf_counter()
+        if self.__first_request is None:
+            self.__first_request = start
+        self.stats["requests"] += 1
+        try:
+            status, body, wire_bytes = await self._fetch(url)
+        except Exception as e:
+            self.stats["errors"] += 1
+            if self.metrics is not None:
+                self.metrics.request(url, perf_counter() - start, error=type(e).__name__)
+            return None
+        finally:
+            self.__last_response = perf_counter()
+        self.stats["wire_bytes"] += wire_bytes
+        self.stats["body_bytes"] += len(body)
+        if self.metrics is not None:
+            self.metrics.request(url, self.__last_response - start, wire_bytes, len(body), None if status == 200 else f"HTTP {status}")
+        if status != 200:
+            self.stats["errors"] += 1
+            return None
+        return body
+
+    async def get_json(self, url: str):
+        """
+        Performs a GET request and parses the body as JSON.
+
+        Parameters:
+        - `url` (str): The URL to request.
+
+        Returns:
+        - The parsed JSON payload, or None if the request or the parsing failed, or the status was not 200.
+        """
+        body = await self.get_bytes(url)
+        if body is None:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+    def report(self) -> dict:
+        """
+        Summarises the traffic handled by this transport.
+
+        Returns:
+        - `dict`: Request and byte counts, the compression ratio and requests per second.
+        """
+        ret = dict(self.stats)
+        ret["transport"] = self.name
+        elapsed = 0.0
+        if self.__first_request is not None and self.__last_response is not None:
+            elapsed = self.__last_response - self.__first_request
+        ret["elapsed"] = round(elapsed, 3)
+        ret["requests_per_second"] = round(ret["requests"] / elapsed, 2) if elapsed > 0 else 0.0
+        ret["compression_ratio"] = round(ret["body_bytes"] / ret["wire_bytes"], 2) if ret["wire_bytes"] else 0.0
+        return ret
+
+
+class AiohttpTransport(Transport):
+    """
+    HTTP/1.1 transport backed by aiohttp. Each in-flight request holds its own connection.
+    """
+    name = "aiohttp"
+
+    def __init__(self, max_connections: int = 100) -> None:
+        super().__init__(max_connections)
+        self.session = None
+
+    async def open(self) -> None:
+        # decompress manually so the bytes received on the wire can be counted
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            auto_decompress=False)
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _fetch(self, url: str) -> tuple[int, bytes, int]:
+        async with self.session.get(url) as response:
+            raw = await response.read()
+            return response.status, decode_body(raw, response.headers.get("Content-Encoding")), len(raw)
+
+
+class HttpxTransport(Transport):
+    """
+    HTTP/2 transport backed by httpx. Concurrent requests are multiplexed over a single connection.
+
+    Requires `httpx[http2]`; brotli responses additionally require `brotli`.
+    """
+    name = "httpx"
+
+    def __init__(self, max_connections: int = 100) -> None:
+        super().__init__(max_connections)
+        self.client = None
+
+    @classmethod
+    def unavailable(cls) -> str:
+        return "it requires `pip install httpx[http2]`" if httpx is None else None
+
+    async def open(self) -> None:
+        if httpx is None:
+            raise RuntimeError("The httpx transport requires `pip install httpx[http2]`.")
+        self.client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=self.max_connections),
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            timeout=60)
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def _fetch(self, url: str) -> tuple[int, bytes, int]:
+        response = await self.client.get(url)
+        return response.status_code, response.content, response.num_bytes_downloaded
+
+
+class LocalTransport(Transport):
+    """
+    Local stand-in for FMP that serves saved responses, to run screens and the trickle daemon without network or quota.
+
+    A URL is served from the file at its path under `root`, ignoring the host and query (e.g. `api/v3/stock/list`), or
+    from one JSON file per symbol when the last path segment is a symbol list: `api/v3/profile/AAA,BBB` joins the lists
+    in `api/v3/profile/AAA.json` and `BBB.json`. Anything else is a 404.
+
+    Parameters:
+    - `max_connections` (int): Unused, for the `create_transport` signature.
+    - `root` (str): The response directory. Defaults to the `FMP_LOCAL_DIR` environment variable, or `./data/fmp-local`.
+    """
+    name = "local"
+
+    def __init__(self, max_connections: int = 100, root: str = None) -> None:
+        super().__init__(max_connections)
+        self.root = root or os.environ.get("FMP_LOCAL_DIR", LOCAL_DIR)
+
+    @classmethod
+    def unavailable(cls) -> str:
+        return "it serves saved responses, not FMP"
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def _fetch(self, url: str) -> tuple[int, bytes, int]:
+        path = os.path.join(self.root, *urlsplit(url).path.strip("/").split("/"))
+        if os.path.isfile(path):
+            with open(path, 'rb') as file:
+                body = file.read()
+            return 200, body, len(body)
+        head, symbols = os.path.split(path)
+        files = [os.path.join(head, f"{i}.json") for i in symbols.split(",") if os.path.isfile(os.path.join(head, f"{i}.json"))]
+        if not files:
+            return 404, b"", 0
+        if "," not in symbols:
+            with open(files[0], 'rb') as file:
+                body = file.read()
+            return 200, body, len(body)
+        items = []
+        for i in files:
+            with open(i, 'rb') as file:
+                data = json.load(file)
+            items += data if isinstance(data, list) else [data]
+        body = json.dumps(items).encode()
+        return 200, body, len(body)
+
+
+TRANSPORTS = {
+    AiohttpTransport.name: AiohttpTransport,
+    HttpxTransport.name: HttpxTransport,
+    LocalTransport.name: LocalTransport,
+}
+
+
+def create_transport(name: str = None, max_connections: int = 100, metrics=None) -> Transport:
+    """
+    Creates a transport by name.
+
+    Parameters:
+    - `name` (str): One of `TRANSPORTS`. Defaults to the `FMP_TRANSPORT` environment variable, or `aiohttp`.
+    - `max_connections` (int): The maximum number of open connections. Defaults to 100.
+    - `metrics` (RunMetrics): Where each request is recorded. Defaults to None.
+
+    Returns:
+    - `Transport`: An unopened transport, to be used as an async context manager.
+    """
+    name = name or os.environ.get("FMP_TRANSPORT", AiohttpTransport.name)
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown transport '{name}'. Expected one of {list(TRANSPORTS)}.")
+    ret = TRANSPORTS[name](max_connections=max_connections)
+    ret.metrics = metrics
+    return ret
+
+
+async def compare_transports(urls: list[str], names: list[str] = None, concurrency: int = 50) -> dict[str:dict]:
+    """
+    Fetches the same URLs through each transport and reports bytes on the wire and throughput.
+
+    Parameters:
+    - `urls` (list[str]): The URLs to request.
+    - `names` (list[str]): The transports to compare. Defaults to the `TRANSPORTS` that can reach FMP here; the others are skipped with a message.
+    - `concurrency` (int): The number of requests in flight at once. Defaults to 50.
+
+    Returns:
+    - `dict`: The `Transport.report()` of each transport, keyed by name.
+    """
+    if names is None:
+        names = []
+        for name, transport in TRANSPORTS.items():
+            reason = transport.unavailable()
+            if reason is None:
+                names.append(name)
+            else:
+                print(f"Skipping the {name} transport: {reason}.")
+    ret = {}
+    for name in names:
+        semaphore = asyncio.Semaphore(concurrency)
+        async with create_transport(name, max_connections=concurrency) as transport:
+            async def fetch(url):
+                async with semaphore:
+                    await transport.get_bytes(url)
+            await asyncio.gather(*[fetch(url) for url in urls])
+        ret[name] = transport.report()
+    return ret
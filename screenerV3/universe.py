@@ -0,0 +1,125 @@
+from datetime import datetime
+import argparse
+import json
+import os
+import numpy as np
+from .symbols import canonical
+
+# tickers per precomputed batch, the most a comma-separated FMP request takes (see `fundamentals.PROFILE_BATCH`)
+BATCH = 1000
+
+
+class Universe:
+    """
+    A deduplicated ticker universe, each ticker tagged with its country and exchange suffix.
+
+    `compile` merges the country -> tickers JSON files in `data/`, writes every ticker once in its canonical form
+    (see `symbols.canonical`) and saves the result as one `.npz` file, with the request batches precomputed.
+    Loading it reads a handful of arrays, so screeners never re-parse, re-flatten or re-join the JSON lists.
+
+    Parameters:
+    - `tickers` (list[str]): The tickers, each listed once.
+    - `countries` (list[str]): The country of each ticker.
+    - `meta` (dict): Where the universe was compiled from. Default is None.
+    """
+    def __init__(self, tickers: list[str], countries: list[str], meta: dict = None) -> None:
+        self.tickers = tickers
+        self.countries = countries
+        self.meta = meta or {}
+        self.__batches = None
+
+    @classmethod
+    def compile(cls, paths: list[str], debug: bool = False) -> "Universe":
+        """
+        Merges country -> tickers JSON files into one universe. A ticker listed again (in the same or a later file) is
+        dropped, and so are countries without tickers.
+
+        Parameters:
+        - `paths` (list[str]): The JSON files, in priority order.
+        - `debug` (bool): If True, prints the duplicates and empty countries. Default is False.
+
+        Returns:
+        - `Universe`: The universe, in the order of the files.
+        """
+        tickers, countries, seen = [], [], set()
+        duplicates, empty = 0, []
+        for path in paths:
+            with open(path, 'r') as file:
+                data = json.load(file)
+            for country, listed in data.items():
+                if not listed:
+                    empty.append(country)
+                for k in map(canonical, listed):
+                    if k in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(k)
+                    tickers.append(k)
+                    countries.append(country)
+        print(f"{len(tickers)} tickers, {duplicates} duplicates dropped, no tickers for {sorted(set(empty))}.") if debug else None
+        return cls(tickers, countries, {"sources": [os.path.basename(i) for i in paths], "duplicates": duplicates, "empty": sorted(set(empty))})
+
+    @classmethod
+    def load(cls, path: str) -> "Universe":
+        """
+        Loads a compiled universe (`.npz`), or compiles a JSON file in memory.
+        """
+        if not path.endswith(".npz"):
+            return cls.compile([path])
+        with np.load(path) as data:
+            names = data["country_names"].tolist()
+            ret = cls(data["symbol"].tolist(), [names[i] for i in data["country"].tolist()], json.loads(str(data["meta"])))
+            ret.__batches = data["batch"].tolist()
+        return ret
+
+    def save(self, path: str) -> None:
+        """
+        Saves the universe as one `.npz` file: the tickers, their country and exchange suffix, and the request batches.
+        """
+        names = sorted(set(self.countries))
+        index = {name: i for i, name in enumerate(names)}
+        meta = {**self.meta, "tickers": len(self.tickers), "compiled": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(tmp, symbol=np.array(self.tickers, dtype=str), country=np.array([index[i] for i in self.countries], dtype=np.int16),
+                            country_names=np.array(names, dtype=str), exchange=np.array(self.exchanges(), dtype=str),
+                            batch=np.array(self.batches(), dtype=str), meta=np.array(json.dumps(meta)))
+        os.replace(tmp, path)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def exchanges(self) -> list[str]:
+        """
+        Returns the exchange suffix of each ticker (`.TO`, `.L`, ..., empty for US listings).
+        """
+        return [f".{k.rpartition('.')[2]}" if "." in k else "" for k in self.tickers]
+
+    def by_country(self) -> dict[str:list]:
+        """
+        Returns the tickers keyed by country, as in the `data/` JSON files.
+        """
+        ret = {}
+        for k, country in zip(self.tickers, self.countries):
+            ret.setdefault(country, []).append(k)
+        return ret
+
+    def batches(self) -> list[str]:
+        """
+        Returns the tickers as comma-separated request batches of `BATCH` tickers.
+        """
+        if self.__batches is None:
+            self.__batches = [",".join(self.tickers[i:i + BATCH]) for i in range(0, len(self.tickers), BATCH)]
+        return self.__batches
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compiles country -> tickers JSON files into one deduplicated universe file.")
+    parser.add_argument("paths", nargs="+", help="The JSON files, in priority order.")
+    parser.add_argument("--out", required=True, help="The universe file (.npz).")
+    args = parser.parse_args(argv)
+    universe = Universe.compile(args.paths, debug=True)
+    universe.save(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,49 @@
-import aiohttp
 from dotenv import load_dotenv
 import os
-import json
-import pandas as pd
 from screener.Sheet import Sheet
+from .table import Table
+from .derived import CASHFLOW_QUARTERS
+from .universe import Universe
+from .metrics import RunMetrics
+from .transport import Transport, create_transport
+from .records import BalanceSheet, CashFlow, KeyMetricsTTM, Listing, PriceHistory, Profile, Quote, SymbolChange, decode_csv, decode_floats, decode_many, decode_one, decode_statements
 
 load_dotenv()
 
 class Handler:
-    def __init__(self) -> None:
+    def __init__(self, transport: str = None, metrics: RunMetrics = None) -> None:
         self.api_key = os.environ['FMP_KEY']
-    
-    def __read_json_file(self, file_path) -> dict[str:list]:
-            """
-            Reads a JSON file and returns its content as a dictionary.
-
-            Parameters:
-            - `file_path` (str): The path to the JSON file.
-
-            Returns:
-            - `dict`: A dictionary containing the content of the JSON file.
-            """
-            with open(file_path, 'r') as file:
-                data = json.load(file)
-            return data
+        self.transport = transport
+        # every request of every session is recorded here (see `RunMetrics`)
+        self.metrics = metrics if metrics is not None else RunMetrics()
+
+    def session(self) -> Transport:
+        """
+        Creates a new HTTP session using the configured transport.
+
+        Returns:
+        - `Transport`: An unopened transport, to be used with `async with`.
+        """
+        return create_transport(self.transport, metrics=self.metrics)
     
     def process_tickers(self, sheet_client:Sheet, path: str = None) -> dict[str:list]:
         """
-        Processes tickers from a JSON file.
+        Processes tickers from a JSON file, or a compiled universe file (see `universe.Universe`). Tickers are written
+        in their canonical form and listed once.
 
         Parameters:
+        - `sheet_client` (Sheet): Sheet (or `RunHistory`) whose tickers from the last year are skipped. None keeps every ticker.
         - `path` (str): The path to the JSON file containing stock tickers. Defaults to None.
         - `tickers` (dict): A dictionary of tickers. Defaults to None.
 
         Returns:
         - `dict`: A dictionary containing processed tickers.
         """
-        t = self.__read_json_file(path)
+        universe = Universe.load(path)
         ret = {}
-        previously_seen = sheet_client.get_all_previously_seen_tickers()
+        previously_seen = set(sheet_client.get_all_previously_seen_tickers()) if sheet_client is not None else set()
         removed = 0
-        for k, v in t.items():
+        for k, v in universe.by_country().items():
             init = len(v)
             ret[k]=[i for i in v if i not in previously_seen]
             removed += init-len(ret[k])
@@ -48,67 +51,115 @@ class Handler:
         print(f"{removed} tickers removed for being screened within the passed year.")
         return ret
     
-    async def get_profile(self, session: aiohttp.ClientSession, ticker: str) -> str:
-        async with session.get(f'https://financialmodelingprep.com/api/v3/profile/{ticker}?apikey={self.api_key}') as response:
-            try:
-                return await response.json()
-            except Exception as e:
-                pass
+    async def get_profile(self, session: Transport, ticker: str) -> list[Profile]:
+        """
+        Retrieves the company profiles for a ticker, or a comma-separated batch of tickers.
+
+        Returns:
+        - `list[Profile]`: The valid profiles in the response, possibly empty.
+        """
+        return decode_many(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/profile/{ticker}?apikey={self.api_key}'), Profile)
     
-    async def get_historical(self, session: aiohttp.ClientSession, ticker: str) -> str:
-        async with session.get(f'https://financialmodelingprep.com/api/v3/historical-price-full/{ticker}?apikey={self.api_key}') as response:
-            try:
-                return await response.json()# if response.status == 200 else print("Hit API limit. Waiting 55 seconds.") and sleep(55)
-            except Exception as e:
-                pass
+    async def get_historical(self, session: Transport, ticker: str) -> PriceHistory:
+        """
+        Retrieves the daily closing prices for a given ticker (most recent first).
+
+        Returns:
+        - `PriceHistory`: The price history, or None if unavailable.
+        """
+        return decode_one(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/historical-price-full/{ticker}?apikey={self.api_key}'), PriceHistory)
     
-    async def get_balance_sheet(self, session: aiohttp.ClientSession, ticker: str) -> str:
-        async with session.get(f'https://financialmodelingprep.com/api/v3/balance-sheet-statement/{ticker}?period=quarter&limit=5&apikey={self.api_key}') as response:
-            try:
-                return await response.json()# if response.status == 200 else print("Hit API limit. Waiting 55 seconds.") and sleep(55)
-            except Exception as e:
-                pass
+    async def get_balance_sheet(self, session: Transport, ticker: str) -> list[BalanceSheet]:
+        """
+        Retrieves the last five quarterly balance sheets for a given ticker (most recent first).
+
+        Returns:
+        - `list[BalanceSheet]`: The balance sheets, or None if unavailable or malformed.
+        """
+        return decode_statements(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/balance-sheet-statement/{ticker}?period=quarter&limit=5&apikey={self.api_key}'), BalanceSheet)
     
-    async def get_cashflow(self, session: aiohttp.ClientSession, ticker: str) -> str:
-        async with session.get(f'https://financialmodelingprep.com/api/v3/cash-flow-statement/{ticker}?period=annual&limit=5&apikey={self.api_key}') as response:
-            try:
-                return await response.json()# if response.status == 200 else print("Hit API limit. Waiting 55 seconds.") and sleep(55)
-            except Exception as e:
-                pass
+    async def get_cashflow(self, session: Transport, ticker: str) -> list[CashFlow]:
+        """
+        Retrieves the quarterly cash flow statements covering the last five fiscal years and the current one
+        for a given ticker (most recent first). See `derived.fiscal_years` for the annual figures.
+
+        Returns:
+        - `list[CashFlow]`: The statements, or None if unavailable or malformed.
+        """
+        return decode_statements(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/cash-flow-statement/{ticker}?period=quarter&limit={CASHFLOW_QUARTERS}&apikey={self.api_key}'), CashFlow)
 
-    async def get_key_metrics(self, session: aiohttp.ClientSession, ticker: str) -> str:
+    async def get_key_metrics(self, session: Transport, ticker: str) -> KeyMetricsTTM:
         """
         Retrieves the key metrics TTM (Trailing Twelve Months) for a given ticker.
 
         Parameters:
-        - `session` (aiohttp.ClientSession): The aiohttp session to use for making requests.
+        - `session` (Transport): The transport to use for making requests.
         - `ticker` (str): The stock ticker symbol.
 
         Returns:
-        - `str`: The key metrics TTM data in JSON format.
+        - `KeyMetricsTTM`: The key metrics, or None if unavailable or malformed.
         """
-        async with session.get(f'https://financialmodelingprep.com/api/v3/key-metrics-ttm/{ticker}?period=quarter&apikey={self.api_key}') as response:
-            try:
-                return await response.json()
-            except Exception as e:
-                pass
+        return decode_one(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/key-metrics-ttm/{ticker}?period=quarter&apikey={self.api_key}'), KeyMetricsTTM)
     
-    async def get_floats(self) -> None:
+    async def get_quotes(self, session: Transport, ticker: str) -> list[Quote]:
+        """
+        Retrieves the real-time quotes for a ticker, or a comma-separated batch of tickers.
+
+        Returns:
+        - `list[Quote]`: The valid quotes in the response, possibly empty.
+        """
+        return decode_many(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/quote/{ticker}?apikey={self.api_key}'), Quote)
+
+    async def get_key_metrics_bulk(self, session: Transport) -> dict[str:KeyMetricsTTM]:
+        """
+        Retrieves the key metrics TTM of every company in a single (CSV) request.
+
+        Returns:
+        - `dict[str:KeyMetricsTTM]`: The key metrics keyed by ticker, or None if the request failed.
+        """
+        return decode_csv(await session.get_bytes(f'https://financialmodelingprep.com/api/v4/key-metrics-ttm-bulk?apikey={self.api_key}'), KeyMetricsTTM)
+
+    async def get_bulk_statements(self, session: Transport, dataset: str, year: int, period: str = "quarter") -> bytes:
+        """
+        Retrieves a bulk statement file (e.g. `balance-sheet-statement-bulk`) of every company for one fiscal year.
+
+        Returns:
+        - `bytes`: The CSV body, or None if the request failed.
+        """
+        return await session.get_bytes(f'https://financialmodelingprep.com/api/v4/{dataset}?year={year}&period={period}&apikey={self.api_key}')
+
+    async def get_stock_list(self, session: Transport) -> list[Listing]:
+        """
+        Retrieves every symbol FMP lists, with its exchange and type (stock, etf, trust, ...), in a single request.
+
+        Returns:
+        - `list[Listing]`: The listings, possibly empty.
+        """
+        return decode_many(await session.get_bytes(f'https://financialmodelingprep.com/api/v3/stock/list?apikey={self.api_key}'), Listing)
+
+    async def get_symbol_changes(self, session: Transport) -> list[SymbolChange]:
+        """
+        Retrieves the ticker changes (renames after mergers, rebrandings, ...) FMP knows of, in a single request.
+
+        Returns:
+        - `list[SymbolChange]`: The changes, possibly empty.
+        """
+        return decode_many(await session.get_bytes(f'https://financialmodelingprep.com/api/v4/symbol_change?apikey={self.api_key}'), SymbolChange)
+
+    async def get_floats(self) -> dict[str:float]:
         """
         Retrieves float data for all stocks.
 
         Returns:
-        - `None`
+        - `dict`: Outstanding shares keyed by ticker, or None if the request failed.
         """
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://financialmodelingprep.com/api/v4/shares_float/all?apikey={self.api_key}") as response:
-                try:
-                    return await response.json()
-                except Exception as e:
-                    print(f"Error fetching floats: {e}")
-                    return None
+        async with self.session() as session:
+            floats = decode_floats(await session.get_bytes(f"https://financialmodelingprep.com/api/v4/shares_float/all?apikey={self.api_key}"))
+        if floats is None:
+            print("Error fetching floats.")
+        return floats
     
-    def create_xlsx(self, file_path:str, results:dict) -> None:
+    def create_xlsx(self, file_path:str, results:Table) -> None:
         """
         Creates an Excel file with the screening results.
 
@@ -118,6 +169,5 @@ class Handler:
         Returns:
         - `None`
         """
-        df = pd.DataFrame.from_dict(results, orient='index')
-        df.to_excel(file_path)
+        results.to_frame().to_excel(file_path)
         print(f"File saved to {file_path}")
\ No newline at end of file
@@ -0,0 +1,74 @@
+import json
+import os
+import pytest
+from screenerV3.fundamentals import RateLimiter
+from screenerV3.records import BalanceSheet, Profile
+from screenerV3.screens import ScreenDefinition
+
+
+class Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class StubHandler:
+    # profiles every ticker at a market cap of 100 and gives CCC a balance sheet that fails `ncav_ratio < 2`
+    def __init__(self, fail_after: int = None) -> None:
+        self.calls = []
+        self.fail_after = fail_after
+
+    def session(self):
+        return Session()
+
+    async def get_profile(self, session, tickers):
+        self.calls.append("profile")
+        return [Profile(symbol=t, company_name=t, market_cap=100.0, country="US", exchange="X", industry="Software", last_div=0.0) for t in tickers.split(",")]
+
+    async def get_quotes(self, session, tickers):
+        return []
+
+    async def get_key_metrics_bulk(self, session):
+        return {}
+
+    async def get_balance_sheet(self, session, ticker):
+        self.calls.append(ticker)
+        if self.fail_after is not None and len(self.calls) > self.fail_after:
+            raise ConnectionError("network down")
+        return [BalanceSheet(total_current_assets=100.0 if ticker != "CCC" else 10.0, total_liabilities=0.0, net_debt=-1.0)]
+
+
+@pytest.fixture
+def stub_handler():
+    # the class, so a test can create several handlers
+    return StubHandler
+
+@pytest.fixture
+def ncav_screen():
+    return ScreenDefinition("test", require=["ncav_ratio < 2"], columns={"NCAV Ratio": "ncav_ratio"}, sort=["NCAV Ratio"])
+
+@pytest.fixture
+def local_fmp(tmp_path, monkeypatch):
+    # the local FMP stand-in (see `transport.LocalTransport`): call with {ticker: total current assets}
+    monkeypatch.setenv("FMP_KEY", "test")
+    monkeypatch.setenv("FMP_LOCAL_DIR", str(tmp_path / "fmp"))
+    root = tmp_path / "fmp" / "api" / "v3"
+
+    def write(assets: dict) -> None:
+        for endpoint in ("profile", "balance-sheet-statement"):
+            os.makedirs(root / endpoint, exist_ok=True)
+        for k, v in assets.items():
+            with open(root / "profile" / f"{k}.json", 'w') as file:
+                json.dump([{"symbol": k, "companyName": k, "mktCap": 100.0, "country": "US", "exchange": "X", "industry": "Software"}], file)
+            with open(root / "balance-sheet-statement" / f"{k}.json", 'w') as file:
+                json.dump([{"totalCurrentAssets": v, "totalLiabilities": 0.0, "netDebt": -1.0}], file)
+    return write
+
+@pytest.fixture
+def unlimited(monkeypatch):
+    # fetches in tests do not wait on the API limit
+    async def acquire(self):
+        pass
+    monkeypatch.setattr(RateLimiter, "acquire", acquire)
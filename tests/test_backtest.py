@@ -0,0 +1,40 @@
+from datetime import datetime
+import numpy as np
+from screenerV3.backtest import Backtest
+from screenerV3.fundamentals import SCHEMA
+from screenerV3.screens import ScreenDefinition
+from screenerV3.snapshots import SnapshotStore
+from screenerV3.table import Table
+
+
+def snapshot(prices: dict, assets: dict, profile: dict = None) -> Table:
+    # `prices` from the historical endpoint, `profile` prices archived for tickers that did not get that far
+    profile = profile or {}
+    return Table.from_dict({k: {"name": k, "market_cap": 10 * (v or profile.get(k) or 1), "price": v, "share_price": profile.get(k),
+                                "total_current_assets": assets.get(k),
+                                "total_liabilities": 0.0 if k in assets else None, "net_debt": 0.0 if k in assets else None}
+                            for k, v in {**profile, **prices}.items()}, SCHEMA)
+
+def screen() -> ScreenDefinition:
+    return ScreenDefinition("test", require=["ncav_ratio < 2"], columns={"NCAV Ratio": "ncav_ratio"}, sort=["NCAV Ratio"])
+
+def test_backtest_over_snapshots(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    # EEE passes, then leaves the universe
+    store.append(snapshot({"AAA": 10.0, "BBB": 20.0, "CCC": 5.0, "EEE": 1.0}, {"AAA": 100.0, "BBB": 100.0, "EEE": 100.0}), "test", datetime(2024, 1, 5, 9))
+    # a later run of another screen the same day adds prices only
+    store.append(snapshot({"DDD": 1.0, "FFF": None}, {}), "other", datetime(2024, 1, 5, 18))
+    # BBB and FFF were dropped before the historical prices: BBB's profile price is archived, FFF only has a market cap
+    store.append(snapshot({"AAA": 15.0, "DDD": 2.0, "FFF": None}, {"AAA": 1000.0}, profile={"BBB": 10.0}), "test", datetime(2024, 4, 5))
+    store.append(snapshot({}, {"AAA": 1000.0}, profile={"AAA": 7.5}), "test", datetime(2024, 7, 5))
+    backtest = Backtest(store)
+    assert(backtest.dates == ["2024-01-05", "2024-04-05", "2024-07-05"] and len(backtest.table.alive) == 11)
+    returns = dict(zip(zip(backtest.date.tolist(), backtest.ticker.tolist()), backtest.forward_returns().tolist()))
+    assert(returns[(0, "AAA")] == 0.5 and returns[(0, "BBB")] == -0.5 and np.isnan(returns[(0, "CCC")]) and returns[(1, "AAA")] == -0.5)
+    # no return from market caps
+    assert(returns[(0, "DDD")] == 1.0 and np.isnan(returns[(0, "FFF")]) and np.isnan(backtest.forward_returns(horizon=2)[backtest.date == 0]).sum() == 5)
+    results = backtest.run(screen())
+    # ncav ratio (market cap / current assets): EEE 0.1, AAA 1.0 then 0.15, BBB 2.0
+    assert(results[0] == {"date": "2024-01-05", "passed": 2, "covered": 1, "return": 0.5, "benchmark": 0.0, "tickers": ["EEE", "AAA"]})
+    assert(results[1]["tickers"] == ["AAA"] and results[1]["covered"] == 1 and results[1]["return"] == -0.5)
+    assert(results[2]["covered"] == 0 and results[2]["return"] is None)
@@ -0,0 +1,57 @@
+import json
+import zipfile
+from datetime import datetime
+from screenerV3.companyfacts import CompanyFacts, calendar_period
+
+
+def fact(end: str, val: float, filed: str, start: str = None) -> dict:
+    ret = {"end": end, "val": val, "accn": "0000", "fy": int(end[:4]), "fp": "FY", "form": "10-K", "filed": filed}
+    return {**ret, "start": start} if start else ret
+
+def company(cik: int, facts: dict) -> str:
+    return json.dumps({"cik": cik, "entityName": "X", "facts": {"us-gaap": {k: {"label": k, "units": {"USD": v}} for k, v in facts.items()},
+                                                                "dei": {"EntityCommonStockSharesOutstanding": {"units": {"shares": [fact("2024-01-31", 5, "2024-02-01")]}}}}})
+
+def archive(path) -> str:
+    with zipfile.ZipFile(path, 'w') as file:
+        file.writestr("CIK0000000001.json", company(1, {
+            "AssetsCurrent": [fact("2023-12-31", 100, "2024-02-10"), fact("2023-12-31", 110, "2025-02-10")],
+            "Liabilities": [fact("2023-12-31", 40, "2024-02-10")],
+            "LongTermDebtNoncurrent": [fact("2023-12-31", 15, "2024-02-10")],
+            "CashAndCashEquivalentsAtCarryingValue": [fact("2023-12-31", 25, "2024-02-10")] + [fact(f"{y}-12-31", 20, "2024-02-10") for y in range(2019, 2023)],
+            "NetCashProvidedByUsedInOperatingActivities": [fact("2023-12-31", 80, "2024-02-10", "2023-01-01"),
+                                                           fact("2023-06-30", 30, "2023-08-10", "2023-01-01")]
+                                                          + [fact(f"{y}-12-31", 60, "2024-02-10", f"{y}-01-01") for y in range(2019, 2023)],
+            "PaymentsToAcquirePropertyPlantAndEquipment": [fact("2023-12-31", 20, "2024-02-10", "2023-01-01")]
+                                                          + [fact(f"{y}-12-31", 10, "2024-02-10", f"{y}-01-01") for y in range(2019, 2023)],
+            "Revenues": [fact("2023-12-31", 1000, "2024-02-10", "2023-01-01")],
+        }))
+        file.writestr("CIK0000000002.json", company(2, {"AssetsCurrent": [fact("2024-03-30", 50, "2024-05-01")]}))
+        file.writestr("README.txt", "not a company")
+    return str(path)
+
+def test_calendar_periods():
+    assert(calendar_period(None, "2023-12-29") == "CY2023Q4I" and calendar_period(None, "2024-01-02") == "CY2023Q4I")
+    assert(calendar_period("2022-10-01", "2023-09-30") == "CY2023" and calendar_period("2023-04-01", "2023-06-30") == "CY2023Q2")
+    assert(calendar_period("2023-01-01", "2023-06-30") is None)
+
+def test_ingest_archive_and_read_statements(tmp_path, monkeypatch):
+    monkeypatch.setattr("screenerV3.statements._today", lambda: datetime(2024, 3, 1))
+    (tmp_path / "cik.txt").write_text("aaa: 1\n")
+    (tmp_path / "company_tickers.json").write_text(json.dumps({"0": {"cik_str": 2, "ticker": "BRK-B", "title": "B"}}))
+    root = str(tmp_path / "facts")
+    source = CompanyFacts(root, str(tmp_path / "cik.txt"), str(tmp_path / "company_tickers.json"))
+    # Revenues, the half year and the dei share count are not kept
+    assert(source.ingest(archive(tmp_path / "companyfacts.zip")) == 20)
+    assert(source.periods("AssetsCurrent") == ["CY2024Q1I", "CY2023Q4I"])
+    bs = source.statements("balance_sheet", ["AAA", "BRK-B", "CCC"])
+    assert(set(bs) == {"AAA"} and bs["AAA"][0].total_current_assets == 110.0 and bs["AAA"][0].net_debt == 15 - 25)
+    cf = source.statements("cashflow", ["AAA"])["AAA"]
+    assert([(i.date, i.free_cash_flow) for i in cf] == [("CY2023", 60.0), ("CY2022", 50.0), ("CY2021", 50.0), ("CY2020", 50.0), ("CY2019", 50.0)])
+    # restated values filed later are not seen as of an earlier date
+    before = CompanyFacts(root, str(tmp_path / "cik.txt"), str(tmp_path / "company_tickers.json"), as_of="2024-12-31")
+    assert(before.frame("AssetsCurrent", "CY2023Q4I") == {1: 100.0} and before.frame("AssetsCurrent", "CY2024Q1I") == {2: 50.0})
+    # staleness is as of that date too: by the end of 2024 both balance sheets are overdue, early in 2024 AAA's is current
+    assert(before.statements("balance_sheet", ["AAA", "BRK-B"]) == {})
+    early = CompanyFacts(root, str(tmp_path / "cik.txt"), str(tmp_path / "company_tickers.json"), as_of="2024-03-01")
+    assert([i.total_current_assets for i in early.statements("balance_sheet", ["AAA"])["AAA"]] == [100.0])
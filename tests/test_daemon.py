@@ -0,0 +1,38 @@
+import asyncio
+from screenerV3.daemon import TrickleRefresher
+from screenerV3.snapshots import SnapshotStore
+from screenerV3.stages import RunStore, screen_stage
+from screenerV3.utilities import Handler
+
+
+def refresher(tmp_path, definition, **kwargs) -> TrickleRefresher:
+    return TrickleRefresher(definition, ["AAA", "BBB", "CCC"], Handler("local"), RunStore("test", root=str(tmp_path / "runs")), "universe",
+                            rate=1e6, batch=2, snapshots=SnapshotStore(str(tmp_path / "snapshots")), **kwargs)
+
+def test_trickle_refresh_resumes(tmp_path, monkeypatch, unlimited, local_fmp, ncav_screen):
+    monkeypatch.chdir(tmp_path)
+    local_fmp({"AAA": 100.0, "BBB": 100.0, "CCC": 10.0})
+    assert(asyncio.run(refresher(tmp_path, ncav_screen).run(max_batches=1)) == 1)
+    # a new daemon resumes with the ticker not refreshed yet, and archives the completed pass
+    daemon = refresher(tmp_path, ncav_screen)
+    assert(daemon.due() == ["CCC"] and asyncio.run(daemon.run(max_batches=1)) == 1)
+    assert(len(SnapshotStore(str(tmp_path / "snapshots")).dates()) == 1)
+    store = RunStore("test", root=str(tmp_path / "runs"))
+    assert(screen_stage(ncav_screen, store).tickers() == ["AAA", "BBB"])
+    # the stalest tickers come first and keep only their last values
+    local_fmp({"AAA": 10.0})
+    assert(asyncio.run(refresher(tmp_path, ncav_screen, min_age=0).run(max_batches=1)) == 1)
+    assert(screen_stage(ncav_screen, store).tickers() == ["BBB"])
+
+def test_trickle_refresh_stops_when_idle(tmp_path, monkeypatch, unlimited, local_fmp, ncav_screen):
+    monkeypatch.chdir(tmp_path)
+    local_fmp({"AAA": 100.0, "BBB": 100.0, "CCC": 10.0})
+    daemon = refresher(tmp_path, ncav_screen)
+
+    async def run():
+        task = asyncio.create_task(daemon.run())
+        await asyncio.sleep(0.5)
+        # nothing is due any more, so it waits until stopped
+        daemon.stop()
+        return await asyncio.wait_for(task, timeout=5)
+    assert(asyncio.run(run()) == 2 and daemon.due() == [])
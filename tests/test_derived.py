@@ -0,0 +1,70 @@
+import asyncio
+import numpy as np
+from screenerV3.derived import CASHFLOW_QUARTERS, derive, fiscal_years, trailing_fcf
+from screenerV3.fundamentals import FundamentalsFetcher, cashflow_fields, empty_fundamentals
+from screenerV3.records import CashFlow, KeyMetricsTTM
+from screenerV3.screens import ScreenDefinition
+
+
+def quarters(periods: list[str]) -> list[CashFlow]:
+    return [CashFlow(period=p, free_cash_flow=float(i + 1), cash_at_end_of_period=100.0 - i, common_stock_repurchased=-1.0) for i, p in enumerate(periods)]
+
+def test_fiscal_years_skip_the_current_year():
+    cf = quarters(["Q2", "Q1", "Q4", "Q3", "Q2", "Q1", "Q4", "Q3"])
+    years = fiscal_years(cf, truncated=True)
+    # the current year (Q2, Q1) and the cut-off oldest year are left out
+    assert([[i.period for i in year] for year in years] == [["Q4", "Q3", "Q2", "Q1"]])
+    assert(trailing_fcf(cf) == 1 + 2 + 3 + 4)
+    # semiannual filers
+    halves = quarters(["Q2", "Q4", "Q2", "Q4", "Q2"])
+    assert(len(fiscal_years(halves)) == 2 and trailing_fcf(halves) == 1 + 2)
+    fields = cashflow_fields(halves)
+    assert(fields["fcf_total"] == (2 + 3) + (4 + 5) and fields["fcf_years"] == 2 and fields["cash_at_end_of_period"] == 99.0)
+    assert(cashflow_fields(quarters(["Q3", "Q2"])) is None)
+
+def test_quarterly_cash_flows_sum_to_the_annual_figures():
+    # five fiscal years as the annual endpoint reports them, and the same years from the quarterly endpoint
+    fcf, buybacks, cash = [40.0, -8.0, 24.0, 16.0, 12.0], [-4.0, 0.0, -8.0, -4.0, 0.0], [90.0, 80.0, 70.0, 60.0, 50.0]
+    annual = [CashFlow(period="FY", free_cash_flow=f, common_stock_repurchased=b, cash_at_end_of_period=c) for f, b, c in zip(fcf, buybacks, cash)]
+    # the current year's three quarters, the five years, and the Q4 of a sixth year cut off at the request limit
+    quarterly = [CashFlow(period=p, free_cash_flow=5.0, common_stock_repurchased=0.0, cash_at_end_of_period=95.0) for p in ("Q3", "Q2", "Q1")]
+    for f, b, c in zip(fcf, buybacks, cash):
+        quarterly += [CashFlow(period=p, free_cash_flow=f / 4, common_stock_repurchased=b / 4, cash_at_end_of_period=c if p == "Q4" else c - 1)
+                      for p in ("Q4", "Q3", "Q2", "Q1")]
+    quarterly.append(CashFlow(period="Q4", free_cash_flow=1000.0, common_stock_repurchased=0.0, cash_at_end_of_period=10.0))
+    assert(len(quarterly) == CASHFLOW_QUARTERS)
+    a, q = cashflow_fields(annual), cashflow_fields(quarterly)
+    keys = ("fcf_total", "fcf_years", "negative_fcf_years", "buyback_total", "cash_at_end_of_period")
+    assert([a[k] for k in keys] == [q[k] for k in keys] == [84.0, 5, 1, -16.0, 90.0])
+    # the quarterly history gives the real trailing twelve months instead of the last fiscal year
+    assert(a["trailing_fcf"] == 40.0 and q["trailing_fcf"] == 5.0 * 3 + 10.0)
+    # so the 5-year average FCF only moves by the TTM term
+    screen = ScreenDefinition("test", columns={"AFCF": "afcf"})
+    afcf = []
+    for fields in (a, q):
+        table = empty_fundamentals(["AAA"])
+        table.add("AAA", {"fcf_total": fields["fcf_total"], "fcf_per_share_ttm": 2.0, "outstanding_shares": 10.0})
+        afcf.append(screen.evaluate(table)["AFCF"][0])
+    assert(afcf == [(20.0 + 84.0) / 5] * 2)
+
+class Handler:
+    def __init__(self) -> None:
+        self.calls = []
+
+    async def get_key_metrics(self, session, ticker):
+        self.calls.append(ticker)
+        return KeyMetricsTTM(enterprise_value=1.0, fcf_per_share=2.0, tangible_asset_value=3.0, market_cap=4.0)
+
+def test_key_metrics_are_derived_unless_an_input_is_missing(unlimited):
+    table = empty_fundamentals(["AAA", "BBB"])
+    for k in ("AAA", "BBB"):
+        table.add(k, {"market_cap": 100.0, "net_debt": -10.0, "total_assets": 80.0, "total_liabilities": 30.0,
+                      "goodwill_and_intangible_assets": 5.0, "trailing_fcf": 20.0, "outstanding_shares": 10.0 if k == "AAA" else 0.0})
+    derived = derive(table, table.index(["AAA"]))
+    assert(derived["enterprise_value"][0] == 90.0 and derived["tangible_asset_value"][0] == 45.0 and derived["fcf_per_share_ttm"][0] == 2.0)
+    handler = Handler()
+    asyncio.run(FundamentalsFetcher(handler).fetch_key_metrics(None, table))
+    # BBB has no share count, so its FCF per share comes from the endpoint
+    assert(handler.calls == ["BBB"])
+    assert(table.get("AAA", "enterprise_value") == 90.0 and table.get("BBB", "enterprise_value") == 1.0)
+    assert(np.isfinite(table.numeric("market_cap_ttm")).all())
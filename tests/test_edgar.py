@@ -0,0 +1,74 @@
+import json
+from datetime import datetime
+from screenerV3.edgar import EdgarFrames
+from screenerV3.fundamentals import balance_sheet_fields, cashflow_fields
+
+
+def save_frame(root, concept: str, period: str, values: dict) -> None:
+    path = root / concept
+    path.mkdir(parents=True, exist_ok=True)
+    data = [{"accn": "0000", "cik": cik, "entityName": "X", "loc": "US-CA", "end": "2023-12-31", "val": val} for cik, val in values.items()]
+    (path / f"{period}.json").write_text(json.dumps({"tag": concept, "uom": "USD", "ccp": period, "pts": len(data), "data": data}))
+
+def frames(tmp_path) -> EdgarFrames:
+    root = tmp_path / "frames"
+    (tmp_path / "cik.txt").write_text("aaa: 1\nbrk-b: 2\nccc: 3\nddd: 4\n")
+    save_frame(root, "AssetsCurrent", "CY2024Q1I", {1: 120})
+    save_frame(root, "Liabilities", "CY2024Q1I", {1: 40})
+    save_frame(root, "LiabilitiesAndStockholdersEquity", "CY2023Q4I", {2: 500})
+    save_frame(root, "StockholdersEquity", "CY2023Q4I", {2: 450})
+    save_frame(root, "CashAndCashEquivalentsAtCarryingValue", "CY2024Q1I", {1: 30})
+    save_frame(root, "CashAndCashEquivalentsAtCarryingValue", "CY2023Q4I", {1: 25, 2: 10})
+    save_frame(root, "CashAndCashEquivalentsAtCarryingValue", "CY2022Q4I", {1: 20})
+    save_frame(root, "LongTermDebt", "CY2024Q1I", {1: 10})
+    # BRK-B splits its debt in long-term and current; DDD reports no debt
+    save_frame(root, "LongTermDebtNoncurrent", "CY2023Q4I", {2: 30})
+    save_frame(root, "LongTermDebtCurrent", "CY2023Q4I", {2: 4})
+    save_frame(root, "DebtCurrent", "CY2023Q4I", {2: 5})
+    save_frame(root, "AssetsCurrent", "CY2023Q4I", {1: 100, 2: 50, 4: 60})
+    save_frame(root, "Liabilities", "CY2023Q4I", {4: 10})
+    save_frame(root, "CashAndCashEquivalentsAtCarryingValue", "CY2018Q4I", {3: 5})
+    for year, ocf in ((2019, 40), (2020, 45), (2021, 50), (2022, 60), (2023, 80)):
+        # BRK-B started filing in 2020, CCC stopped in 2019
+        save_frame(root, "NetCashProvidedByUsedInOperatingActivities", f"CY{year}", {1: ocf, 2: 5, 4: 9} if year > 2019 else {1: ocf, 3: 1, 4: 9})
+        # DDD did not report its 2021 capital expenditure
+        save_frame(root, "PaymentsToAcquirePropertyPlantAndEquipment", f"CY{year}", {1: 20, 2: 1, 3: 1} if year == 2021 else {1: 20, 2: 1, 3: 1, 4: 2})
+        save_frame(root, "PaymentsForRepurchaseOfCommonStock", f"CY{year}", {1: 3})
+        save_frame(root, "CashAndCashEquivalentsAtCarryingValue", f"CY{year}Q4I", {1: 25 if year == 2023 else 20, 2: 10, 3: 5, 4: 7})
+    for year in range(2015, 2019):
+        save_frame(root, "NetCashProvidedByUsedInOperatingActivities", f"CY{year}", {3: 1})
+    return EdgarFrames(str(root), str(tmp_path / "cik.txt"))
+
+def today(monkeypatch, date: str) -> None:
+    monkeypatch.setattr("screenerV3.statements._today", lambda: datetime.strptime(date, "%Y-%m-%d"))
+
+def test_frames_become_statements(tmp_path, monkeypatch):
+    today(monkeypatch, "2024-05-15")
+    source = frames(tmp_path)
+    bs = source.statements("balance_sheet", ["AAA", "BRK-B", "CCC", "DDD", "NOCIK"])
+    # CCC has a CIK but no frames, DDD no debt; the latest quarter is used, liabilities fall back to total less equity
+    assert(set(bs) == {"AAA", "BRK-B"})
+    assert(balance_sheet_fields(bs["AAA"]) == {"total_current_assets": 120.0, "total_assets": None, "total_liabilities": 40.0,
+                                               "net_debt": -20.0, "goodwill_and_intangible_assets": 0.0})
+    # the current portion of BRK-B's long-term debt is in its current debt
+    assert(bs["BRK-B"][0].total_liabilities == 50.0 and bs["BRK-B"][0].net_debt == 30 + 5 - 10)
+    cf = source.statements("cashflow", ["AAA", "BRK-B", "CCC", "DDD"])
+    # BRK-B has 4 years, CCC's 5 years ended in 2019, DDD misses a year's capital expenditure
+    assert(list(cf) == ["AAA"])
+    fields = cashflow_fields(cf["AAA"])
+    assert(fields["fcf_total"] == 60 + 40 + 30 + 25 + 20 and fields["fcf_years"] == 5 and fields["trailing_fcf"] == 60)
+    assert(fields["buyback_total"] == -15 and fields["cash_at_end_of_period"] == 25)
+    assert(source.statements("historical", ["AAA"]) == {})
+
+def test_stale_frames_are_left_to_the_endpoint(tmp_path, monkeypatch):
+    source = frames(tmp_path)
+    # the Q2 2024 balance sheets are due: BRK-B's latest is Q4 2023
+    today(monkeypatch, "2024-07-15")
+    assert(list(source.statements("balance_sheet", ["AAA", "BRK-B"])) == ["AAA"])
+    # the 2024 annual figures are due
+    today(monkeypatch, "2025-06-01")
+    assert(source.statements("cashflow", ["AAA"]) == {} and source.statements("balance_sheet", ["AAA"]) == {})
+    # a missing year splits the window
+    today(monkeypatch, "2024-05-15")
+    (tmp_path / "frames" / "NetCashProvidedByUsedInOperatingActivities" / "CY2021.json").unlink()
+    assert(EdgarFrames(str(tmp_path / "frames"), str(tmp_path / "cik.txt")).statements("cashflow", ["AAA"]) == {})
@@ -0,0 +1,47 @@
+import asyncio
+from time import monotonic
+from screenerV3.fundamentals import RateLimiter
+from screenerV3.metrics import RunMetrics
+
+
+def test_rate_limiter_waits_without_blocking_the_loop():
+    metrics = RunMetrics()
+    # 2 back to back, then one every 10 ms
+    limiter = RateLimiter(requests=22, window=0.2, burst=2, metrics=metrics)
+    ticks = []
+
+    async def requests():
+        for _ in range(12):
+            await limiter.acquire()
+
+    async def other():
+        while len(ticks) < 5:
+            ticks.append(monotonic())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        start = monotonic()
+        await asyncio.gather(requests(), other())
+        return monotonic() - start
+    elapsed = asyncio.run(run())
+    assert(elapsed >= 0.09 and metrics.rate_limit["pauses"] == 10)
+    # the other task kept running while the limiter waited
+    assert(len(ticks) == 5 and ticks[-1] - ticks[0] < 0.09)
+
+def test_rate_limiter_is_shared_by_concurrent_tasks():
+    limiter = RateLimiter(requests=21, window=0.2, burst=1)
+    sent = []
+
+    async def worker(name):
+        for _ in range(5):
+            await limiter.acquire()
+            sent.append((name, monotonic()))
+
+    async def run():
+        await asyncio.gather(*[worker(i) for i in range(4)])
+    asyncio.run(run())
+    times = sorted(t for _, t in sent)
+    # 20 requests at 100 per second however many tasks send them
+    assert(len(times) == 20 and times[-1] - times[0] >= 0.18)
+    # a limiter outlives its event loop
+    asyncio.run(run())
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from screenerV3.history import RunHistory, SeenTickers, diff_results
+from screenerV3.screens import ScreenDefinition
+from screenerV3.stages import publish_stage
+from screenerV3.table import Table, FLOAT, OBJECT
+
+SCHEMA = {"Name": OBJECT, "NCAV Ratio": FLOAT}
+
+
+def results(rows: dict) -> Table:
+    return Table.from_dict({k: {"Name": k.lower(), "NCAV Ratio": v} for k, v in rows.items()}, SCHEMA)
+
+def test_history_diff(tmp_path):
+    history = RunHistory("test", str(tmp_path))
+    history.append(results({"AAA": 1.0, "BBB": 0.5, "CCC": 0.8}), "2024-05-06")
+    history.append(results({"BBB": 0.5, "AAA": 1.2, "DDD": None}), "2024-05-13")
+    assert(history.dates() == ["2024-05-06", "2024-05-13"])
+    res = history.diff()
+    assert(res["old"] == "2024-05-06" and res["new"] == "2024-05-13")
+    assert(res["entered"] == ["DDD"] and res["left"] == ["CCC"] and res["changed"] == {"AAA": {"NCAV Ratio": [1.0, 1.2]}})
+    # the first run has nothing to compare with
+    assert(history.diff(new="2024-05-06")["entered"] == ["AAA", "BBB", "CCC"])
+    assert(diff_results(results({"AAA": None}), results({"AAA": 1.0}))["changed"] == {"AAA": {"NCAV Ratio": [None, 1.0]}})
+
+def test_history_previously_seen(tmp_path):
+    history = RunHistory("test", str(tmp_path))
+    assert(history.dates() == [] and history.get_all_previously_seen_tickers() == [])
+    old = (datetime.now() - timedelta(days=400)).strftime("%Y-%m-%d")
+    history.append(results({"AAA": 1.0, "BBB": 0.5}), old)
+    history.append(results({"BBB": 0.5}))
+    assert(history.seen()["AAA"] == old and sorted(history.get_all_previously_seen_tickers()) == ["BBB"])
+    # an older run stored later does not move a ticker's last date back
+    history.append(results({"BBB": 0.5}), old)
+    assert(history.get_all_previously_seen_tickers() == ["BBB"])
+
+class TabsSheet:
+    def __init__(self, tickers: list[str]) -> None:
+        self.tickers = tickers
+        self.rows = []
+
+    def get_all_previously_seen_tickers(self) -> list[str]:
+        return list(self.tickers)
+
+    def create_module_tab(self, header: list[str]) -> None:
+        pass
+
+    def add_row_data(self, data: Table, columns: list[str]) -> None:
+        self.rows += data.tickers()
+
+def test_seen_by_history_and_sheet(tmp_path):
+    history = RunHistory("test", str(tmp_path))
+    history.append(results({"BBB": 0.5, "CCC": 0.8}))
+    # tabs published before the history existed still count
+    sheet = TabsSheet(["AAA", "BBB"])
+    assert(SeenTickers(history, sheet).get_all_previously_seen_tickers() == ["BBB", "CCC", "AAA"])
+    assert(SeenTickers(history, None).get_all_previously_seen_tickers() == ["BBB", "CCC"])
+
+def test_history_only_stores_what_the_sheet_got(tmp_path):
+    definition = ScreenDefinition("test", columns={"NCAV Ratio": "ncav_ratio"})
+    history = RunHistory("test", str(tmp_path))
+    publish_stage(definition, results({"AAA": 1.0}), xlsx_path=str(tmp_path / "results.xlsx"), history=history)
+    assert(history.dates() == [] and history.get_all_previously_seen_tickers() == [])
+    sheet = TabsSheet([])
+    publish_stage(definition, results({"AAA": 1.0}), sheet_client=sheet, history=history)
+    assert(sheet.rows == ["AAA"] and history.get_all_previously_seen_tickers() == ["AAA"])
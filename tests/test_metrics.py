@@ -0,0 +1,37 @@
+import asyncio
+import json
+from screenerV3.metrics import RunMetrics, endpoint_name
+from screenerV3.stages import RunStore, fetch_stage
+from screenerV3.utilities import Handler
+
+
+def test_endpoint_name():
+    assert(endpoint_name("https://financialmodelingprep.com/api/v3/profile/AAPL,MSFT?apikey=x") == "profile")
+    assert(endpoint_name("https://financialmodelingprep.com/api/v3/balance-sheet-statement/BRK-B?period=quarter") == "balance-sheet-statement")
+    assert(endpoint_name("https://financialmodelingprep.com/api/v4/shares_float/all?apikey=x") == "shares_float/all")
+    assert(endpoint_name("https://financialmodelingprep.com/api/v4/key-metrics-ttm-bulk?apikey=x") == "key-metrics-ttm-bulk")
+
+def test_fetch_writes_metrics(tmp_path, monkeypatch, unlimited, local_fmp, ncav_screen):
+    monkeypatch.chdir(tmp_path)
+    local_fmp({"AAA": 100.0, "BBB": 100.0, "CCC": 10.0})
+    store = RunStore("test", root=str(tmp_path / "runs"))
+    handler = Handler("local")
+    # DDD has no saved responses: its profile is missing from the batch
+    asyncio.run(fetch_stage(ncav_screen, ["AAA", "BBB", "CCC", "DDD"], handler, store, "universe", streaming=False))
+    with open(store.metrics_path, 'r') as file:
+        report = json.load(file)
+    assert(report["endpoints"]["profile"]["requests"] == 1 and report["endpoints"]["balance-sheet-statement"]["requests"] == 3)
+    assert(report["endpoints"]["profile"]["latency"]["+Inf"] == 1 and report["rate_limit"]["pauses"] == 0)
+    assert([(i["phase"], i["entered"], i["passed"]) for i in report["phases"]] == [("profile", 4, 3), ("balance_sheet", 3, 2)])
+    with open(store.metrics_path.replace(".json", ".prom"), 'r') as file:
+        prom = file.read()
+    assert('screener_requests_total{endpoint="balance-sheet-statement"} 3' in prom and "# TYPE screener_request_seconds histogram" in prom)
+
+def test_metrics_errors_by_class():
+    metrics = RunMetrics()
+    metrics.request("https://x/api/v3/quote/A", 0.2, 10, 10)
+    metrics.request("https://x/api/v3/quote/B", 3.0, error="HTTP 429")
+    metrics.request("https://x/api/v3/quote/C", 0.01, error="TimeoutError")
+    report = metrics.report()["endpoints"]["quote"]
+    assert(report["errors"] == {"HTTP 429": 1, "TimeoutError": 1} and report["latency"]["0.05"] == 1 and report["latency"]["0.25"] == 2)
+    assert('screener_errors_total{endpoint="quote",error="HTTP 429"} 1' in metrics.prometheus())
@@ -0,0 +1,35 @@
+import asyncio
+from screenerV3.pipeline import Pipeline
+from screenerV3.planner import Phase, Step
+from screenerV3.table import Table
+
+
+def universe(n: int) -> Table:
+    table = Table()
+    for i in range(n):
+        table.add(f"T{i}", {"value": float(i)})
+    return table
+
+def test_stages_overlap_and_filter():
+    events = []
+
+    def phase(name):
+        async def batch(session, table, tickers):
+            events.append((name, tickers[0]))
+            await asyncio.sleep(0)
+        return Phase(name, None, batch=batch)
+
+    def drop_odd(table, tickers=None):
+        for k in tickers:
+            if int(k[1:]) % 2:
+                table.remove(k)
+
+    passed = []
+    pipeline = Pipeline([phase("a"), phase("b")], [Step("even", drop_odd, requires=("a",))], lambda name: 0,
+                        batch_size=2, queue_size=1, on_pass=lambda table, tickers: passed.extend(tickers))
+    table = universe(20)
+    counters = asyncio.run(pipeline.run(None, table))
+    # stage b starts before stage a has seen the whole universe
+    assert(events.index(("b", "T0")) < events.index(("a", "T18")))
+    assert(passed == [f"T{i}" for i in range(0, 20, 2)] and len(table) == 10)
+    assert(counters["a"].entered == 20 and counters["a"].removed == 10 and counters["b"].entered == 10)
@@ -0,0 +1,37 @@
+import asyncio
+from screenerV3.planner import Phase, PhasePlanner, Step
+from screenerV3.table import Table
+
+
+async def noop(session, table):
+    pass
+
+def test_plan_keeps_declared_order_without_stats(tmp_path):
+    planner = PhasePlanner("test", "universe", stats_path=str(tmp_path / "stats.json"))
+    phases = [Phase("profile", noop), Phase("a", noop, requires=("profile",)), Phase("b", noop, requires=("profile",))]
+    assert([p.name for p in planner.plan(phases)] == ["profile", "a", "b"])
+
+def test_plan_prefers_selective_phase(tmp_path):
+    planner = PhasePlanner("test", "universe", stats_path=str(tmp_path / "stats.json"))
+    planner.record("a", entered=100, passed=90, calls=100)
+    planner.record("b", entered=100, passed=10, calls=100)
+    phases = [Phase("profile", noop), Phase("a", noop, requires=("profile",)), Phase("b", noop, requires=("profile",))]
+    assert([p.name for p in planner.plan(phases)] == ["profile", "b", "a"])
+
+def test_plan_respects_dependencies(tmp_path):
+    planner = PhasePlanner("test", "universe", stats_path=str(tmp_path / "stats.json"))
+    planner.record("a", entered=100, passed=90, calls=100)
+    planner.record("b", entered=100, passed=10, calls=100)
+    phases = [Phase("a", noop), Phase("b", noop, requires=("a",))]
+    assert([p.name for p in planner.plan(phases)] == ["a", "b"])
+
+def test_execute_records_and_runs_steps(tmp_path):
+    path = tmp_path / "stats.json"
+    planner = PhasePlanner("test", "universe", stats_path=str(path))
+    table = Table.from_dict({"AAA": {"x": 1}, "BBB": {"x": 2}})
+    async def drop_bbb(session, table):
+        table.remove("BBB")
+    ran = []
+    asyncio.run(planner.execute([Phase("a", drop_bbb)], [Step("s", lambda t: ran.append(len(t)), requires=("a",))], None, table, lambda: 0))
+    assert(ran == [1])
+    assert(PhasePlanner("test", "universe", stats_path=str(path)).pass_rate(Phase("a", noop)) == 0.5)
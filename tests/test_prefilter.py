@@ -0,0 +1,68 @@
+import numpy as np
+from screenerV3.fundamentals import empty_fundamentals
+from screenerV3.prefilter import Prefilter
+from screenerV3.records import KeyMetricsTTM, Quote
+from screenerV3.screens import load_screen
+
+
+def profiled(tickers: list[str]):
+    table = empty_fundamentals(tickers)
+    for k in tickers:
+        table.add(k, {"name": k, "country": "US", "exchange": "X", "industry": "Software", "market_cap": 100.0, "last_div": 1.0})
+    return table
+
+def test_drops_only_provable_failures():
+    prefilter = Prefilter(load_screen("payback"))
+    tickers = ["CASH", "DEBT", "LIAB", "NONE"]
+    table = profiled(tickers)
+    quotes = {k: Quote(symbol=k, price=10.0, market_cap=100.0, shares_outstanding=10.0) for k in tickers}
+    metrics = {
+        "CASH": KeyMetricsTTM(symbol="CASH", market_cap=100.0, enterprise_value=80.0, net_current_asset_value=50.0),
+        # net debt ~ EV - market cap = 400
+        "DEBT": KeyMetricsTTM(symbol="DEBT", market_cap=100.0, enterprise_value=500.0, net_current_asset_value=50.0),
+        # NCAV well below zero
+        "LIAB": KeyMetricsTTM(symbol="LIAB", market_cap=100.0, enterprise_value=80.0, net_current_asset_value=-300.0),
+    }
+    rows = table.index(tickers)
+    bounds = prefilter.bounds(tickers, quotes, metrics, table.numeric("market_cap", rows))
+    assert(prefilter.possible(table, rows, bounds).tolist() == [True, False, False, True])
+
+def test_never_drops_a_passing_ticker():
+    definition = load_screen("multi_metric")
+    prefilter = Prefilter(definition, tolerance=0.25)
+    rng = np.random.default_rng(7)
+    n = 400
+    tickers = [f"T{i}" for i in range(n)]
+    table = profiled(tickers)
+    exact = {
+        "market_cap": rng.choice([50.0, 100.0, 400.0], n),
+        "total_current_assets": rng.uniform(0, 300, n),
+        "total_liabilities": rng.uniform(0, 300, n),
+        "net_debt": rng.uniform(-100, 50, n),
+        "fcf_total": rng.uniform(-50, 200, n),
+        "negative_fcf_years": rng.integers(0, 4, n).astype(float),
+        "cash_at_end_of_period": rng.uniform(0, 100, n),
+        "fcf_per_share_ttm": rng.uniform(-1, 5, n),
+        "tangible_asset_value": rng.uniform(-50, 400, n),
+        "market_cap_ttm": rng.uniform(50, 400, n),
+        "price": rng.uniform(1, 20, n),
+        "outstanding_shares": rng.uniform(1, 50, n),
+    }
+    exact["price_max_5y"] = exact["price"] * rng.uniform(1, 3, n)
+    exact["enterprise_value"] = exact["market_cap_ttm"] + exact["net_debt"]
+    for name, values in exact.items():
+        table.assign(name, values)
+    passing = definition.mask(table)
+    # bulk values a little off the per-ticker ones, as before any per-ticker call
+    noise = rng.uniform(0.9, 1.1, (3, n))
+    metrics = {k: KeyMetricsTTM(symbol=k, market_cap=exact["market_cap_ttm"][i] * noise[0, i], enterprise_value=exact["enterprise_value"][i],
+                                fcf_per_share=exact["fcf_per_share_ttm"][i], tangible_asset_value=exact["tangible_asset_value"][i] * noise[1, i],
+                                net_current_asset_value=(exact["total_current_assets"][i] - exact["total_liabilities"][i]) * noise[2, i])
+               for i, k in enumerate(tickers)}
+    quotes = {k: Quote(symbol=k, price=exact["price"][i], shares_outstanding=exact["outstanding_shares"][i]) for i, k in enumerate(tickers)}
+    fresh = profiled(tickers)
+    fresh.assign("market_cap", exact["market_cap"])
+    rows = fresh.index(tickers)
+    possible = prefilter.possible(fresh, rows, prefilter.bounds(tickers, quotes, metrics, exact["market_cap"]))
+    assert(not np.any(passing & ~possible))
+    assert(np.any(~possible))
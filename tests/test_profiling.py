@@ -0,0 +1,32 @@
+import asyncio
+import os
+from screenerV3 import profiling
+from screenerV3.stages import RunStore, fetch_stage, screen_stage
+
+
+def test_profiles_stages_and_phases(tmp_path, monkeypatch, unlimited, stub_handler, ncav_screen):
+    monkeypatch.chdir(tmp_path)
+    store = RunStore("test", root=str(tmp_path / "runs"))
+    profiling.start(root=str(tmp_path / "profiles"))
+    try:
+        asyncio.run(fetch_stage(ncav_screen, ["AAA", "BBB", "CCC"], stub_handler(), store, "universe", streaming=False, prefilter=True))
+        screen_stage(ncav_screen, store)
+    finally:
+        path = profiling.finish(debug=False)
+    # the phases run inside the fetch stage, each in its own profile
+    assert(sorted(os.listdir(path)) == ["fetch.prof", "phase.balance_sheet.prof", "phase.prefilter.prof", "phase.profile.prof",
+                                        "screen.prof", "summary.txt"])
+    with open(os.path.join(path, "summary.txt"), 'r') as file:
+        summary = file.read()
+    assert("== fetch: 1 call(s)" in summary and "== screen: 1 call(s)" in summary)
+
+def test_profiling_off():
+    calls = []
+
+    @profiling.profiled("noop")
+    def noop(x):
+        calls.append(x)
+        return x
+    assert(noop(1) == 1 and calls == [1] and profiling.finish() is None)
+    with profiling.section("noop"):
+        pass
@@ -0,0 +1,71 @@
+import asyncio
+from time import monotonic, sleep
+from screenerV3.fundamentals import FundamentalsFetcher, RateLimiter, empty_fundamentals
+from screenerV3.pipeline import Pipeline
+from screenerV3.publisher import SheetPublisher
+from screenerV3.screens import ScreenDefinition
+
+
+class RecordingSheet:
+    def __init__(self) -> None:
+        self.header = None
+        self.appended = []
+        self.final = None
+
+    def create_module_tab(self, header):
+        self.header = header
+
+    def append_row_data(self, rows, module=None, columns=None):
+        self.appended.append([k for k, v in rows])
+
+    def rewrite_row_data(self, data, module=None, columns=None):
+        self.final = data.tickers()
+
+
+def test_publishes_in_batches_then_rewrites_in_order():
+    screen = ScreenDefinition("test", require=["market_cap > 0"], columns={"Market Cap": "market_cap"}, sort=["Market Cap"])
+    table = empty_fundamentals(["AAA", "BBB", "CCC", "DDD"])
+    for k, mcap in zip(table.tickers(), [30.0, 10.0, -1.0, 20.0]):
+        table.add(k, {"market_cap": mcap})
+    sheet = RecordingSheet()
+
+    async def run():
+        publisher = SheetPublisher(screen, sheet, batch_rows=2, interval=0.01)
+        await publisher.start()
+        publisher.passed(table, ["AAA", "BBB"])
+        await asyncio.sleep(0.05)
+        # the first batch is on the sheet before the run has finished
+        assert(sheet.appended == [["BBB", "AAA"]])
+        publisher.passed(table, ["CCC", "DDD"])
+        await publisher.close(screen.evaluate(table))
+
+    asyncio.run(run())
+    assert(sheet.header == ["Ticker", "Market Cap"])
+    assert(sheet.appended == [["BBB", "AAA"], ["DDD"]])
+    assert(sheet.final == ["BBB", "DDD", "AAA"])
+
+def test_publisher_drains_while_the_fetcher_waits_on_the_limit(stub_handler, ncav_screen):
+    class SlowSheet(RecordingSheet):
+        def append_row_data(self, rows, module=None, columns=None):
+            # gspread blocks its worker thread
+            sleep(0.02)
+            super().append_row_data(rows, module, columns)
+            self.times = getattr(self, "times", []) + [monotonic()]
+
+    tickers = [f"T{i:02d}" for i in range(12)]
+    table = empty_fundamentals(tickers)
+    sheet = SlowSheet()
+    # one request every 50 ms: the fetch spends most of its time waiting on the limiter
+    fetcher = FundamentalsFetcher(stub_handler(), limiter=RateLimiter(requests=5, window=0.2, burst=1))
+
+    async def run():
+        publisher = SheetPublisher(ncav_screen, sheet, batch_rows=2, interval=0.01)
+        await publisher.start()
+        pipeline = Pipeline(fetcher.phases(ncav_screen.endpoints), ncav_screen.steps(), lambda name: 0, batch_size=2, on_pass=publisher.passed)
+        await pipeline.run(None, table)
+        end = monotonic()
+        await publisher.close()
+        return end
+    end = asyncio.run(run())
+    # most rows were on the sheet before the fetch was done
+    assert(sum(len(i) for i in sheet.appended) == 12 and len([t for t in sheet.times if t < end]) >= 4)
@@ -0,0 +1,50 @@
+import json
+from screenerV3.records import BalanceSheet, CashFlow, KeyMetricsTTM, PriceHistory, Profile, decode_csv, decode_floats, decode_many, decode_one, decode_statements
+
+
+def encode(payload) -> bytes:
+    return json.dumps(payload).encode()
+
+def test_decode_many_skips_invalid_profiles():
+    raw = encode([
+        {"symbol": "AAA", "companyName": "A Corp", "mktCap": 1000, "country": "US", "exchange": "NYSE", "industry": "Software", "lastDiv": 0.5, "description": "ignored"},
+        {"symbol": "BBB", "companyName": "B Corp", "mktCap": None, "country": "US", "exchange": "NYSE", "industry": "Software"},
+    ])
+    profiles = decode_many(raw, Profile)
+    assert(len(profiles) == 1)
+    assert(profiles[0].symbol == "AAA")
+    assert(profiles[0].market_cap == 1000.0)
+    assert(not hasattr(profiles[0], "description"))
+
+def test_decode_statements_rejects_partial_history():
+    raw = encode([
+        {"date": "2024-12-31", "freeCashFlow": 10, "cashAtEndOfPeriod": 5, "commonStockRepurchased": -1},
+        {"date": "2023-12-31", "freeCashFlow": None, "cashAtEndOfPeriod": 4},
+    ])
+    assert(decode_statements(raw, CashFlow) is None)
+    assert(decode_statements(encode([]), BalanceSheet) is None)
+    assert(decode_statements(None, BalanceSheet) is None)
+
+def test_decode_one_reads_first_entry():
+    raw = encode([{"enterpriseValueTTM": 50, "freeCashFlowPerShareTTM": 1.5, "tangibleAssetValueTTM": 20, "marketCapTTM": 40}])
+    km = decode_one(raw, KeyMetricsTTM)
+    assert(km.enterprise_value == 50.0)
+    assert(km.market_cap == 40.0)
+    assert(decode_one(b"not json", KeyMetricsTTM) is None)
+
+def test_price_history():
+    raw = encode({"symbol": "AAA", "historical": [{"close": 10, "open": 9}, {"close": 12}]})
+    hist = decode_one(raw, PriceHistory)
+    assert(hist.current == 10.0)
+    assert(max(hist.closes) == 12.0)
+
+def test_decode_floats_builds_index():
+    raw = encode([{"symbol": "AAA", "outstandingShares": 100}, {"symbol": "BBB"}])
+    assert(decode_floats(raw) == {"AAA": 100.0})
+
+def test_decode_csv_indexes_bulk_rows():
+    raw = b"symbol,enterpriseValueTTM,freeCashFlowPerShareTTM,tangibleAssetValueTTM,netCurrentAssetValueTTM\nAAA,50,1.5,20,\nBBB,,1,2,3\n"
+    metrics = decode_csv(raw, KeyMetricsTTM)
+    assert(list(metrics) == ["AAA"])
+    assert(metrics["AAA"].enterprise_value == 50.0 and metrics["AAA"].net_current_asset_value is None)
+    assert(decode_csv(b"", KeyMetricsTTM) is None)
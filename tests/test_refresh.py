@@ -0,0 +1,47 @@
+import json
+from screenerV3.records import Listing, SymbolChange, decode_many
+from screenerV3.refresh import build, main, refresh
+
+
+def stock_list() -> bytes:
+    rows = [("AAPL", "NASDAQ", "stock"), ("brk.b", "NYSE", "stock"), ("SPY", "AMEX", "etf"), ("QQQX", "NASDAQ", "stock"),
+            ("OTCX", "PNK", "stock"), ("RY.TO", "TSX", "stock"), ("NEW.TO", "TSX", "stock"), ("7203.T", "JPX", "stock"),
+            ("ABC.XX", "XXX", "stock"), ("ETF.L", "LSE", "etf")]
+    return json.dumps([{"symbol": s, "name": s, "price": 1.0, "exchange": e, "exchangeShortName": e, "type": t} for s, e, t in rows]).encode()
+
+def test_build_from_bulk_lists():
+    listings = decode_many(stock_list(), Listing)
+    built = build(listings, {"AAPL": 320193, "BRK-B": 1067983})
+    # QQQX is not an SEC filer, OTCX is not on a US exchange, .XX is not a known suffix
+    assert(built["USA"] == ["AAPL", "BRK-B"] and built["Canada"] == ["NEW.TO", "RY.TO"] and built["Japan"] == ["7203.T"])
+    assert(built["United Kingdom"] == [] and build(listings)["USA"] == ["AAPL", "BRK-B", "QQQX"])
+
+def symbol_changes() -> bytes:
+    rows = [("2023-01-02", "OLD.TO", "MID.TO"), ("2024-01-02", "MID.TO", "RY.TO"), ("2024-02-01", "GONE", "NEVER")]
+    return json.dumps([{"date": d, "name": o, "oldSymbol": o, "newSymbol": n} for d, o, n in rows]).encode()
+
+def test_refresh_only_drops_and_renames(tmp_path):
+    (tmp_path / "stock_list.json").write_bytes(stock_list())
+    (tmp_path / "symbol_changes.json").write_bytes(symbol_changes())
+    path = tmp_path / "tickers.json"
+    # a curated list: NEW.TO is listed but was never in it
+    path.write_text(json.dumps({"Canada": ["OLD.TO", "RY.TO"], "USA": ["BRK.B", "GONE", "AAPL"], "Japan": ["7203.T"]}))
+    listings, changes = decode_many(stock_list(), Listing), decode_many(symbol_changes(), SymbolChange)
+    before = path.stat().st_mtime_ns
+    # OLD.TO became RY.TO through MID.TO; GONE's new symbol is not listed either
+    assert(refresh(str(path), listings, changes, dry_run=True) == {"Canada": {"removed": [], "renamed": {"OLD.TO": "RY.TO"}},
+                                                                  "USA": {"removed": ["GONE"], "renamed": {}}})
+    assert(path.stat().st_mtime_ns == before)
+    main([str(path), "--stock-list", str(tmp_path / "stock_list.json"), "--symbol-changes", str(tmp_path / "symbol_changes.json")])
+    # nothing is added, kept tickers stay in place, and the renamed one is not repeated
+    assert(json.loads(path.read_text()) == {"Canada": ["RY.TO"], "USA": ["BRK.B", "AAPL"], "Japan": ["7203.T"]})
+    assert(refresh(str(path), listings, changes) == {})
+
+def test_build_only_writes_new_files(tmp_path):
+    (tmp_path / "stock_list.json").write_bytes(stock_list())
+    path = tmp_path / "all.json"
+    main([str(path), "--build", "--stock-list", str(tmp_path / "stock_list.json")])
+    assert(json.loads(path.read_text())["Canada"] == ["NEW.TO", "RY.TO"])
+    path.write_text("{}")
+    main([str(path), "--build", "--stock-list", str(tmp_path / "stock_list.json")])
+    assert(path.read_text() == "{}")
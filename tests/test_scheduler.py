@@ -0,0 +1,38 @@
+from datetime import datetime
+from screenerV3.fundamentals import SCHEMA
+from screenerV3.scheduler import RefreshScheduler
+from screenerV3.screens import ScreenDefinition
+from screenerV3.snapshots import SnapshotStore
+from screenerV3.table import Table
+
+
+def snapshot(rows: dict) -> Table:
+    return Table.from_dict({k: {"name": k, "country": country, "market_cap": 100.0, "total_current_assets": assets}
+                            for k, (assets, country) in rows.items()}, SCHEMA)
+
+def screen() -> ScreenDefinition:
+    return ScreenDefinition("test", params={"ncav_ratio_max": 2.5}, require=["country != 'CN'", "market_cap / total_current_assets < ncav_ratio_max"])
+
+def test_scheduler_tiers(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    # ratios: NEAR 2.4, MID 1.5, FAR 40 (and 0.1), CN never passes
+    store.append(snapshot({"NEAR": (100 / 2.4, "US"), "MID": (100 / 1.5, "US"), "FAR": (2.5, "US"), "CHEAP": (1000.0, "US"), "CN": (1000.0, "CN")}),
+                 "test", datetime(2024, 1, 1))
+    scheduler = RefreshScheduler(screen(), store, now=datetime(2024, 1, 15))
+    tickers = ["NEAR", "MID", "FAR", "CHEAP", "CN", "NEW"]
+    scores = scheduler.scores(tickers)
+    assert(scores["tier"].tolist() == [0, 1, 2, 2, 2, 1] and scores["age"][0] == 14 and scores["score"][0] == 2 and scores["score"][-1] == 1)
+    # about one call each (profile and balance sheet): NEAR is overdue, NEW is due, MID is not
+    assert(scores["cost"].round(3).tolist() == [1.001] * 6)
+    assert(scheduler.select(tickers, budget=2.5) == ["NEAR", "NEW"] and scheduler.select(tickers, budget=3.5) == ["NEAR", "MID", "NEW"])
+
+def test_scheduler_order(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    rows = {"FAR": (2.5, "US"), "PASS": (100.0, "US"), "NEAR": (100 / 2.4, "US"), "CN": (1000.0, "CN")}
+    table = snapshot(rows)
+    for k in rows:
+        table.set(k, "industry", "Software" if k != "FAR" else "Mining")
+    store.append(table, "test", datetime(2024, 1, 1))
+    scheduler = RefreshScheduler(screen(), store, now=datetime(2024, 1, 15))
+    # last passers (NEAR passes too), then the nearest tiers (unknown tickers in the middle one), then by industry pass rate
+    assert(scheduler.order(["FAR", "CN", "NEW", "NEAR", "PASS"]) == ["NEAR", "PASS", "NEW", "CN", "FAR"])
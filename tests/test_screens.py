@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from screenerV3.fundamentals import empty_fundamentals
+from screenerV3.screens import Expression, ScreenDefinition, load_screen
+
+
+def fundamentals():
+    table = empty_fundamentals(["AAA", "BBB", "CCC"])
+    table.add("AAA", {"country": "US", "industry": "Software", "market_cap": 100.0, "net_debt": -1.0, "total_current_assets": 300.0, "total_liabilities": 100.0})
+    table.add("BBB", {"country": "CN", "industry": "Retail", "market_cap": 100.0, "net_debt": -1.0, "total_current_assets": 100.0, "total_liabilities": 90.0})
+    table.add("CCC", {"country": "JP", "industry": "Banks—Regional", "market_cap": 50.0, "net_debt": 5.0, "total_current_assets": 100.0, "total_liabilities": 50.0})
+    return table
+
+def test_expression_rejects_unsafe_syntax():
+    for source in ["__import__('os')", "market_cap.real", "[x for x in y]", "open('f')"]:
+        with pytest.raises(ValueError):
+            Expression(source)
+
+def test_chained_comparison_and_membership():
+    screen = ScreenDefinition("test", require=["0 < ncav_ratio < max_ratio", "country not in ['CN', 'HK']"], params={"max_ratio": 2.5})
+    table = fundamentals()
+    assert(screen.mask(table).tolist() == [True, False, True])
+
+def test_endpoints_follow_metrics():
+    screen = ScreenDefinition("test", require=["ncav_ratio < 1"], columns={"Price": "price"})
+    assert(screen.endpoints == {"profile", "balance_sheet", "historical"})
+    assert([s.requires for s in screen.steps()] == [("profile", "balance_sheet")])
+
+def test_evaluate_sorts_and_types_columns():
+    screen = ScreenDefinition("test", require=["net_debt <= 0"], columns={"Name": "country", "NCAV Ratio": "int(round(ncav_ratio * 10))"}, sort=["-NCAV Ratio"])
+    res = screen.evaluate(fundamentals())
+    assert(res.tickers() == ["BBB", "AAA"])
+    assert(res.get("BBB", "NCAV Ratio") == 100 and isinstance(res.get("AAA", "NCAV Ratio"), int))
+
+def test_bundled_screens_load():
+    assert(load_screen("payback").sheet_module == "alpha")
+    assert("floats" in load_screen("multi_metric").endpoints)
+    assert(load_screen("multi_metric").with_params(p_tbv_max=2).params["p_tbv_max"] == 2)
+
+def test_payback_dividends_column():
+    table = empty_fundamentals(["AAA", "BBB", "CCC"])
+    table.add("AAA", {"last_div": 2.5, "buyback_total": -10.0})
+    table.add("BBB", {"last_div": 0.5, "buyback_total": -10.0})
+    table.add("CCC", {"last_div": 0.5, "buyback_total": 0.0})
+    value = load_screen("payback").columns["Has Dividends or Buybacks"].evaluate(load_screen("payback").namespace(table))
+    assert(value.tolist() == [2.5, "buyback", 0.5])
+
+def test_payback_rating():
+    table = empty_fundamentals(["AAA", "BBB", "CCC"])
+    table.add("AAA", {"market_cap": 100.0, "cash_at_end_of_period": 150.0, "fcf_total": 50.0})
+    table.add("BBB", {"market_cap": 100.0, "cash_at_end_of_period": 50.0, "fcf_total": 150.0})
+    table.add("CCC", {"market_cap": 100.0, "cash_at_end_of_period": -10.0, "fcf_total": 25.0})
+    rating = Expression("payback_rating").evaluate(load_screen("payback").namespace(table))
+    # years of FCF, on top of the cash, that cover the market cap; CCC is not covered within three
+    assert(rating[:2].tolist() == [0.5, 2] and np.isnan(rating[2]))
+
+def test_payback_drops_uncovered_market_cap():
+    screen = load_screen("payback")
+    table = empty_fundamentals(["AAA", "BBB"])
+    for ticker, fcf in [("AAA", 50.0), ("BBB", 15.0)]:
+        table.add(ticker, {"market_cap": 100.0, "cash_at_end_of_period": 50.0, "fcf_total": fcf * 5, "country": "US", "industry": "Software", "last_div": 1.0, "net_debt": -1.0, "total_current_assets": 300.0, "total_liabilities": 100.0, "price": 10.0})
+    assert(screen.mask(table).tolist() == [True, False])
@@ -0,0 +1,47 @@
+import asyncio
+from screenerV3.stages import RunStore, fetch_stage, plan_stage, screen_stage
+
+
+def test_fetch_resumes_and_screen_reruns(tmp_path, monkeypatch, unlimited, stub_handler, ncav_screen):
+    monkeypatch.chdir(tmp_path)
+    store = RunStore("test", root=str(tmp_path / "runs"))
+    tickers = ["AAA", "BBB", "CCC"]
+    failing = stub_handler(fail_after=2)
+    try:
+        asyncio.run(fetch_stage(ncav_screen, tickers, failing, store, "universe"))
+    except ConnectionError:
+        pass
+    handler = stub_handler()
+    asyncio.run(fetch_stage(ncav_screen, tickers, handler, store, "universe"))
+    # the profile batch and the balance sheet fetched before the failure are not requested again
+    assert(handler.calls == ["BBB", "CCC"])
+    results = screen_stage(ncav_screen, store)
+    assert(results.tickers() == ["AAA", "BBB"])
+    assert(store.load_results().tickers() == ["AAA", "BBB"] and store.manifest()["results"] == 2)
+
+def test_fetch_stops_at_target(tmp_path, monkeypatch, unlimited, stub_handler, ncav_screen):
+    monkeypatch.chdir(tmp_path)
+    store = RunStore("test", root=str(tmp_path / "runs"))
+    tickers = [f"T{i:03d}" for i in range(200)]
+    handler = stub_handler()
+    table = asyncio.run(fetch_stage(ncav_screen, tickers, handler, store, "universe", target=10))
+    fetched = [i for i in handler.calls if i != "profile"]
+    # whole batches in flight finish, the rest is not requested and left out of the results
+    assert(10 <= len(fetched) < 200 and table.tickers() == fetched)
+    assert(store.manifest()["skipped"] == 200 - len(fetched) and len(screen_stage(ncav_screen, store)) == len(fetched))
+
+def test_plan_stage_estimates(tmp_path, monkeypatch, unlimited, stub_handler, ncav_screen):
+    monkeypatch.chdir(tmp_path)
+    store = RunStore("test", root=str(tmp_path / "runs"))
+    tickers = [f"T{i:03d}" for i in range(200)]
+    plan = plan_stage(ncav_screen, tickers, stub_handler(), store, "universe", sheet="publish", prefilter=True)
+    # declared costs without statistics: one batched profile request, then one balance sheet per ticker
+    assert(plan["tickers"] == 200 and [i["phase"] for i in plan["phases"]] == ["profile", "prefilter", "balance_sheet"])
+    assert(plan["phases"][0]["calls"] == 1 and plan["phases"][1]["calls"] == 2 and plan["phases"][2]["entering"] == 180)
+    handler = stub_handler()
+    asyncio.run(fetch_stage(ncav_screen, tickers, handler, store, "universe", streaming=False, prefilter=True))
+    # measured: every ticker passed, and the estimate matches what was sent
+    plan = plan_stage(ncav_screen, tickers, stub_handler(), store, "universe", sheet="publish", prefilter=True)
+    phases = {i["phase"]: i for i in plan["phases"]}
+    assert(phases["balance_sheet"]["entering"] == 200 and phases["balance_sheet"]["calls"] == len(handler.calls) - 1)
+    assert(plan["results"] == 200 and plan["sheets_calls"] == 4 + 200 and not plan["resumed"])
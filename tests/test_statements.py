@@ -0,0 +1,75 @@
+import asyncio
+import csv
+import shutil
+from datetime import datetime
+from screenerV3.fundamentals import FundamentalsFetcher, empty_fundamentals
+from screenerV3.statements import StatementStore
+
+
+def write_csv(path, rows: list[dict]) -> str:
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+def cashflows(year: int, symbols: list[str]) -> list[dict]:
+    return [{"symbol": k, "date": f"{year}-{month:02d}-28", "period": f"Q{month // 3}", "freeCashFlow": 10 * month,
+             "cashAtEndOfPeriod": year, "commonStockRepurchased": "", "netIncome": 1}
+            for k in symbols for month in (3, 6, 9, 12)]
+
+def today(monkeypatch, date: str) -> None:
+    monkeypatch.setattr("screenerV3.statements._today", lambda: datetime.strptime(date, "%Y-%m-%d"))
+
+def test_ingest_and_read_across_partitions(tmp_path, monkeypatch):
+    today(monkeypatch, "2024-09-30")
+    store = StatementStore(str(tmp_path / "bulk"))
+    assert(store.ingest("cashflow", 2023, "quarter", write_csv(tmp_path / "2023.csv", cashflows(2023, ["ZZZ", "AAA"]))) == 8)
+    # the current year is only partly reported
+    store.ingest("cashflow", 2024, "quarter", write_csv(tmp_path / "2024.csv", cashflows(2024, ["AAA"])[:2] + [{"symbol": "", "date": "2024-03-28"}]))
+    assert(store.partitions("cashflow") == [2024, 2023])
+    found = store.statements("cashflow", ["AAA", "ZZZ", "MISSING"], limit=5)
+    # ZZZ has 4 of the 5 statements
+    assert(set(found) == {"AAA"})
+    assert([i.date for i in found["AAA"]] == ["2024-06-28", "2024-03-28", "2023-12-28", "2023-09-28", "2023-06-28"])
+    assert(found["AAA"][2].period == "Q4" and found["AAA"][2].common_stock_repurchased is None)
+    # re-ingesting a period replaces it
+    store.ingest("cashflow", 2023, "quarter", write_csv(tmp_path / "2023.csv", cashflows(2023, ["AAA"])))
+    assert(len(StatementStore(str(tmp_path / "bulk")).partition("cashflow", 2023)) == 4)
+
+def test_only_a_full_recent_window_is_read(tmp_path, monkeypatch):
+    today(monkeypatch, "2024-10-15")
+    store = StatementStore(str(tmp_path / "bulk"))
+    for year in range(2018, 2024):
+        store.ingest("cashflow", year, "quarter", write_csv(tmp_path / f"{year}.csv", cashflows(year, ["AAA", "BBB", "CCC"] if year > 2021 else ["AAA", "CCC"])))
+    # the current year so far; CCC stopped filing
+    store.ingest("cashflow", 2024, "quarter", write_csv(tmp_path / "2024.csv", cashflows(2024, ["AAA", "BBB"])[:2] + cashflows(2024, ["BBB"])[:2]))
+    found = store.statements("cashflow", ["AAA", "BBB", "CCC"])
+    # BBB has 2 complete years, CCC's last statement is 10 months old: both are requested instead
+    assert(list(found) == ["AAA"] and len(found["AAA"]) == 24 and found["AAA"][0].date == "2024-06-28")
+    today(monkeypatch, "2025-03-01")
+    assert(store.statements("cashflow", ["AAA"]) == {})
+    # a missing fiscal year stops the window
+    today(monkeypatch, "2024-10-15")
+    shutil.rmtree(tmp_path / "bulk" / "cashflow" / "2021-quarter")
+    assert(StatementStore(str(tmp_path / "bulk")).statements("cashflow", ["AAA"]) == {})
+
+class Handler:
+    def __init__(self) -> None:
+        self.calls = []
+
+    async def get_cashflow(self, session, ticker):
+        self.calls.append(ticker)
+        return None
+
+def test_fetcher_reads_the_store_first(tmp_path, monkeypatch, unlimited):
+    today(monkeypatch, "2024-03-01")
+    store = StatementStore(str(tmp_path / "bulk"))
+    for year in range(2018, 2024):
+        store.ingest("cashflow", year, "quarter", write_csv(tmp_path / f"{year}.csv", cashflows(year, ["AAA"])))
+    table = empty_fundamentals(["AAA", "BBB"])
+    handler = Handler()
+    fetcher = FundamentalsFetcher(handler, statements=store)
+    asyncio.run(fetcher.phases({"cashflow"})[0].run(None, table))
+    assert(handler.calls == ["BBB"])
+    assert(table.tickers() == ["AAA"] and table.get("AAA", "fcf_total") == 5 * 300.0 and table.get("AAA", "trailing_fcf") == 300.0)
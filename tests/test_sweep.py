@@ -0,0 +1,30 @@
+from screenerV3.fundamentals import empty_fundamentals
+from screenerV3.screens import ScreenDefinition
+from screenerV3.sweep import Sweep, expand_grid
+
+
+def fundamentals():
+    table = empty_fundamentals(["AAA", "BBB", "CCC", "DDD"])
+    for ticker, mcap, ncav in [("AAA", 100.0, 200.0), ("BBB", 100.0, 50.0), ("CCC", 100.0, 30.0)]:
+        table.add(ticker, {"market_cap": mcap, "total_current_assets": ncav, "total_liabilities": 0.0})
+    # DDD has a profile but no balance sheet
+    table.add("DDD", {"market_cap": 100.0})
+    table.remove("CCC")
+    return table
+
+def screen():
+    return ScreenDefinition("test", require=["ncav_ratio < ratio_max"], params={"ratio_max": 2.5}, columns={"NCAV Ratio": "ncav_ratio"}, sort=["NCAV Ratio"])
+
+def test_expand_grid():
+    assert(expand_grid({"a": [1, 2], "b": [3]}) == [{"a": 1, "b": 3}, {"a": 2, "b": 3}])
+
+def test_sweep_uses_complete_rows():
+    sweep = Sweep(screen(), fundamentals())
+    results = sweep.run(expand_grid({"ratio_max": [1, 2.5, 4]}), processes=1)
+    assert([i["passed"] for i in results] == [1, 2, 3])
+    assert(results[2]["tickers"] == ["AAA", "BBB", "CCC"])
+
+def test_sweep_process_pool_matches_serial():
+    sweep = Sweep(screen(), fundamentals())
+    grid = expand_grid({"ratio_max": [i / 4 for i in range(40)]})
+    assert(sweep.run(grid, processes=2) == sweep.run(grid, processes=1))
@@ -0,0 +1,23 @@
+import json
+from screenerV3.symbols import SymbolIndex, canonical, suffix_country
+
+
+def test_canonical_symbols():
+    assert(canonical("brk-b") == canonical("BRK.B") == canonical("BRK/B") == "BRK-B")
+    assert(canonical(" 7203.t ") == "7203.T" and canonical("rds.a.l") == "RDS-A.L")
+    assert(suffix_country("SHOP.TO") == "Canada" and suffix_country("7203.T") == "Japan" and suffix_country("AAPL") == "USA")
+
+def test_build_and_load(tmp_path):
+    (tmp_path / "cik.txt").write_text("aapl: 320193\nbrk-b: 1067983\n")
+    (tmp_path / "company_tickers.json").write_text(json.dumps({"0": {"cik_str": 1067983, "ticker": "BRK-A", "title": "B"},
+                                                               "1": {"cik_str": 1, "ticker": "AAPL", "title": "stale"},
+                                                               "2": {"cik_str": 789019, "ticker": "MSFT", "title": "M"}}))
+    (tmp_path / "universe.json").write_text(json.dumps({"Canada": ["SHOP.TO", "SHOP.TO"], "USA": ["AAPL", "BRK.B"]}))
+    root = str(tmp_path / "symbols")
+    assert(SymbolIndex(root).build(str(tmp_path / "cik.txt"), str(tmp_path / "company_tickers.json"), str(tmp_path / "universe.json")) == 5)
+    index = SymbolIndex(root)
+    # cik.txt wins over company_tickers.json
+    assert(index.cik("aapl") == 320193 and index.cik("BRK.B") == 1067983 and index.cik("MSFT") == 789019 and index.cik("SHOP.TO") is None)
+    assert(index.ticker(1067983) == "BRK-A" and index.ticker(2) is None)
+    assert(index.country("shop.to") == "Canada" and index.country("BRK-B") == "USA" and index.country("9999.T") == "Japan")
+    assert(SymbolIndex(str(tmp_path / "missing")).cik("AAPL") is None)
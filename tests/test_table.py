@@ -0,0 +1,54 @@
+import numpy as np
+from screenerV3.table import Table, FLOAT, INT, OBJECT
+
+
+def test_remove_is_mask_flip():
+    table = Table.from_dict({"AAA": {"NCAV Ratio": 1.5}, "BBB": {"NCAV Ratio": 2.0}})
+    assert(table.remove("AAA"))
+    assert(len(table) == 1)
+    assert("AAA" not in table)
+    assert(table.get("AAA", "NCAV Ratio") == 1.5)
+    assert(table.tickers() == ["BBB"])
+
+def test_keep_and_vectorized_columns():
+    table = Table({"Market Cap": FLOAT, "5Y average": FLOAT})
+    for i, ticker in enumerate(["AAA", "BBB", "CCC"]):
+        table.add(ticker, {"Market Cap": 100.0, "5Y average": 10.0 * (i + 1)})
+    ratio = table["Market Cap"] / table["5Y average"]
+    removed = table.keep(ratio < 6)
+    assert(removed == 1)
+    assert(table.tickers() == ["BBB", "CCC"])
+
+def test_sort_puts_missing_last():
+    table = Table.from_dict({"AAA": {"NCAV Ratio": None, "Upside": 1}, "BBB": {"NCAV Ratio": 2.0, "Upside": 5}, "CCC": {"NCAV Ratio": 2.0, "Upside": 3}})
+    table.sort(["NCAV Ratio", "Upside"])
+    assert(table.tickers() == ["CCC", "BBB", "AAA"])
+
+def test_rows_emit_python_values():
+    table = Table({"Name": OBJECT, "EV/aFCF": INT})
+    table.add("AAA", {"Name": "A Corp", "EV/aFCF": 4})
+    table.add("BBB", {"Name": "B Corp"})
+    rows = table.to_dict(na="N/A")
+    assert(rows["AAA"] == {"Name": "A Corp", "EV/aFCF": 4})
+    assert(rows["BBB"]["EV/aFCF"] == "N/A")
+
+def test_mixed_values_widen_column():
+    table = Table()
+    table.add("AAA", {"Has Dividends or Buybacks": 0.5})
+    table.add("BBB", {"Has Dividends or Buybacks": "buyback"})
+    assert(table.schema["Has Dividends or Buybacks"] == OBJECT)
+    assert(table.get("AAA", "Has Dividends or Buybacks") == 0.5)
+    assert(np.isnan(table.numeric("Has Dividends or Buybacks")[1]))
+
+def test_save_and_load_round_trip(tmp_path):
+    table = Table({"Name": OBJECT, "Count": INT})
+    table.add("AAA", {"Name": "A co", "Count": 3, "Ratio": 1.5})
+    table.add("BBB", {"Ratio": 0.5})
+    table.add("CCC", {"Name": "C co"})
+    table.remove("CCC")
+    table.sort(["Ratio"])
+    table.save(str(tmp_path / "table.npz"))
+    loaded = Table.load(str(tmp_path / "table.npz"))
+    assert(loaded.tickers() == ["BBB", "AAA"])
+    assert(loaded.to_dict() == table.to_dict())
+    assert(loaded.schema == table.schema and loaded.get("CCC", "Name") == "C co")
@@ -0,0 +1,18 @@
+import json
+from screenerV3 import universe as universe_module
+from screenerV3.universe import Universe
+
+
+def test_compile_save_and_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(universe_module, "BATCH", 2)
+    (tmp_path / "a.json").write_text(json.dumps({"Canada": ["shop.to", "SHOP.TO", "RY.TO"], "Poland": [], "USA": ["BRK.B", "AAPL"]}))
+    (tmp_path / "b.json").write_text(json.dumps({"USA": ["brk-b", "MSFT"]}))
+    compiled = Universe.compile([str(tmp_path / "a.json"), str(tmp_path / "b.json")])
+    assert(compiled.tickers == ["SHOP.TO", "RY.TO", "BRK-B", "AAPL", "MSFT"])
+    assert(compiled.meta["duplicates"] == 2 and compiled.meta["empty"] == ["Poland"])
+    compiled.save(str(tmp_path / "universe.npz"))
+    loaded = Universe.load(str(tmp_path / "universe.npz"))
+    assert(loaded.by_country() == {"Canada": ["SHOP.TO", "RY.TO"], "USA": ["BRK-B", "AAPL", "MSFT"]})
+    assert(loaded.exchanges() == [".TO", ".TO", "", "", ""])
+    assert(loaded.batches() == ["SHOP.TO,RY.TO", "BRK-B,AAPL", "MSFT"])
+    assert(loaded.meta["sources"] == ["a.json", "b.json"] and len(loaded) == 5)